@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+  Archivo: benchmark.py
+  Proyecto para Laboratorio de datos, Facultad de Ciencias Exactas y Naturales, UBA
+  Integrantes del grupo: Ariel Dembling, Antony Suárez Caina, Camila Guibaudo
+  Fecha: 18/10/26
+  Descripción: benchmarks de las funciones de funciones.py que procesan tablas.
+  Cada función se mide sobre las fuentes sintéticas de generador.py a varias
+  escalas; los tiempos y el exponente de escala ajustado se agregan a un
+  historial JSON y se comparan con una línea base guardada, para detectar
+  regresiones (por ejemplo, una función lineal que pasa a ser cuadrática).
+  Uso: python benchmark.py [--escalas 1,2,4,8] [--funciones añadirIDs,perfil] [--guardar-linea-base]
+"""
+
+# =============================================================================
+# LIBRERÍAS
+# =============================================================================
+import pandas as pd
+import numpy as np
+import contextlib
+import argparse
+import datetime
+import platform
+import duckdb
+import time
+import json
+import sys
+import gc
+import io
+import os
+
+import funciones as fn
+import generador
+import desarrollo
+
+directorio_benchmarks = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'benchmarks')
+
+
+# =============================================================================
+# PARÁMETROS
+# =============================================================================
+
+ESCALAS = [1, 2, 4, 8]
+SEMILLA = 0
+# Los salarios crecen con los meses además de con la escala; para medir las
+# funciones alcanza con un año
+MESES = 12
+REPETICIONES = 3
+# Una función tiene una regresión si, a alguna escala, tarda más de
+# (1 + TOLERANCIA) veces lo que tardaba en la línea base, o si su exponente de
+# escala supera al de la línea base en más de TOLERANCIA_EXPONENTE
+TOLERANCIA = 0.5
+TOLERANCIA_EXPONENTE = 0.3
+
+
+# =============================================================================
+# TABLAS
+# =============================================================================
+
+# Arma los dict_df de las fuentes sintéticas tal como quedan después de la
+# etapa de carga de desarrollo.py: con la metadata y el esquema de cada tabla
+# y con las columnas de operadores renombradas
+def tablasSinteticas(escala, semilla=SEMILLA, meses=MESES):
+    fuentes = generador.generarFuentes(escala, semilla, meses)
+    if fuentes is None:
+        return None
+    tablas = dict()
+    for nombre, df in fuentes.items():
+        dict_df = getattr(desarrollo, nombre)
+        tablas[nombre] = {'name': dict_df['name'],
+                          'df': fn.aplicarEsquema(df, dict_df.get('esquema', {}))}
+    tablas['operadores']['df'] = tablas['operadores']['df'].rename(
+        columns={"Certificadora_id": "certificadora_id", "razón social": "razon_social"})
+    return tablas
+
+
+# Copia de los dict_df sin sus resultados guardados (ver fn.cacheDeTabla), así
+# cada repetición mide la función desde cero. Los dataframes no se copian: las
+# funciones reemplazan dict_df['df'] en lugar de modificarlo.
+def tablasLimpias(tablas):
+    return {nombre: {'name': dict_df['name'], 'df': dict_df['df']} for nombre, dict_df in tablas.items()}
+
+
+# =============================================================================
+# CASOS
+# =============================================================================
+
+## ESTRUCTURA: caso
+# Diccionario que describe la medición de una función:
+#   'name'    = nombre de la función en funciones.py
+#   'tabla'   = tabla cuya cantidad de filas se usa para ajustar el exponente
+#   'llamada' = función que recibe los dict_df (ver tablasLimpias) y llama a la
+#               función medida con los mismos argumentos que en desarrollo.py
+CASOS = [
+    {'name': 'añadirIDs', 'tabla': 'operadores',
+     'llamada': lambda t: fn.añadirIDs(t['operadores'], ['razon_social', 'establecimiento'])},
+    {'name': 'reasignarIDs', 'tabla': 'localidades',
+     'llamada': lambda t: fn.reasignarIDs(t['localidades'], ('municipio_id', 'municipio_nombre'),
+                                          desarrollo.valores_indefinidos)},
+    {'name': 'consistencia', 'tabla': 'localidades',
+     'llamada': lambda t: fn.consistencia(t['deptos'], t['localidades'],
+                                          ['codigo_departamento_indec', 'nombre_departamento_indec'],
+                                          ['departamento_id', 'departamento_nombre'], caso=1, verbose=False)},
+    {'name': 'consistenciaExtendida', 'tabla': 'localidades',
+     'llamada': lambda t: fn.consistenciaExtendida(t['deptos'], t['localidades'],
+                                                   {'col_id': ('codigo_departamento_indec', 'departamento_id'),
+                                                    'col_dep': (['nombre_departamento_indec', 'id_provincia_indec'],
+                                                                ['departamento_nombre', 'provincia_id'])},
+                                                   verbose=False)},
+    {'name': 'porcentajeDeValoresInexistentes', 'tabla': 'operadores',
+     'llamada': lambda t: fn.porcentajeDeValoresInexistentes(
+         t['operadores'], t['localidades'],
+         {('departamento', 'localidad'): ['departamento_nombre', 'municipio_nombre', 'nombre'],
+          'provincia_id': ['provincia_id'], 'provincia': ['provincia_nombre']},
+         lista_de_indefinidos=desarrollo.valores_indefinidos, verbose=False)},
+    {'name': 'evaluacionDeTipos', 'tabla': 'operadores',
+     'llamada': lambda t: fn.evaluacionDeTipos(t['operadores'], verbose=False)},
+    {'name': 'limpiezaTuplasRepetidas', 'tabla': 'operadores',
+     'llamada': lambda t: fn.limpiezaTuplasRepetidas(t['operadores'])},
+    {'name': 'agregarColumnaMantieneCantidadDeTuplasUnicas', 'tabla': 'operadores',
+     'llamada': lambda t: fn.agregarColumnaMantieneCantidadDeTuplasUnicas(
+         t['operadores'], ['razon_social', 'establecimiento'], 'rubro')},
+    {'name': 'porcentajeTuplasRepetidasSobrantes', 'tabla': 'operadores',
+     'llamada': lambda t: fn.porcentajeTuplasRepetidasSobrantes(t['operadores'], verbose=False)},
+    {'name': 'perfil', 'tabla': 'operadores',
+     'llamada': lambda t: fn.perfil(t['operadores'], desarrollo.valores_indefinidos)},
+    {'name': 'dependenciasFuncionales', 'tabla': 'operadores',
+     'llamada': lambda t: fn.dependenciasFuncionales(t['operadores'], 2, verbose=False)},
+    {'name': 'hashDeTuplas', 'tabla': 'salarios',
+     'llamada': lambda t: fn.hashDeTuplas(t['salarios']['df'])},
+]
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+# Menor tiempo (en segundos) de varias repeticiones de la llamada del caso. Lo
+# que imprime la función medida se descarta.
+def medirCaso(caso, tablas, repeticiones=REPETICIONES):
+    tiempos = []
+    for i in range(repeticiones):
+        copia = tablasLimpias(tablas)
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            caso['llamada'](copia)
+            tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+# Exponente k del ajuste por cuadrados mínimos de tiempos ≈ c * filas^k (en
+# escala logarítmica). Retorna NaN si no hay al menos dos tamaños distintos.
+def exponenteDeEscala(filas, tiempos):
+    filas = np.asarray(filas, dtype=float)
+    tiempos = np.maximum(np.asarray(tiempos, dtype=float), 1e-9)
+    if len(np.unique(filas)) < 2:
+        return np.nan
+    return float(np.polyfit(np.log(filas), np.log(tiempos), 1)[0])
+
+
+## ESTRUCTURA: corrida
+# Diccionario con el resultado de una corrida de benchmarks (es lo que se
+# guarda en el historial y en la línea base):
+#   'fecha', 'entorno' (versiones), 'escalas', 'semilla', 'meses', 'repeticiones'
+#   'resultados' = {nombre_funcion: {'filas': [...], 'segundos': [...], 'exponente': k}}
+# donde filas y segundos tienen un valor por escala, en el orden de 'escalas'.
+def correrBenchmarks(casos=CASOS, escalas=ESCALAS, semilla=SEMILLA, meses=MESES,
+                     repeticiones=REPETICIONES, verbose=True):
+    resultados = {caso['name']: {'filas': [], 'segundos': []} for caso in casos}
+    for escala in escalas:
+        tablas = tablasSinteticas(escala, semilla, meses)
+        if tablas is None:
+            return None
+        if verbose:
+            print("Escala " + str(escala) + ": " + ', '.join(nombre + ' ' + str(len(t['df'])) + ' filas'
+                                                            for nombre, t in tablas.items()))
+        for caso in casos:
+            segundos = medirCaso(caso, tablas, repeticiones)
+            resultados[caso['name']]['filas'].append(len(tablas[caso['tabla']]['df']))
+            resultados[caso['name']]['segundos'].append(segundos)
+            if verbose:
+                print("  " + caso['name'] + ": " + str(round(segundos, 4)) + " s")
+    for resultado in resultados.values():
+        resultado['exponente'] = exponenteDeEscala(resultado['filas'], resultado['segundos'])
+    return {'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'entorno': {'python': platform.python_version(), 'pandas': pd.__version__,
+                        'numpy': np.__version__, 'duckdb': duckdb.__version__},
+            'escalas': list(escalas), 'semilla': semilla, 'meses': meses,
+            'repeticiones': repeticiones, 'resultados': resultados}
+
+
+# =============================================================================
+# HISTORIAL Y LÍNEA BASE
+# =============================================================================
+
+def leerJSON(ruta, por_defecto=None):
+    if not os.path.exists(ruta):
+        return por_defecto
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def escribirJSON(ruta, valor):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(valor, f, ensure_ascii=False, indent=1)
+    os.replace(ruta + '.tmp', ruta)
+
+
+# El historial es una lista de corridas, de la más vieja a la más nueva
+def agregarAlHistorial(ruta, corrida):
+    historial = leerJSON(ruta, [])
+    historial.append(corrida)
+    escribirJSON(ruta, historial)
+    return historial
+
+
+# Compara los resultados de la corrida con los de la línea base (ver
+# TOLERANCIA). Solo se comparan las funciones y escalas presentes en ambas.
+# Retorna una lista de mensajes, uno por regresión encontrada.
+def regresiones(corrida, linea_base, tolerancia=TOLERANCIA, tolerancia_exponente=TOLERANCIA_EXPONENTE):
+    mensajes = []
+    for nombre, resultado in corrida['resultados'].items():
+        base = linea_base['resultados'].get(nombre)
+        if base is None:
+            continue
+        segundos_base = dict(zip(linea_base['escalas'], base['segundos']))
+        for escala, segundos in zip(corrida['escalas'], resultado['segundos']):
+            if escala in segundos_base and segundos > (1 + tolerancia) * segundos_base[escala]:
+                mensajes.append(nombre + ": a escala " + str(escala) + " tarda " + str(round(segundos, 4)) +
+                                " s (línea base: " + str(round(segundos_base[escala], 4)) + " s)")
+        exponente, exponente_base = resultado['exponente'], base['exponente']
+        # (con un exponente NaN la comparación da False)
+        if exponente > exponente_base + tolerancia_exponente:
+            mensajes.append(nombre + ": su exponente de escala pasó de " + str(round(exponente_base, 2)) +
+                            " a " + str(round(exponente, 2)))
+    return mensajes
+
+
+# Tabla con los segundos por escala y el exponente de cada función
+def resumenDeCorrida(corrida):
+    resumen = pd.DataFrame({nombre: resultado['segundos'] + [resultado['exponente']]
+                            for nombre, resultado in corrida['resultados'].items()},
+                           index=['escala ' + str(escala) for escala in corrida['escalas']] + ['exponente']).T
+    return resumen.round(4)
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide las funciones de funciones.py sobre fuentes sintéticas a varias escalas.')
+    parser.add_argument('--escalas', default=','.join(str(e) for e in ESCALAS),
+                        help='escalas separadas por comas, de 1 a 1000 (por defecto, ' + ','.join(str(e) for e in ESCALAS) + ')')
+    parser.add_argument('--funciones', default=None,
+                        help='funciones a medir, separadas por comas (por defecto, todas)')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES, help='repeticiones por medición; vale la menor')
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--meses', type=int, default=MESES, help='meses de salarios de las fuentes sintéticas')
+    parser.add_argument('--directorio', default=directorio_benchmarks,
+                        help='directorio del historial y de la línea base (por defecto, cache/benchmarks)')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help='aumento relativo de tiempo que se considera regresión')
+    parser.add_argument('--guardar-linea-base', action='store_true',
+                        help='guarda esta corrida como la nueva línea base')
+    args = parser.parse_args()
+
+    casos = CASOS
+    if args.funciones is not None:
+        nombres = args.funciones.split(',')
+        desconocidas = [nombre for nombre in nombres if nombre not in [caso['name'] for caso in CASOS]]
+        if len(desconocidas) > 0:
+            print("ERROR: no hay benchmark para " + ', '.join(desconocidas) + ". Las funciones medidas son: " +
+                  ', '.join(caso['name'] for caso in CASOS))
+            sys.exit(2)
+        casos = [caso for caso in CASOS if caso['name'] in nombres]
+
+    corrida = correrBenchmarks(casos, [float(e) if '.' in e else int(e) for e in args.escalas.split(',')],
+                               args.semilla, args.meses, args.repeticiones)
+    if corrida is None:
+        sys.exit(2)
+    print("")
+    print(resumenDeCorrida(corrida).to_string())
+    print("")
+    agregarAlHistorial(os.path.join(args.directorio, 'historial.json'), corrida)
+
+    ruta_linea_base = os.path.join(args.directorio, 'linea_base.json')
+    if args.guardar_linea_base:
+        escribirJSON(ruta_linea_base, corrida)
+        print("Línea base guardada en " + ruta_linea_base)
+        sys.exit(0)
+    linea_base = leerJSON(ruta_linea_base)
+    if linea_base is None:
+        print("ATENCIÓN: no hay línea base en " + ruta_linea_base + "; para guardar esta corrida como línea base, "
+              "usar --guardar-linea-base.")
+        sys.exit(0)
+    mensajes = regresiones(corrida, linea_base, args.tolerancia)
+    if len(mensajes) > 0:
+        print("ATENCIÓN: " + str(len(mensajes)) + " regresiones respecto de la línea base del " + linea_base['fecha'] + ":")
+        for mensaje in mensajes:
+            print("  - " + mensaje)
+        sys.exit(1)
+    print("Sin regresiones respecto de la línea base del " + linea_base['fecha'] + ".")
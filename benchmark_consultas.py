@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+  Archivo: benchmark_consultas.py
+  Proyecto para Laboratorio de datos, Facultad de Ciencias Exactas y Naturales, UBA
+  Integrantes del grupo: Ariel Dembling, Antony Suárez Caina, Camila Guibaudo
+  Fecha: 18/10/26
+  Descripción: benchmark de punta a punta de las consultas SQL de desarrollo.py.
+  Para cada escala, se generan las fuentes sintéticas (ver generador.py), se
+  ejecutan las etapas de desarrollo.py registrando cada consulta (sql ^ ...)
+  junto con los dataframes que usa, y después cada consulta se vuelve a
+  ejecutar por separado midiendo su latencia, su pico de memoria y la cantidad
+  de filas del resultado. Así se ve qué consultas se degradan primero cuando
+  crecen los datos, y se pueden comparar formulaciones alternativas de una
+  consulta sobre las mismas entradas.
+  Uso: python benchmark_consultas.py [--escalas 1,4,16] [--consultas deptos_con_operadores,...]
+                                     [--alternativa deptos_con_operadores=otra.sql] [--listar]
+"""
+
+# =============================================================================
+# LIBRERÍAS
+# =============================================================================
+import pandas as pd
+import numpy as np
+import multiprocessing
+import contextlib
+import linecache
+import argparse
+import datetime
+import platform
+import tempfile
+import inspect
+import shutil
+import duckdb
+import time
+import sys
+import re
+import io
+import os
+
+from inline_sql import sql
+# inline_sql no expone otra forma de ejecutar una consulta con un contexto dado
+from inline_sql._src.runtime import run_query
+
+import funciones as fn
+import generador
+import desarrollo
+import benchmark
+
+# resource solo existe en sistemas tipo Unix; sin él no se mide la memoria
+try:
+    import resource
+except ImportError:
+    resource = None
+
+archivo_desarrollo = os.path.abspath(desarrollo.__file__)
+archivo_funciones = os.path.abspath(fn.__file__)
+# Funciones de funciones.py a las que desarrollo.py les delega consultas de
+# sus etapas: sus consultas se registran como si fueran de desarrollo.py
+FUNCIONES_DELEGADAS = ['departamentosConOperadores', 'operadoresYSalarioPorProvincia', 'salarioPromedioPorProvincia']
+
+
+# =============================================================================
+# PARÁMETROS
+# =============================================================================
+
+ESCALAS = [1, 2, 4, 8]
+SEMILLA = 0
+# Con menos meses de salarios las consultas sobre salarios siguen funcionando,
+# pero la pregunta sobre 2022 necesita los 108 meses desde 2014
+MESES = 108
+REPETICIONES = 3
+# Una consulta que tarda más que esto (en una repetición) se da por agotada
+LIMITE_SEGUNDOS = 600
+
+
+# =============================================================================
+# CAPTURA DE CONSULTAS
+# =============================================================================
+
+## ESTRUCTURA: consulta
+# Diccionario con una consulta ejecutada en desarrollo.py (o en una de las
+# FUNCIONES_DELEGADAS):
+#   'name'   = identificador: la variable a la que se asigna el resultado o, si
+#              no se asigna, '<etapa>:<línea>'. Si el mismo identificador se
+#              repite (ej. en un ciclo), se agrega '#2', '#3', ...
+#   'etapa'  = función de desarrollo.py (o delegada) que la ejecuta
+#   'linea'  = línea del archivo de esa función
+#   'texto'  = texto SQL de la consulta
+#   'tablas' = {nombre: dataframe} con los dataframes que usa, tal como estaban
+#              al ejecutarla
+#   'filas_resultado' = cantidad de filas que dio en desarrollo.py
+
+# Identificador de una consulta según la línea de código que la ejecuta
+def idDeConsulta(codigo, etapa, linea):
+    asignacion = re.match(r'\s*(\w+)\s*=\s*\(?\s*sql\s*\^', codigo)
+    if asignacion is not None:
+        return asignacion.group(1)
+    return etapa + ':' + str(linea)
+
+
+# Dataframes del contexto cuyos nombres aparecen en el texto de la consulta
+def tablasDeConsulta(texto, contexto):
+    nombres = set(re.findall(r'[A-Za-z_]\w*', texto))
+    return {nombre: contexto[nombre].copy(deep=False) for nombre in sorted(nombres)
+            if isinstance(contexto.get(nombre), pd.DataFrame)}
+
+
+# Dentro de este contexto, cada consulta de inline_sql que se ejecuta desde
+# archivo (o desde las funciones delegadas de funciones.py) se agrega (ver 
+# ESTRUCTURA: consulta) a la lista que se obtiene con el with. Las consultas se
+# siguen ejecutando igual que con inline_sql.
+@contextlib.contextmanager
+def capturarConsultas(archivo=archivo_desarrollo, delegadas=FUNCIONES_DELEGADAS):
+    clase = type(sql)
+    original = clase.__xor__
+    consultas = []
+    repeticiones = dict()
+
+    def capturar(self, query):
+        frame = inspect.currentframe().f_back
+        try:
+            contexto = {**frame.f_globals, **frame.f_locals}
+            etapa, linea = frame.f_code.co_name, frame.f_lineno
+            archivo_frame = os.path.abspath(frame.f_code.co_filename)
+            desde_archivo = archivo_frame == archivo or (archivo_frame == archivo_funciones and etapa in delegadas)
+        finally:
+            del frame
+        df = run_query(query, contexto)
+        if desde_archivo:
+            nombre = idDeConsulta(linecache.getline(archivo_frame, linea), etapa, linea)
+            repeticiones[nombre] = repeticiones.get(nombre, 0) + 1
+            if repeticiones[nombre] > 1:
+                nombre += '#' + str(repeticiones[nombre])
+            consultas.append({'name': nombre, 'etapa': etapa, 'linea': linea, 'texto': query,
+                              'tablas': tablasDeConsulta(query, contexto), 'filas_resultado': len(df)})
+        if self.scalar:
+            return None if df.empty else df.iloc[0, 0]
+        return df
+
+    clase.__xor__ = capturar
+    try:
+        yield consultas
+    finally:
+        clase.__xor__ = original
+
+
+# Escribe las fuentes sintéticas en directorio y ejecuta sobre ellas todas las
+# etapas de desarrollo.py (sin caché y sin mostrar lo que imprimen). Retorna
+# las consultas ejecutadas.
+def consultasDeDesarrollo(directorio, escala=1, semilla=SEMILLA, meses=MESES):
+    if generador.guardarFuentes(directorio, escala, semilla, meses, verbose=False) is None:
+        return None
+    entorno = {'valores_indefinidos': desarrollo.valores_indefinidos,
+               'rangos_salarios': desarrollo.rangos_salarios,
+               'directorio_cache': os.path.join(directorio, 'cache'),
+               'directorio_figuras': os.path.join(directorio, 'figuras')}
+    for nombre in ['operadores', 'salarios', 'localidades', 'deptos', 'clae', 'rubro_categoria_clae2']:
+        dict_df = getattr(desarrollo, nombre)
+        csv = dict_df['csv']
+        entorno[nombre] = {**fn.metadatosDeTabla(dict_df),
+                           'csv': os.path.join(directorio, os.path.basename(os.path.dirname(csv)), os.path.basename(csv))}
+    os.makedirs(entorno['directorio_cache'], exist_ok=True)
+    with capturarConsultas() as consultas, contextlib.redirect_stdout(io.StringIO()):
+        fn.ejecutarEtapas(desarrollo.etapas, entorno, verbose=False)
+    return consultas
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+# Ejecuta el texto SQL sobre las tablas dadas en una base DuckDB en memoria
+# (como inline_sql). Retorna (resultado, segundos).
+def ejecutarConsulta(texto, tablas):
+    con = duckdb.connect()
+    try:
+        for nombre, df in tablas.items():
+            con.register(nombre, df)
+        inicio = time.perf_counter()
+        resultado = con.execute(texto).fetchdf()
+        return resultado, time.perf_counter() - inicio
+    finally:
+        con.close()
+
+
+def picoDeMemoriaEnKB():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Mide la consulta: menor tiempo de varias repeticiones, aumento del pico de
+# memoria del proceso (en MB) y filas y hash (ver fn.hashDeTuplas) del
+# resultado. Si texto no es None, se mide ese texto en lugar del de la
+# consulta, sobre las mismas tablas.
+def medicionDeConsulta(consulta, repeticiones=REPETICIONES, texto=None):
+    texto = consulta['texto'] if texto is None else texto
+    # La primera conexión a DuckDB del proceso reserva memoria que no es de la
+    # consulta; la hacemos antes de tomar el pico inicial
+    ejecutarConsulta('SELECT 1', {})
+    memoria_inicial = picoDeMemoriaEnKB() if resource is not None else None
+    tiempos = []
+    for i in range(repeticiones):
+        resultado, segundos = ejecutarConsulta(texto, consulta['tablas'])
+        tiempos.append(segundos)
+    memoria = np.nan if memoria_inicial is None else (picoDeMemoriaEnKB() - memoria_inicial) / 1024
+    return {'segundos': min(tiempos), 'memoria_mb': memoria, 'filas_resultado': len(resultado),
+            'hash_resultado': int(fn.hashDeTuplas(resultado).sum()), 'estado': 'ok'}
+
+
+def medirEnProceso(consulta, repeticiones, texto, conexion):
+    try:
+        conexion.send(medicionDeConsulta(consulta, repeticiones, texto))
+    except Exception as error:
+        conexion.send({'estado': 'error: ' + type(error).__name__ + ': ' + str(error).split('\n')[0]})
+    finally:
+        conexion.close()
+
+
+# Como medicionDeConsulta, pero en un proceso aparte (fork), así el pico de
+# memoria es el de la consulta y no el de las anteriores, y una consulta que
+# supera limite_segundos o que termina el proceso no detiene al resto. Si no se
+# puede usar fork, se mide en este mismo proceso (sin límite de tiempo).
+def medirConsulta(consulta, repeticiones=REPETICIONES, texto=None, limite_segundos=LIMITE_SEGUNDOS):
+    medicion = {'segundos': np.nan, 'memoria_mb': np.nan, 'filas_resultado': np.nan, 'hash_resultado': None}
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        try:
+            return medicionDeConsulta(consulta, repeticiones, texto)
+        except Exception as error:
+            return {**medicion, 'estado': 'error: ' + type(error).__name__ + ': ' + str(error).split('\n')[0]}
+    contexto = multiprocessing.get_context('fork')
+    recibir, enviar = contexto.Pipe(duplex=False)
+    proceso = contexto.Process(target=medirEnProceso, args=(consulta, repeticiones, texto, enviar))
+    proceso.start()
+    enviar.close()
+    if recibir.poll(limite_segundos * repeticiones):
+        try:
+            medicion.update(recibir.recv())
+        except EOFError:
+            medicion['estado'] = 'error: el proceso terminó con código ' + str(proceso.exitcode)
+    else:
+        medicion['estado'] = 'tiempo agotado'
+    if proceso.is_alive():
+        proceso.kill()
+    proceso.join()
+    if 'estado' not in medicion:
+        medicion['estado'] = 'error: el proceso terminó con código ' + str(proceso.exitcode)
+    return medicion
+
+
+# =============================================================================
+# CORRIDA
+# =============================================================================
+
+## ESTRUCTURA: alternativas
+#    'nombre_consulta' = [texto_sql_1, texto_sql_2, ...]
+# Formulaciones alternativas de una consulta: se miden sobre las mismas tablas
+# que la original y se informa si dan el mismo resultado (mismas tuplas, sin
+# importar el orden ni los nombres de las columnas).
+
+# Retorna un dataframe con una fila por consulta (y por alternativa) y escala
+def correrConsultas(escalas=ESCALAS, semilla=SEMILLA, meses=MESES, repeticiones=REPETICIONES,
+                    seleccionadas=None, alternativas={}, limite_segundos=LIMITE_SEGUNDOS, verbose=True):
+    filas = []
+    for escala in escalas:
+        directorio = tempfile.mkdtemp(prefix='benchmark_consultas_')
+        try:
+            consultas = consultasDeDesarrollo(directorio, escala, semilla, meses)
+            if consultas is None:
+                return None
+            if verbose:
+                print("Escala " + str(escala) + ": " + str(len(consultas)) + " consultas de desarrollo.py")
+            for consulta in consultas:
+                if seleccionadas is not None and consulta['name'] not in seleccionadas:
+                    continue
+                textos = [(consulta['name'], None)] + [(consulta['name'] + ' (alternativa ' + str(i + 1) + ')', texto)
+                                                       for i, texto in enumerate(alternativas.get(consulta['name'], []))]
+                original = None
+                for nombre, texto in textos:
+                    medicion = medirConsulta(consulta, repeticiones, texto, limite_segundos)
+                    original = medicion if original is None else original
+                    filas.append({'escala': escala, 'consulta': nombre, 'etapa': consulta['etapa'],
+                                  'linea': consulta['linea'],
+                                  'tablas': ', '.join(t + ' (' + str(len(df)) + ')' for t, df in consulta['tablas'].items()),
+                                  'filas_entrada': sum(len(df) for df in consulta['tablas'].values()),
+                                  'segundos': medicion['segundos'], 'memoria_mb': medicion['memoria_mb'],
+                                  'filas_resultado': medicion['filas_resultado'],
+                                  'mismo_resultado': medicion['hash_resultado'] == original['hash_resultado'] and
+                                                     medicion['filas_resultado'] == original['filas_resultado'],
+                                  'estado': medicion['estado']})
+                    if verbose and medicion['estado'] != 'ok':
+                        print("ATENCIÓN: la consulta " + nombre + " (escala " + str(escala) + "): " + medicion['estado'])
+                    if verbose and not filas[-1]['mismo_resultado'] and medicion['estado'] == 'ok':
+                        print("ATENCIÓN: " + nombre + " no da el mismo resultado que la consulta original.")
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    return pd.DataFrame(filas)
+
+
+# Una fila por consulta: segundos a cada escala, exponente de escala (respecto
+# de las filas de entrada) y memoria y filas del resultado a la mayor escala.
+# Se ordena de la consulta más lenta a la más rápida a la mayor escala.
+def resumenDeConsultas(resultados):
+    segundos = resultados.pivot(index='consulta', columns='escala', values='segundos')
+    segundos.columns = ['seg. escala ' + str(escala) for escala in segundos.columns]
+    exponentes = resultados.groupby('consulta').apply(
+        lambda r: benchmark.exponenteDeEscala(r['filas_entrada'], r['segundos']))
+    mayor = resultados[resultados['escala'] == resultados['escala'].max()].set_index('consulta')
+    resumen = segundos.assign(exponente=exponentes, memoria_mb=mayor['memoria_mb'],
+                              filas_resultado=mayor['filas_resultado'], estado=mayor['estado'])
+    return resumen.sort_values(segundos.columns[-1], ascending=False).round(4)
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide las consultas SQL de desarrollo.py sobre fuentes sintéticas a varias escalas.')
+    parser.add_argument('--escalas', default=','.join(str(e) for e in ESCALAS),
+                        help='escalas separadas por comas, de 1 a 1000 (por defecto, ' + ','.join(str(e) for e in ESCALAS) + ')')
+    parser.add_argument('--consultas', default=None, help='consultas a medir, separadas por comas (por defecto, todas)')
+    parser.add_argument('--alternativa', action='append', default=[], metavar='CONSULTA=ARCHIVO',
+                        help='mide también el SQL de ARCHIVO sobre las entradas de CONSULTA (se puede repetir)')
+    parser.add_argument('--listar', action='store_true', help='lista las consultas de desarrollo.py (a escala 1) y termina')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES, help='repeticiones por medición; vale la menor')
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--meses', type=int, default=MESES, help='meses de salarios de las fuentes sintéticas')
+    parser.add_argument('--limite-segundos', type=float, default=LIMITE_SEGUNDOS,
+                        help='tiempo máximo de una repetición de una consulta')
+    parser.add_argument('--directorio', default=benchmark.directorio_benchmarks,
+                        help='directorio del historial (por defecto, cache/benchmarks)')
+    args = parser.parse_args()
+
+    if args.listar:
+        directorio = tempfile.mkdtemp(prefix='benchmark_consultas_')
+        try:
+            consultas = consultasDeDesarrollo(directorio, 1, args.semilla, args.meses)
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        for consulta in consultas:
+            print(consulta['name'] + ' (' + consulta['etapa'] + ', línea ' + str(consulta['linea']) + '): ' +
+                  ', '.join(consulta['tablas']) + ' -> ' + str(consulta['filas_resultado']) + ' filas')
+        sys.exit(0)
+
+    alternativas = dict()
+    for alternativa in args.alternativa:
+        nombre, archivo = alternativa.split('=', 1)
+        with open(archivo, encoding='utf-8') as f:
+            alternativas.setdefault(nombre, []).append(f.read())
+    seleccionadas = None if args.consultas is None else args.consultas.split(',') + list(alternativas)
+    escalas = [float(e) if '.' in e else int(e) for e in args.escalas.split(',')]
+
+    resultados = correrConsultas(escalas, args.semilla, args.meses, args.repeticiones, seleccionadas,
+                                 alternativas, args.limite_segundos)
+    if resultados is None:
+        sys.exit(2)
+    if len(resultados) == 0:
+        print("ERROR: ninguna consulta de desarrollo.py coincide con " + args.consultas + " (ver --listar).")
+        sys.exit(2)
+    print("")
+    print(resumenDeConsultas(resultados).to_string())
+    benchmark.agregarAlHistorial(os.path.join(args.directorio, 'consultas.json'),
+                                 {'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+                                  'entorno': {'python': platform.python_version(), 'pandas': pd.__version__,
+                                              'duckdb': duckdb.__version__},
+                                  'escalas': escalas, 'semilla': args.semilla, 'meses': args.meses,
+                                  'repeticiones': args.repeticiones,
+                                  'resultados': resultados.to_dict(orient='records')})
@@ -15,7 +15,871 @@
 # =============================================================================
 import pandas as pd
 import numpy as np
-from inline_sql import sql, sql_val
+import hashlib
+import re
+import multiprocessing
+import concurrent.futures
+import os
+import io
+import json
+import inspect
+import contextlib
+import duckdb
+# inline_sql, seaborn y matplotlib se importan dentro de las funciones que los
+# usan: así, importar este módulo (por ejemplo, para ejecutar solo algunas
+# etapas de desarrollo.py) no paga lo que tardan en cargarse.
+
+# =============================================================================
+# FUNCIONES PARA LA CARGA DE DATOS
+# =============================================================================
+
+### Parsear los CSV de las fuentes (y transcodificar el padrón desde 
+### windows-1252) es lo más costoso de cada corrida. Por eso guardamos una 
+### copia columnar de cada tabla en formato Arrow IPC, identificada por el hash
+### del contenido del CSV y del esquema aplicado. Mientras ninguno de los dos
+### cambie, las corridas siguientes leen esa copia mapeándola en memoria en
+### lugar de volver a parsear.
+### Requiere pyarrow; si no está instalado, se lee el CSV como siempre.
+
+def hashDeArchivo(ruta, tam_bloque=2**20):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+## ESTRUCTURA:
+# esquema:
+#    'columna_i' = tipo_columna_i (cualquier tipo aceptado por DataFrame.astype)
+# Las columnas del dataframe que no figuran en el esquema conservan el tipo
+# inferido por pandas.
+def aplicarEsquema(df, esquema):
+    tipos = dict()
+    for col, tipo in esquema.items():
+        if col in df.columns:
+            tipos[col] = tipo
+        else:
+            print("ATENCIÓN: la columna " + col + " del esquema no existe en el dataframe.")
+    return df.astype(tipos)
+
+
+def memoriaEnMB(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+# Arrow devuelve None en los strings faltantes; el resto del código espera
+# np.nan (igual que pd.read_csv), e incluso compara con 'is'.
+def faltantesComoNaN(df):
+    for col in df.columns[df.dtypes == object]:
+        valores = df[col].to_numpy(copy=True)
+        valores[pd.isna(valores)] = np.nan
+        df[col] = valores
+    return df
+
+
+def cargarTabla(dict_df, directorio_cache=None, verbose=True):
+    """
+    Carga en dict_df['df'] la tabla de la fuente descripta por dict_df,
+    aplicando el esquema declarado en dict_df['esquema'] (si existe).
+    Deja en dict_df['memoria'] la memoria en MB que ocupa la tabla con los 
+    tipos inferidos por pandas ('sin_esquema') y con el esquema aplicado
+    ('con_esquema'), y en dict_df['hash'] un identificador de la versión de
+    la tabla.
+    
+    Argumentos:
+        dict_df = metadata de la fuente. Debe contener las entradas 'name',
+            'csv' y 'encoding'.
+        directorio_cache = directorio donde se guardan las copias en
+            formato Arrow. Si es None, se lee directamente el CSV.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        pa = None
+    esquema = dict_df.get('esquema', {})
+    # Identifica la versión de la tabla: contenido del CSV, encoding y esquema
+    clave = hashDeArchivo(dict_df['csv']) + dict_df['encoding'] + str(sorted(esquema.items()))
+    dict_df['hash'] = hashlib.sha256(clave.encode()).hexdigest()
+
+    if directorio_cache is None or pa is None:
+        df = pd.read_csv(dict_df['csv'], encoding=dict_df['encoding'])
+        memoria_sin_esquema = memoriaEnMB(df)
+        df = aplicarEsquema(df, esquema)
+        origen = "el CSV"
+    else:
+        prefijo = dict_df['name'] + '-'
+        ruta_cache = os.path.join(directorio_cache, prefijo + dict_df['hash'][:20] + '.arrow')
+
+        if os.path.exists(ruta_cache):
+            tabla = feather.read_table(ruta_cache, memory_map=True)
+            memoria_sin_esquema = float(tabla.schema.metadata[b'memoria_sin_esquema'])
+            df = faltantesComoNaN(tabla.to_pandas())
+            origen = "la caché " + ruta_cache
+        else:
+            df = pd.read_csv(dict_df['csv'], encoding=dict_df['encoding'])
+            memoria_sin_esquema = memoriaEnMB(df)
+            df = aplicarEsquema(df, esquema)
+            origen = "el CSV"
+            os.makedirs(directorio_cache, exist_ok=True)
+            # Borramos las copias correspondientes a versiones anteriores del CSV
+            for archivo in os.listdir(directorio_cache):
+                if archivo.startswith(prefijo) and archivo.endswith('.arrow'):
+                    os.remove(os.path.join(directorio_cache, archivo))
+            try:
+                tabla = pa.Table.from_pandas(df)
+                metadata = dict(tabla.schema.metadata)
+                metadata[b'memoria_sin_esquema'] = str(memoria_sin_esquema).encode()
+                tabla = tabla.replace_schema_metadata(metadata)
+                # Sin compresión, para que luego se pueda mapear en memoria
+                feather.write_feather(tabla, ruta_cache + '.tmp', compression='uncompressed')
+                os.replace(ruta_cache + '.tmp', ruta_cache)
+                origen += " (guardada en la caché " + ruta_cache + ")"
+            except (pa.ArrowException, ValueError) as e:
+                # Por ejemplo, columnas con tipos mezclados que Arrow no admite
+                if os.path.exists(ruta_cache + '.tmp'):
+                    os.remove(ruta_cache + '.tmp')
+                print("ATENCIÓN: no se pudo guardar la tabla " + dict_df['name'] + " en la caché (" + str(e) + ").")
+
+    dict_df['df'] = df
+    dict_df['memoria'] = {'sin_esquema': memoria_sin_esquema, 'con_esquema': memoriaEnMB(df)}
+    if verbose:
+        print("Tabla " + dict_df['name'] + ": leída desde " + origen + ". Memoria: " +
+              str(round(dict_df['memoria']['sin_esquema'], 2)) + " MB sin esquema, " +
+              str(round(dict_df['memoria']['con_esquema'], 2)) + " MB con esquema.")
+    return df
+
+
+# =============================================================================
+# FUNCIONES PARA LA BASE DE DATOS PERSISTENTE
+# =============================================================================
+
+### Las relaciones normalizadas se guardan en un archivo de DuckDB, de manera
+### que las corridas siguientes no tengan que volver a derivarlas.
+
+def leerRelacion(ruta_base, nombre_relacion):
+    return leerRelaciones(ruta_base, [nombre_relacion])[nombre_relacion]
+
+
+def leerRelaciones(ruta_base, lista_de_relaciones):
+    con = duckdb.connect(ruta_base, read_only=True)
+    try:
+        return {nombre: con.execute('SELECT * FROM ' + nombre).df() for nombre in lista_de_relaciones}
+    finally:
+        con.close()
+
+
+# Identifica la combinación de versiones de un conjunto de tablas fuente
+# (requiere que hayan sido cargadas con cargarTabla) y, opcionalmente, del 
+# proceso que se les aplica: lista_de_textos puede llevar, por ejemplo, el 
+# código que deriva las relaciones y sus parámetros.
+def claveDeFuentes(lista_tablas, lista_de_textos=[]):
+    h = hashlib.sha256(''.join(tabla['hash'] for tabla in lista_tablas).encode())
+    for texto in lista_de_textos:
+        h.update(texto.encode())
+    return h.hexdigest()
+
+
+# Indica si la base ya tiene las relaciones normalizadas derivadas de las 
+# fuentes identificadas por clave_fuentes.
+def baseNormalizadaVigente(ruta_base, clave_fuentes):
+    if not os.path.exists(ruta_base):
+        return False
+    con = duckdb.connect(ruta_base, read_only=True)
+    try:
+        consultaSQL = "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'vigencia_normalizacion'"
+        if con.execute(consultaSQL).fetchone()[0] == 0:
+            return False
+        consultaSQL = "SELECT COUNT(*) FROM vigencia_normalizacion WHERE clave = ?"
+        return con.execute(consultaSQL, [clave_fuentes]).fetchone()[0] > 0
+    finally:
+        con.close()
+
+
+# Indica si las columnas de la lista clave no tienen NULL ni valores repetidos
+# en la relación (registrada en la conexión con).
+def cumpleClavePrimaria(con, nombre_relacion, clave):
+    lista_cols = ', '.join('"' + col + '"' for col in clave)
+    consultaSQL = ('SELECT COUNT(*) FROM (SELECT ' + lista_cols + ' FROM ' + nombre_relacion +
+                   ' GROUP BY ' + lista_cols + ' HAVING COUNT(*) > 1)')
+    if con.execute(consultaSQL).fetchone()[0] > 0:
+        return False
+    consultaSQL = ('SELECT COUNT(*) FROM ' + nombre_relacion + ' WHERE ' +
+                   ' OR '.join('"' + col + '" IS NULL' for col in clave))
+    return con.execute(consultaSQL).fetchone()[0] == 0
+
+
+## ESTRUCTURA:
+# relaciones:
+#    'nombre_relacion' = dataframe con las tuplas de la relación
+# claves_primarias:
+#    'nombre_relacion' = lista de columnas de la clave primaria de la relación
+# Las relaciones se guardan con su clave primaria. Si los datos no la cumplen,
+# se informa y se guarda con una restricción UNIQUE sobre todas sus columnas
+# (las relaciones provienen de SELECT DISTINCT).
+def materializarRelaciones(ruta_base, relaciones, claves_primarias, clave_fuentes, verbose=True):
+    con = duckdb.connect(ruta_base)
+    try:
+        con.execute("BEGIN TRANSACTION")
+        for nombre, df in relaciones.items():
+            con.register('relacion', df)
+            columnas = []
+            for fila in con.execute("DESCRIBE SELECT * FROM relacion").fetchall():
+                col, tipo = fila[0], fila[1]
+                # Las categorías de pandas llegan como ENUM; las guardamos como texto
+                if tipo.startswith('ENUM'):
+                    tipo = 'VARCHAR'
+                columnas.append('"' + col + '" ' + tipo)
+            clave = claves_primarias.get(nombre, [])
+            if len(clave) > 0 and not cumpleClavePrimaria(con, 'relacion', clave):
+                print("ATENCIÓN: la relación " + nombre + " no cumple su clave primaria " + 
+                      str(clave) + "; se guarda con UNIQUE sobre todas sus columnas.")
+                clave = []
+            if len(clave) > 0:
+                restriccion = 'PRIMARY KEY (' + ', '.join('"' + col + '"' for col in clave) + ')'
+            else:
+                restriccion = 'UNIQUE (' + ', '.join('"' + col + '"' for col in df.columns) + ')'
+            con.execute('DROP TABLE IF EXISTS ' + nombre)
+            con.execute('CREATE TABLE ' + nombre + ' (' + ', '.join(columnas + [restriccion]) + ')')
+            con.execute('INSERT INTO ' + nombre + ' SELECT * FROM relacion')
+            con.unregister('relacion')
+        con.execute("CREATE OR REPLACE TABLE vigencia_normalizacion (clave VARCHAR)")
+        con.execute("INSERT INTO vigencia_normalizacion VALUES (?)", [clave_fuentes])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+    if verbose:
+        print("Se guardaron " + str(len(relaciones)) + " relaciones normalizadas en " + ruta_base)
+
+
+### La fuente de salarios crece un mes (una fecha) por vez, agregando filas al
+### final del CSV. En lugar de volver a procesarla entera, recordamos hasta qué
+### byte del CSV y hasta qué fecha ya procesamos, y solo leemos (en chunks) lo
+### que se agregó después. Si el CSV no fue extendido sino reescrito, se 
+### recorre entero pero solo se agregan las filas con fecha posterior a la 
+### última procesada. Para reconstruir todo desde cero alcanza con borrar la
+### base.
+# Cantidad de bytes previos al último byte procesado que usamos para reconocer
+# que el CSV solo fue extendido.
+TAM_FIRMA_INGESTA = 4096
+
+def firmaDeArchivo(ruta, hasta_byte):
+    with open(ruta, 'rb') as f:
+        encabezado = f.readline()
+        f.seek(max(0, hasta_byte - TAM_FIRMA_INGESTA))
+        cola = f.read(min(hasta_byte, TAM_FIRMA_INGESTA))
+    return hashlib.sha256(encabezado + cola).hexdigest()
+
+
+def ingestarSalariosIncremental(dict_df, ruta_base, tam_chunk=500000, verbose=True):
+    """
+    Agrega a las relaciones salarios_norm y depto_prov_sal_norm de la base
+    ruta_base las filas del CSV de salarios que todavía no fueron procesadas,
+    y actualiza el cubo de salarios (salarios_cubo, ver más abajo) con las 
+    fechas nuevas. Devuelve la cantidad de filas nuevas agregadas a 
+    salarios_norm.
+    
+    Argumentos:
+        dict_df = metadata de la fuente de salarios ('name', 'csv',
+            'encoding' y opcionalmente 'esquema').
+        ruta_base = archivo de DuckDB donde se persisten las relaciones.
+        tam_chunk = cantidad de filas del CSV procesadas por vez.
+    """
+    # Las categorías no sirven para ir agregando chunks (cada chunk tendría
+    # las suyas); esas columnas se leen como texto.
+    tipos = {col: tipo for col, tipo in dict_df.get('esquema', {}).items() if tipo != 'category'}
+    with open(dict_df['csv'], 'rb') as f:
+        columnas = pd.read_csv(io.BytesIO(f.readline()), encoding=dict_df['encoding']).columns
+    tam_archivo = os.path.getsize(dict_df['csv'])
+
+    con = duckdb.connect(ruta_base)
+    try:
+        con.execute("""CREATE TABLE IF NOT EXISTS salarios_norm (fecha VARCHAR, 
+                       codigo_departamento_indec INTEGER, clae2 TINYINT, w_median FLOAT)""")
+        con.execute("""CREATE TABLE IF NOT EXISTS depto_prov_sal_norm (
+                       codigo_departamento_indec INTEGER, id_provincia_indec TINYINT)""")
+        con.execute("""CREATE TABLE IF NOT EXISTS ingesta_salarios (csv VARCHAR, 
+                       ultima_fecha VARCHAR, bytes_procesados BIGINT, firma VARCHAR)""")
+        estado = con.execute("SELECT ultima_fecha, bytes_procesados, firma FROM ingesta_salarios WHERE csv = ?",
+                             [dict_df['csv']]).fetchone()
+
+        if estado is None:
+            # Primera ingesta: se procesa todo el CSV
+            ultima_fecha, desde_byte = None, 0
+            chunks = pd.read_csv(dict_df['csv'], encoding=dict_df['encoding'], dtype=tipos, chunksize=tam_chunk)
+            modo = "ingesta completa"
+        else:
+            ultima_fecha, bytes_procesados, firma = estado
+            if tam_archivo >= bytes_procesados and firmaDeArchivo(dict_df['csv'], bytes_procesados) == firma:
+                # El CSV solo fue extendido: leemos únicamente los bytes nuevos
+                desde_byte = bytes_procesados
+                with open(dict_df['csv'], 'rb') as f:
+                    f.seek(desde_byte)
+                    nuevos = f.read(tam_archivo - desde_byte)
+                chunks = pd.read_csv(io.BytesIO(nuevos), encoding=dict_df['encoding'], header=None,
+                                     names=columnas, dtype=tipos, chunksize=tam_chunk) if len(nuevos.strip()) > 0 else []
+                modo = "ingesta de las filas agregadas al final del CSV"
+            else:
+                # El CSV fue reescrito: recorremos todo, filtrando por fecha
+                desde_byte = 0
+                chunks = pd.read_csv(dict_df['csv'], encoding=dict_df['encoding'], dtype=tipos, chunksize=tam_chunk)
+                modo = "ingesta de las fechas posteriores a " + str(ultima_fecha) + " (el CSV fue reescrito)"
+
+        filas_agregadas = 0
+        nueva_ultima_fecha = ultima_fecha
+        for chunk in chunks:
+            if desde_byte == 0 and ultima_fecha is not None:
+                chunk = chunk[chunk['fecha'] > ultima_fecha]
+            if len(chunk) == 0:
+                continue
+            con.register('chunk', chunk)
+            # Mantenemos la semántica de SELECT DISTINCT de la normalización,
+            # comparando solo contra las fechas nuevas (las anteriores no
+            # pueden repetirse).
+            antes = con.execute("SELECT COUNT(*) FROM salarios_norm").fetchone()[0]
+            consultaSQL = """INSERT INTO salarios_norm
+                             SELECT DISTINCT CAST(fecha AS VARCHAR), codigo_departamento_indec, clae2, w_median
+                             FROM chunk
+                             EXCEPT
+                             SELECT * FROM salarios_norm WHERE fecha >= (SELECT MIN(CAST(fecha AS VARCHAR)) FROM chunk)"""
+            con.execute(consultaSQL)
+            filas_agregadas += con.execute("SELECT COUNT(*) FROM salarios_norm").fetchone()[0] - antes
+            con.execute("""INSERT INTO depto_prov_sal_norm
+                           SELECT DISTINCT codigo_departamento_indec, id_provincia_indec FROM chunk
+                           EXCEPT
+                           SELECT * FROM depto_prov_sal_norm""")
+            max_chunk = str(chunk['fecha'].max())
+            if nueva_ultima_fecha is None or max_chunk > nueva_ultima_fecha:
+                nueva_ultima_fecha = max_chunk
+            con.unregister('chunk')
+
+        actualizarCuboDeSalarios(con, ultima_fecha)
+
+        con.execute("DELETE FROM ingesta_salarios WHERE csv = ?", [dict_df['csv']])
+        con.execute("INSERT INTO ingesta_salarios VALUES (?, ?, ?, ?)",
+                    [dict_df['csv'], nueva_ultima_fecha, tam_archivo, firmaDeArchivo(dict_df['csv'], tam_archivo)])
+    finally:
+        con.close()
+    if verbose:
+        print("Salarios (" + modo + "): " + str(filas_agregadas) + " filas nuevas en salarios_norm. Última fecha procesada: " + str(nueva_ultima_fecha))
+    return filas_agregadas
+
+
+
+## ESTRUCTURA: cubo de salarios
+# Relación salarios_cubo de la base, con una tupla por cada combinación de
+# fecha, provincia, departamento y clae2 que tenga salarios válidos (w_median
+# positivo) en salarios_norm:
+#   fecha, anio, mes, id_provincia_indec, codigo_departamento_indec, clae2 
+#   cantidad        = cantidad de salarios válidos
+#   suma            = suma de los salarios válidos
+#   suma_cuadrados  = suma de sus cuadrados
+# Como las tres medidas se pueden sumar, el promedio y el desvío de cualquier 
+# agrupación más gruesa salen de sumarlas (ver consultarCubo), sin volver a 
+# recorrer salarios_norm.
+
+
+# Recalcula las tuplas del cubo con fecha posterior a desde_fecha (todas, si es
+# None o si el cubo todavía no existe). Usa la conexión abierta de la ingesta.
+def actualizarCuboDeSalarios(con, desde_fecha=None):
+    existe = con.execute("""SELECT COUNT(*) FROM information_schema.tables 
+                            WHERE table_name = 'salarios_cubo'""").fetchone()[0] > 0
+    if not existe:
+        con.execute("""CREATE TABLE salarios_cubo (fecha VARCHAR, anio SMALLINT, mes TINYINT,
+                       id_provincia_indec TINYINT, codigo_departamento_indec INTEGER, clae2 TINYINT,
+                       cantidad BIGINT, suma DOUBLE, suma_cuadrados DOUBLE)""")
+        desde_fecha = None
+    if desde_fecha is None:
+        desde_fecha = ''
+    con.execute("DELETE FROM salarios_cubo WHERE fecha > ?", [desde_fecha])
+    con.execute("""INSERT INTO salarios_cubo
+                   SELECT s.fecha, CAST(SUBSTRING(s.fecha, 1, 4) AS SMALLINT), CAST(SUBSTRING(s.fecha, 6, 2) AS TINYINT),
+                          d.id_provincia_indec, s.codigo_departamento_indec, s.clae2,
+                          COUNT(*), SUM(CAST(s.w_median AS DOUBLE)), SUM(CAST(s.w_median AS DOUBLE) * CAST(s.w_median AS DOUBLE))
+                   FROM salarios_norm AS s, depto_prov_sal_norm AS d
+                   WHERE s.fecha > ? AND s.w_median > 0
+                       AND s.codigo_departamento_indec = d.codigo_departamento_indec
+                   GROUP BY s.fecha, d.id_provincia_indec, s.codigo_departamento_indec, s.clae2""", [desde_fecha])
+
+
+def consultarCubo(cubo, niveles=[], filtros={}):
+    """
+    Agrupa el cubo de salarios por las columnas de niveles y retorna, para cada
+    grupo, la cantidad de salarios, su promedio y su desvío estándar (muestral,
+    como STDDEV de SQL). Los resultados salen ordenados por los niveles.
+    
+    Argumentos:
+        cubo = dataframe con el cubo de salarios (relación salarios_cubo).
+        niveles = lista de columnas del cubo por las que se agrupa: 'anio', 
+            'mes', 'fecha', 'id_provincia_indec', 'codigo_departamento_indec' 
+            y/o 'clae2'. Si es vacía, se obtiene un único grupo con todo.
+        filtros = diccionario columna -> valor (o lista de valores) que deben 
+            cumplir las tuplas del cubo que se agrupan.
+    """
+    seleccion = np.ones(len(cubo), dtype=bool)
+    for col, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set, pd.Series, np.ndarray)):
+            seleccion &= cubo[col].isin(list(valor)).to_numpy()
+        else:
+            seleccion &= (cubo[col] == valor).to_numpy()
+    medidas = cubo.loc[seleccion, list(niveles) + ['cantidad', 'suma', 'suma_cuadrados']]
+    if len(niveles) > 0:
+        res = medidas.groupby(list(niveles), sort=True, observed=True)[['cantidad', 'suma', 'suma_cuadrados']].sum().reset_index()
+    else:
+        res = medidas[['cantidad', 'suma', 'suma_cuadrados']].sum().to_frame().T
+    n = res['cantidad'].astype(float)
+    res['promedio'] = res['suma'] / n
+    varianza = (res['suma_cuadrados'] - res['suma'] * res['promedio']) / (n - 1)
+    res['desvio'] = np.sqrt(varianza.clip(lower=0).where(n > 1))
+    return res[list(niveles) + ['cantidad', 'promedio', 'desvio']]
+
+
+# Para cada clae2 de lista_de_claes y cada provincia, la cantidad de 
+# establecimientos (vista cant_op_clae_por_prov) y el salario promedio de la 
+# fecha dada (a partir del cubo). Resuelve todas las clae2 a la vez, en lugar 
+# de una consulta por clae2; las tuplas salen ordenadas por clae2 y salario.
+#   clae2, provincia, cantidad_establecimientos, salario_promedio_provincial
+def operadoresYSalarioPorProvincia(cubo, cant_op_clae_por_prov, provincias_indec, lista_de_claes, fecha='2022-12-01'):
+    from inline_sql import sql
+    prov_clae_w_median_cubo = consultarCubo(cubo, ['clae2', 'id_provincia_indec'],
+                                            {'fecha': fecha, 'clae2': lista_de_claes})
+    consultaSQL = """
+                SELECT c.clae2, p.id_provincia_indec, p.nombre_provincia_indec, c.promedio AS salario_promedio_provincial
+                FROM prov_clae_w_median_cubo AS c, provincias_indec AS p
+                WHERE c.id_provincia_indec = p.id_provincia_indec
+            """
+    prov_clae_w_median_avg = sql ^ consultaSQL
+    consultaSQL = """
+                SELECT DISTINCT c.clae2, p.nombre_provincia_indec AS provincia, c.cantidad_establecimientos, p.salario_promedio_provincial
+                FROM cant_op_clae_por_prov AS c, prov_clae_w_median_avg AS p
+                WHERE c.clae2 = p.clae2 AND c.provincia_id = p.id_provincia_indec
+                ORDER BY c.clae2, p.salario_promedio_provincial
+                """
+    prov_cant_op_y_salario_prom_por_clae = sql ^ consultaSQL
+    return prov_cant_op_y_salario_prom_por_clae
+
+
+# Salario promedio anual de cada provincia en el año dado y su desvío: el 
+# promedio (y el desvío estándar) de los salarios promedio de la provincia en 
+# cada clae2, a partir del cubo. Cada departamento aporta todos sus salarios, 
+# aunque coincidan con los de otro departamento de la provincia.
+#   nombre_provincia_indec, salario_promedio, desvio_estandar
+def salarioPromedioPorProvincia(cubo, provincias_indec, anio=2022):
+    from inline_sql import sql
+    salarios_prom_por_prov_y_clae2 = consultarCubo(cubo, ['id_provincia_indec', 'clae2'], {'anio': anio})
+    consultaSQL = """ 
+                    SELECT DISTINCT prov.nombre_provincia_indec, AVG(s.promedio) AS salario_promedio, STDDEV(s.promedio) AS desvio_estandar
+                    FROM salarios_prom_por_prov_y_clae2 AS s, provincias_indec AS prov
+                    WHERE s.id_provincia_indec = prov.id_provincia_indec
+                    GROUP BY prov.nombre_provincia_indec
+                """
+    salario_promedio_y_sd = sql ^ consultaSQL
+    return salario_promedio_y_sd
+
+
+
+## ESTRUCTURA: conteos de operadores
+# Vistas materializadas en la base con la cantidad de operadores por 
+# provincia, por clae2 y provincia, y por departamento y provincia:
+#   cant_operadores_por_prov   = provincia, cantidad_operadores
+#   cant_op_clae_por_prov      = clae2, provincia_id, cantidad_establecimientos
+#   cant_est_por_depto         = departamento, provincia_id, cant_establecimientos
+# Por cada vista se guarda también el aporte de cada operador a los conteos
+# (aportes_<vista>), y en conteos_operadores_firmas una firma de sus tuplas en
+# locacion_establecimientos y establecimientos_datos. Los operadores se 
+# identifican por (razon_social, establecimiento), ya que los ids se asignan de
+# nuevo en cada carga del padrón. Distintos operadores pueden compartir ese par
+# (con establecimiento NULL o indefinido, añadirIDs les da una id por fila), así
+# que la clave lleva además el orden de la id dentro de los operadores con el
+# mismo par.
+
+VISTAS_DE_OPERADORES = {'cant_operadores_por_prov': (['provincia'], 'cantidad_operadores'),
+                        'cant_op_clae_por_prov': (['clae2', 'provincia_id'], 'cantidad_establecimientos'),
+                        'cant_est_por_depto': (['departamento', 'provincia_id'], 'cant_establecimientos')}
+
+
+# Hash (uint64) de cada tupla del dataframe. Los valores se llevan antes a una
+# forma canónica (números a float, el resto a texto, NULL a un mismo valor) 
+# para que el hash no dependa de si la tabla viene de una consulta o de la base.
+def hashDeTuplas(df):
+    canonico = dict()
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            canonico[col] = df[col].astype('float64')
+        else:
+            canonico[col] = df[col].astype(object).where(df[col].notna(), '\0').astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(canonico, index=df.index), index=False).to_numpy()
+
+# Suma (módulo 2**64) de los hashes de las tuplas de cada grupo: no depende del
+# orden de las tuplas, así que sirve de firma de un conjunto de tuplas.
+def firmaPorGrupo(df, grupos):
+    return pd.Series(hashDeTuplas(df), index=df.index).groupby(grupos, dropna=False).sum()
+
+
+# Aportes de cada operador (clave_operador) a los conteos de las tres vistas
+def aportesDeOperadores(establecimientos_datos, locacion_establecimientos, rcc, provincias_indec):
+    e, l = establecimientos_datos, locacion_establecimientos
+    aportes = dict()
+    con_datos = l[l['id_razon_social_establecimiento'].isin(e['id_razon_social_establecimiento'])]
+    provincias = con_datos[['clave_operador', 'provincia_id']].drop_duplicates().merge(
+        provincias_indec[['id_provincia_indec', 'nombre_provincia_indec']], left_on='provincia_id', right_on='id_provincia_indec')
+    provincias = provincias.rename(columns={'nombre_provincia_indec': 'provincia'})[['clave_operador', 'provincia']].drop_duplicates()
+    aportes['cant_operadores_por_prov'] = provincias.groupby(['clave_operador', 'provincia'], dropna=False, observed=True).size()
+    rubros = e[['id_razon_social_establecimiento', 'id_rubro']].merge(rcc[['id_rubro', 'clae2']], on='id_rubro')
+    claes = rubros.merge(l[['id_razon_social_establecimiento', 'clave_operador', 'provincia_id']], on='id_razon_social_establecimiento')
+    aportes['cant_op_clae_por_prov'] = claes.groupby(['clave_operador', 'clae2', 'provincia_id'], dropna=False, observed=True).size()
+    aportes['cant_est_por_depto'] = l.groupby(['clave_operador', 'departamento', 'provincia_id'], dropna=False, observed=True).size()
+    # Las columnas categóricas se guardan como valores comunes, para poder 
+    # juntar aportes de distintas corridas
+    res = dict()
+    for vista, serie in aportes.items():
+        res[vista] = serie.rename('cantidad').reset_index()
+        for col in res[vista].columns:
+            if isinstance(res[vista][col].dtype, pd.CategoricalDtype):
+                res[vista][col] = res[vista][col].astype(res[vista][col].cat.categories.dtype)
+    return res
+
+
+def actualizarConteosDeOperadores(ruta_base, establecimientos_datos, locacion_establecimientos, rcc, provincias_indec, verbose=True):
+    """
+    Actualiza en la base ruta_base las vistas con los conteos de operadores 
+    (ver estructura arriba) y las retorna en un diccionario nombre -> dataframe.
+    Solo se recalculan los aportes de los operadores agregados, quitados o 
+    modificados respecto de la versión del padrón de la corrida anterior; si
+    cambiaron rcc o provincias_indec, se recalculan todos.
+    
+    Argumentos:
+        ruta_base = archivo de DuckDB donde se persisten las vistas.
+        establecimientos_datos, locacion_establecimientos, rcc, 
+        provincias_indec = relaciones normalizadas actuales.
+    """
+    e = establecimientos_datos
+    l = locacion_establecimientos
+    # Clave de cada operador a partir de su razón social, su establecimiento y
+    # el orden de su id entre los operadores con esos mismos valores
+    operadores = e[['id_razon_social_establecimiento', 'razon_social', 'establecimiento']].drop_duplicates(
+        'id_razon_social_establecimiento').sort_values('id_razon_social_establecimiento')
+    operadores['orden'] = operadores.groupby(['razon_social', 'establecimiento'], dropna=False).cumcount()
+    claves = pd.Series(hashDeTuplas(operadores[['razon_social', 'establecimiento', 'orden']]),
+                       index=operadores['id_razon_social_establecimiento'])
+    e = e.assign(clave_operador=e['id_razon_social_establecimiento'].map(claves))
+    l = l.assign(clave_operador=l['id_razon_social_establecimiento'].map(claves)).dropna(subset=['clave_operador'])
+    l['clave_operador'] = l['clave_operador'].astype(np.uint64)
+    sin_id = lambda df: df.drop(columns=['id_razon_social_establecimiento', 'clave_operador'])
+    firmas = (firmaPorGrupo(sin_id(e), e['clave_operador']) * np.uint64(3) 
+              + firmaPorGrupo(sin_id(l), l['clave_operador']).reindex(claves.unique(), fill_value=0)).rename('firma')
+    firmas = firmas.rename_axis('clave_operador').reset_index()
+    firma_dimensiones = str(np.concatenate([hashDeTuplas(rcc), hashDeTuplas(provincias_indec)]).sum())
+
+    con = duckdb.connect(ruta_base)
+    try:
+        existe = con.execute("""SELECT COUNT(*) FROM information_schema.tables 
+                                WHERE table_name = 'conteos_operadores_dimensiones'""").fetchone()[0] > 0
+        if existe and con.execute("SELECT firma FROM conteos_operadores_dimensiones").fetchone()[0] == firma_dimensiones:
+            firmas_previas = con.execute("SELECT * FROM conteos_operadores_firmas").df()
+            vistas = {vista: con.execute('SELECT * FROM ' + vista).df() for vista in VISTAS_DE_OPERADORES}
+            modo = "actualización"
+        else:
+            firmas_previas = pd.DataFrame({'clave_operador': pd.Series(dtype=np.uint64), 'firma': pd.Series(dtype=np.uint64)})
+            vistas = None
+            modo = "cálculo completo"
+
+        # Operadores agregados, quitados o modificados
+        comparacion = firmas.merge(firmas_previas, on='clave_operador', how='outer', suffixes=('', '_previa'), indicator=True)
+        cambiados = comparacion.loc[(comparacion['_merge'] != 'both') | (comparacion['firma'] != comparacion['firma_previa']), 'clave_operador']
+        cambiados = cambiados.astype(np.uint64)
+        con.register('cambiados', pd.DataFrame({'clave_operador': cambiados}))
+
+        nuevos_aportes = aportesDeOperadores(e[e['clave_operador'].isin(cambiados)], l[l['clave_operador'].isin(cambiados)],
+                                             rcc, provincias_indec)
+        res = dict()
+        for vista, (grupos, columna) in VISTAS_DE_OPERADORES.items():
+            nuevos = nuevos_aportes[vista]
+            con.register('nuevos', nuevos)
+            if vistas is None:
+                con.execute('CREATE OR REPLACE TABLE aportes_' + vista + ' AS SELECT * FROM nuevos')
+                partes = [nuevos[grupos + ['cantidad']]]
+            else:
+                # conteo previo + aportes nuevos - aportes previos de los operadores cambiados
+                previos = con.execute('SELECT a.* FROM aportes_' + vista + ' AS a, cambiados AS c WHERE a.clave_operador = c.clave_operador').df()
+                con.execute('DELETE FROM aportes_' + vista + ' WHERE clave_operador IN (SELECT clave_operador FROM cambiados)')
+                con.execute('INSERT INTO aportes_' + vista + ' SELECT * FROM nuevos')
+                partes = [vistas[vista].rename(columns={columna: 'cantidad'}), nuevos[grupos + ['cantidad']],
+                          previos[grupos + ['cantidad']].assign(cantidad=-previos['cantidad'])]
+            conteo = pd.concat(partes)
+            conteo = conteo.groupby(grupos, dropna=False, sort=True, observed=True)['cantidad'].sum().reset_index()
+            conteo = conteo[conteo['cantidad'] != 0].rename(columns={'cantidad': columna}).reset_index(drop=True)
+            con.unregister('nuevos')
+            con.register('conteo', conteo)
+            con.execute('CREATE OR REPLACE TABLE ' + vista + ' AS SELECT * FROM conteo')
+            con.unregister('conteo')
+            res[vista] = conteo
+
+        con.execute("CREATE OR REPLACE TABLE conteos_operadores_firmas AS SELECT * FROM firmas")
+        con.execute("CREATE OR REPLACE TABLE conteos_operadores_dimensiones AS SELECT ? AS firma", [firma_dimensiones])
+    finally:
+        con.close()
+    if verbose:
+        print("Conteos de operadores (" + modo + "): " + str(len(cambiados)) + " operadores agregados, quitados o modificados.")
+    return res
+
+# =============================================================================
+# FUNCIONES PARA LA EJECUCIÓN POR ETAPAS
+# =============================================================================
+
+### desarrollo.py se divide en etapas (carga, exploración, normalización,
+### respuestas y gráficos) con entradas y salidas declaradas. Cada etapa se
+### identifica por una huella de su código (y del de las funciones que usa) y
+### de sus entradas. Si la huella no cambió desde la corrida anterior, en lugar
+### de ejecutar la etapa se leen sus salidas de las copias en Parquet guardadas
+### entonces, y se vuelve a mostrar lo que la etapa había impreso.
+### Requiere pyarrow; si no está instalado, las etapas se ejecutan siempre.
+
+## ESTRUCTURA: etapa
+# Diccionario que describe una etapa:
+#   'name'    = nombre de la etapa
+#   'funcion' = función que ejecuta la etapa. Sus parámetros son las entradas
+#               de la etapa, que se toman por nombre del entorno. Retorna un
+#               diccionario con sus salidas, que se agregan al entorno.
+#   'salidas' = lista de nombres de las salidas
+#   'cache'   = (opcional, True por defecto) si es False, la etapa se ejecuta
+#               siempre (por ejemplo, porque ya tiene su propia caché)
+# entorno:
+#    'nombre' = dataframe, dict_df o valor que se pueda guardar como JSON
+# Las etapas no deben modificar sus entradas. Los dict_df se les pasan como
+# copias superficiales, así que sí pueden reemplazar su 'df' (como hacen
+# limpiezaTuplasRepetidas o añadirIDs).
+
+
+# Metadata de un dict_df (todo salvo el dataframe y su cache)
+def metadatosDeTabla(dict_df):
+    return {clave: valor for clave, valor in dict_df.items() if clave not in ('df', 'cache')}
+
+
+# Metadata que depende de cómo se cargó la tabla (del CSV o de la copia en 
+# Arrow, ver cargarTabla) y no de su contenido: no forma parte de la huella
+METADATOS_DE_CARGA = ('memoria',)
+
+
+def esDictDf(valor):
+    return isinstance(valor, dict) and 'df' in valor
+
+
+# Código de la función y, recursivamente, el de las funciones (de su módulo o
+# de este) que menciona
+def fuentesDeFuncion(funcion, vistas=None):
+    if vistas is None:
+        vistas = set()
+    vistas.add(funcion)
+    fuentes = [inspect.getsource(funcion)]
+    nombres = set()
+    codigos = [funcion.__code__]
+    while len(codigos) > 0:
+        codigo = codigos.pop()
+        nombres.update(codigo.co_names)
+        codigos += [c for c in codigo.co_consts if inspect.iscode(c)]
+    for nombre in sorted(nombres):
+        for espacio in (funcion.__globals__, globals()):
+            usada = espacio.get(nombre)
+            if inspect.isfunction(usada) and usada not in vistas:
+                fuentes += fuentesDeFuncion(usada, vistas)
+    return fuentes
+
+
+# Huella del contenido de un valor del entorno
+def huellaDeValor(valor):
+    h = hashlib.sha256()
+    if isinstance(valor, pd.DataFrame):
+        h.update(repr([(col, str(tipo)) for col, tipo in valor.dtypes.items()]).encode())
+        h.update(hashDeTuplas(valor).tobytes())
+    elif esDictDf(valor):
+        h.update(huellaDeValor(valor['df']).encode())
+        metadatos = {clave: v for clave, v in metadatosDeTabla(valor).items() if clave not in METADATOS_DE_CARGA}
+        h.update(json.dumps(metadatos, sort_keys=True, default=str).encode())
+    else:
+        h.update(json.dumps(valor, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def huellaDeEtapa(etapa, huellas_de_entradas):
+    h = hashlib.sha256(etapa['name'].encode())
+    h.update(repr(etapa['salidas']).encode())
+    for fuente in fuentesDeFuncion(etapa['funcion']):
+        h.update(fuente.encode())
+    for nombre, huella in huellas_de_entradas.items():
+        h.update((nombre + huella).encode())
+    return h.hexdigest()
+
+
+# Huella de la corrida cuyas salidas están guardadas en directorio (o None)
+def huellaGuardada(directorio):
+    ruta_indice = os.path.join(directorio, 'etapa.json')
+    if not os.path.exists(ruta_indice):
+        return None
+    with open(ruta_indice) as f:
+        return json.load(f)['huella']
+
+
+def guardarSalidasDeEtapa(directorio, huella, salidas, texto):
+    os.makedirs(directorio, exist_ok=True)
+    # Borramos las salidas de la corrida anterior (el índice primero, para que
+    # no quede vigente si algo falla a mitad de camino)
+    archivos = sorted(os.listdir(directorio), key=lambda archivo: archivo != 'etapa.json')
+    for archivo in archivos:
+        os.remove(os.path.join(directorio, archivo))
+    indice = {'huella': huella, 'salidas': dict()}
+    for nombre, valor in salidas.items():
+        if isinstance(valor, pd.DataFrame):
+            valor.to_parquet(os.path.join(directorio, nombre + '.parquet'))
+            indice['salidas'][nombre] = {'tipo': 'dataframe'}
+        elif esDictDf(valor):
+            valor['df'].to_parquet(os.path.join(directorio, nombre + '.parquet'))
+            indice['salidas'][nombre] = {'tipo': 'tabla', 'metadatos': metadatosDeTabla(valor)}
+        else:
+            indice['salidas'][nombre] = {'tipo': 'valor', 'valor': valor}
+    with open(os.path.join(directorio, 'salida.txt'), 'w', encoding='utf-8') as f:
+        f.write(texto)
+    with open(os.path.join(directorio, 'etapa.json') + '.tmp', 'w') as f:
+        json.dump(indice, f, indent=1)
+    os.replace(os.path.join(directorio, 'etapa.json') + '.tmp', os.path.join(directorio, 'etapa.json'))
+
+
+# Retorna (salidas, texto impreso) de la etapa guardada en directorio
+def leerSalidasDeEtapa(directorio):
+    with open(os.path.join(directorio, 'etapa.json')) as f:
+        indice = json.load(f)
+    salidas = dict()
+    for nombre, salida in indice['salidas'].items():
+        if salida['tipo'] == 'valor':
+            salidas[nombre] = salida['valor']
+            continue
+        df = pd.read_parquet(os.path.join(directorio, nombre + '.parquet'))
+        if salida['tipo'] == 'tabla':
+            salidas[nombre] = dict(salida['metadatos'], df=faltantesComoNaN(df))
+        else:
+            salidas[nombre] = df
+    with open(os.path.join(directorio, 'salida.txt'), encoding='utf-8') as f:
+        texto = f.read()
+    return salidas, texto
+
+
+# Ejecuta la función de la etapa. Lo que imprime se retorna junto con sus 
+# salidas y, si mostrar es True, también se muestra.
+def correrEtapa(etapa, entradas, mostrar=True):
+    texto = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(texto):
+            salidas = etapa['funcion'](**entradas)
+    finally:
+        if mostrar:
+            print(texto.getvalue(), end='')
+    return salidas, texto.getvalue()
+
+
+# Nombres de las etapas a ejecutar para obtener las seleccionadas: además de 
+# ellas, las anteriores que producen (directa o indirectamente) sus entradas
+def etapasNecesarias(etapas, seleccionadas):
+    necesarias = set()
+    requeridas = set()
+    for etapa in reversed(etapas):
+        if etapa['name'] in seleccionadas or len(requeridas & set(etapa['salidas'])) > 0:
+            necesarias.add(etapa['name'])
+            requeridas -= set(etapa['salidas'])
+            requeridas |= set(inspect.signature(etapa['funcion']).parameters)
+    return necesarias
+
+
+def ejecutarEtapas(etapas, entorno, directorio=None, seleccionadas=None, verbose=True):
+    """
+    Ejecuta en orden las etapas (ver estructura arriba). Cada etapa toma sus
+    entradas del entorno y le agrega sus salidas; se retorna el entorno. Si 
+    directorio no es None, las salidas de cada etapa se guardan en 
+    directorio/<etapa>, y las etapas cuya huella (código y entradas) no 
+    cambió desde la corrida anterior no se ejecutan: se leen sus salidas y se
+    vuelve a mostrar lo que habían impreso.
+    
+    Argumentos:
+        etapas = lista de etapas.
+        entorno = diccionario con los valores iniciales (fuentes y parámetros).
+        directorio = directorio donde se guardan las salidas de las etapas.
+        seleccionadas = lista de nombres de las etapas a ejecutar (por 
+            defecto, todas). De las demás, solo se obtienen (de la caché si
+            es posible, y si no ejecutándolas sin mostrar lo que imprimen) las
+            que producen entradas de las seleccionadas.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+    nombres = [etapa['name'] for etapa in etapas]
+    if seleccionadas is None:
+        seleccionadas = nombres
+    desconocidas = [nombre for nombre in seleccionadas if nombre not in nombres]
+    if len(desconocidas) > 0:
+        print("ERROR: no existen las etapas " + str(desconocidas) + ". Las etapas son: " + str(nombres) + ".")
+        return entorno
+    necesarias = etapasNecesarias(etapas, seleccionadas)
+
+    # Huellas de los valores del entorno. Las de las salidas de una etapa se
+    # derivan de la huella de la etapa, sin recorrer los datos.
+    huellas = dict()
+    for etapa in etapas:
+        if etapa['name'] not in necesarias:
+            continue
+        mostrar = etapa['name'] in seleccionadas
+        parametros = list(inspect.signature(etapa['funcion']).parameters)
+        faltantes = [nombre for nombre in parametros if nombre not in entorno]
+        if len(faltantes) > 0:
+            print("ERROR: la etapa " + etapa['name'] + " requiere las entradas " + str(faltantes) +
+                  ", que no están en el entorno.")
+            return entorno
+        entradas = {nombre: dict(entorno[nombre]) if esDictDf(entorno[nombre]) else entorno[nombre]
+                    for nombre in parametros}
+        if verbose and not mostrar:
+            print("Etapa " + etapa['name'] + ": no seleccionada, solo se obtienen sus salidas.")
+
+        if directorio is None or pa is None or not etapa.get('cache', True):
+            if mostrar:
+                salidas = etapa['funcion'](**entradas)
+            else:
+                salidas = correrEtapa(etapa, entradas, mostrar=False)[0]
+            for nombre in salidas:
+                huellas.pop(nombre, None)
+        else:
+            for nombre in parametros:
+                if nombre not in huellas:
+                    huellas[nombre] = huellaDeValor(entorno[nombre])
+            huella = huellaDeEtapa(etapa, {nombre: huellas[nombre] for nombre in parametros})
+            directorio_etapa = os.path.join(directorio, etapa['name'])
+            if huellaGuardada(directorio_etapa) == huella:
+                salidas, texto = leerSalidasDeEtapa(directorio_etapa)
+                if verbose:
+                    print("Etapa " + etapa['name'] + ": sin cambios, se reutilizan sus salidas de la caché " + directorio_etapa)
+                if mostrar:
+                    print(texto, end='')
+            else:
+                salidas, texto = correrEtapa(etapa, entradas, mostrar)
+                try:
+                    guardarSalidasDeEtapa(directorio_etapa, huella, salidas, texto)
+                    if verbose:
+                        print("Etapa " + etapa['name'] + ": salidas guardadas en la caché " + directorio_etapa)
+                except (pa.ArrowException, ValueError, TypeError) as e:
+                    # Por ejemplo, columnas con tipos mezclados que Arrow no admite
+                    print("ATENCIÓN: no se pudieron guardar las salidas de la etapa " + etapa['name'] +
+                          " en la caché (" + str(e) + ").")
+            for nombre in salidas:
+                huellas[nombre] = hashlib.sha256((huella + nombre).encode()).hexdigest()
+
+        if sorted(salidas) != sorted(etapa['salidas']):
+            print("ERROR: la etapa " + etapa['name'] + " declara las salidas " + str(etapa['salidas']) +
+                  " pero retornó " + str(list(salidas)) + ".")
+        entorno.update(salidas)
+    return entorno
+
 
 # =============================================================================
 # FUNCIONES PARA EXPLORACIÓN DE DATOS
@@ -74,23 +938,25 @@ def getTuplas(dict_df_o_df, lista_atrib_proyeccion=[], filtro_seleccion=[]):
 ### Cuando las columnas de la lista provista resultan en 
 ### más de una tupla existente en el dataframe, la primera
 ### encontrada se asume como valiosa y las demás como desechables. 
+### Ambos leen los grupos de la tabla del cache (ver gruposDeTabla), así que
+### repetir la pregunta sobre las mismas columnas no recorre la tabla.
 def selTuplasUnicas(dict_df, lista_de_columnas=[], filtro=[]):
-    if lista_de_columnas == []:
-        lista_de_columnas = list(dict_df['df'].columns)
-    tuplas_unicas = getTuplas(dict_df,[],filtro).drop_duplicates(subset=lista_de_columnas, keep='first')
-    return tuplas_unicas
+    if type(filtro) == pd.core.series.Series:
+        # primera tupla de cada grupo entre las que pasan el filtro
+        filas = np.flatnonzero(filtro.to_numpy())
+        ids = gruposDeTabla(dict_df, lista_de_columnas)[0][filas]
+        return dict_df['df'].iloc[filas[np.sort(np.unique(ids, return_index=True)[1])]]
+    return dict_df['df'].iloc[filasPrimerasDeGrupo(dict_df, lista_de_columnas)]
 
 def selTuplasRepetidasSobrantes(dict_df, lista_de_columnas=[]):
     if lista_de_columnas == []:
         lista_de_columnas = list(dict_df['df'].columns)
-    # Aquí df.duplicated() da un filtro que pone False en las tuplas que no 
-    # están duplicadas. Con el parámetro keep='first', a la primera
-    # copia de las que sí están duplicadas también le pone False.
-    # El parámetro subset especifica sobre cuáles columnas se realiza el
-    # chequeo de duplicación. El filtro es aplicado sobre el dataframe
-    # original, devolviendo solo aquellas tuplas a las cuales el filtro
-    # les pone True, que son las copias sobrantes.
-    filtro=dict_df['df'].duplicated(subset=lista_de_columnas, keep='first')
+    # Aquí tuplasRepetidas() da un filtro que pone False en las tuplas que no 
+    # están duplicadas y en la primera copia de las que sí lo están (como
+    # df.duplicated(keep='first')), según las columnas de la lista. El filtro
+    # es aplicado sobre el dataframe original, devolviendo solo aquellas 
+    # tuplas a las cuales el filtro les pone True, que son las copias sobrantes.
+    filtro = pd.Series(tuplasRepetidas(dict_df, lista_de_columnas), index=dict_df['df'].index)
     tuplas_sobrantes = getTuplas(dict_df, [], filtro)
     return tuplas_sobrantes
 
@@ -107,7 +973,7 @@ def columnas(dict_df_o_df):
     return list(df.columns)
 
 def cantidadDeTuplasUnicas(dict_df, lista_de_columnas):
-    return len(selTuplasUnicas(dict_df, lista_de_columnas))
+    return gruposDeTabla(dict_df, lista_de_columnas)[1]
 
 def conjuntoDeValoresDeColumna(dict_df, col, verbose=True):
     res = set(selTuplasUnicas(dict_df, col)[col])
@@ -120,6 +986,57 @@ def conjuntoDeValoresDeColumna(dict_df, col, verbose=True):
 # FUNCIONES AUXILIARES
 # =============================================================================
 
+# Retorna el diccionario de resultados guardados bajo nombre para la versión 
+# actual de la tabla. Los resultados se guardan en dict_df['cache'] junto con 
+# una referencia al dataframe sobre el que se calcularon: si dict_df['df'] fue
+# reemplazado por otro dataframe (como hacen limpiezaTuplasRepetidas o 
+# añadirIDs), se descartan. Las funciones que modifican una tabla deben 
+# reemplazar dict_df['df'] en lugar de modificarlo en el lugar.
+def cacheDeTabla(dict_df, nombre):
+    cache = dict_df.get('cache')
+    if cache is None or cache['df'] is not dict_df['df']:
+        cache = {'df': dict_df['df']}
+        dict_df['cache'] = cache
+    if nombre not in cache:
+        cache[nombre] = dict()
+    return cache[nombre]
+
+
+# Retorna (ids, cant_grupos): el número de grupo de cada tupla según los 
+# valores de las columnas dadas (por defecto, todas) y la cantidad de grupos.
+# Los grupos se numeran en el orden en que aparece su primera tupla y NULL
+# cuenta como un valor más. Se guardan en el cache de la tabla por conjunto de
+# columnas; los de varias columnas se arman a partir de los de menos columnas.
+def gruposDeTabla(dict_df, lista_de_columnas=[]):
+    if isinstance(lista_de_columnas, str):
+        lista_de_columnas = [lista_de_columnas]
+    if len(lista_de_columnas) == 0:
+        lista_de_columnas = list(dict_df['df'].columns)
+    grupos = cacheDeTabla(dict_df, 'grupos')
+    clave = tuple(lista_de_columnas)
+    if clave not in grupos:
+        if len(clave) == 1:
+            ids, valores = pd.factorize(dict_df['df'][clave[0]], use_na_sentinel=False)
+            grupos[clave] = (ids.astype(np.int64), len(valores))
+        else:
+            ids_previos, _ = gruposDeTabla(dict_df, list(clave[:-1]))
+            ids_ultima, cant_ultima = gruposDeTabla(dict_df, list(clave[-1:]))
+            ids, valores = pd.factorize(ids_previos * cant_ultima + ids_ultima)
+            grupos[clave] = (ids.astype(np.int64), len(valores))
+    return grupos[clave]
+
+# Posiciones (crecientes) de la primera tupla de cada grupo
+def filasPrimerasDeGrupo(dict_df, lista_de_columnas=[]):
+    ids, _ = gruposDeTabla(dict_df, lista_de_columnas)
+    return np.unique(ids, return_index=True)[1]
+
+# Array booleano con True en las tuplas repetidas sobrantes (todas las de cada
+# grupo salvo la primera), como df.duplicated(keep='first')
+def tuplasRepetidas(dict_df, lista_de_columnas=[]):
+    res = np.ones(len(dict_df['df']), dtype=bool)
+    res[filasPrimerasDeGrupo(dict_df, lista_de_columnas)] = False
+    return res
+
 # Retorna una cadena con una consulta simple
 def genConsulta(lista_de_columnas=[]):
     p = 'SELECT DISTINCT '
@@ -134,6 +1051,9 @@ def genConsulta(lista_de_columnas=[]):
         
 
 # Retorna una consulta en dos tablas con nombre asignado df1 y df2
+# Ya no se usa para medir (ver genConsultaSemiJoin), pero queda como la 
+# definición de referencia: testing.py verifica que genConsultaSemiJoin 
+# devuelva las mismas tuplas que esta consulta.
 def genConsultaExt(dict_columnas, tipos_df1, lista_de_indefinidos=[]):    
     consultaSQL ='SELECT DISTINCT '
     aux_consulta_or = ''
@@ -174,28 +1094,236 @@ def genConsultaExt(dict_columnas, tipos_df1, lista_de_indefinidos=[]):
     return (consultaSQL, clave)
 
 
+# Retorna una consulta equivalente a la de genConsultaExt (mismas tuplas de 
+# df1) pero resuelta con semi-joins por hash en lugar del producto df1 x df2.
+# La condición que arma genConsultaExt no lleva paréntesis, así que por la
+# precedencia de AND sobre OR es una disyunción de términos; cada término es 
+# una conjunción de igualdades entre columnas de df1 y df2 (y, en el último, 
+# los filtros sobre df1). Por cada término se arma una sola vez el conjunto de
+# claves de df2 (en minúscula para columnas de texto) y se buscan en él las 
+# tuplas distintas de df1. El costo crece con la suma de los tamaños de las 
+# tablas y no con su producto.
+def genConsultaSemiJoin(dict_columnas, tipos_df1, lista_de_indefinidos=[]):
+    columnas_df1 = []
+    terminos = []
+    termino = []
+    filtros = []
+    clave = ''
+    for k in dict_columnas:
+        if len(clave)==0:
+            clave = k
+        columnas_k = list(k) if isinstance(k, tuple) else [k]
+        comparaciones = []
+        for columna in columnas_k:
+            columnas_df1.append(columna)
+            filtros.append('df1.'+columna+' IS NOT NULL')
+            if tipos_df1[columna][1] is str:
+                for col in dict_columnas[k]:
+                    comparaciones.append(('LOWER(df1.'+columna+')', 'LOWER(df2.'+col+')'))
+                if len(lista_de_indefinidos) > 0:
+                    filtros.append('df1.'+columna+' NOT IN '+str(tuple(lista_de_indefinidos)))
+            else:
+                for col in dict_columnas[k]:
+                    comparaciones.append(('df1.'+columna, 'df2.'+col))
+        # Cada OR cierra un término; el AND entre claves une la última 
+        # comparación de una clave con la primera de la siguiente
+        for i, comparacion in enumerate(comparaciones):
+            if i > 0:
+                terminos.append(termino)
+                termino = []
+            termino.append(comparacion)
+    terminos.append(termino)
+
+    # Conjuntos de claves de df2, uno por cada combinación distinta de columnas
+    conjuntos = []
+    for termino in terminos:
+        exprs_df2 = [c[1] for c in termino]
+        if exprs_df2 not in conjuntos:
+            conjuntos.append(exprs_df2)
+    lista_cols = ', '.join(columnas_df1)
+    consultaSQL = 'WITH df1_distintas AS (SELECT DISTINCT ' + lista_cols + ' FROM df1)'
+    for i, exprs_df2 in enumerate(conjuntos):
+        consultaSQL += (', claves_' + str(i) + ' AS (SELECT DISTINCT ' +
+                        ', '.join(e + ' AS c' + str(j) for j, e in enumerate(exprs_df2)) + ' FROM df2)')
+    selects = []
+    for t, termino in enumerate(terminos):
+        i = conjuntos.index([c[1] for c in termino])
+        condicion_join = ' AND '.join(c[0] + ' = claves_' + str(i) + '.c' + str(j) for j, c in enumerate(termino))
+        select = ('SELECT ' + ', '.join('df1.'+col for col in columnas_df1) + 
+                  ' FROM df1_distintas AS df1 INNER JOIN claves_' + str(i) + ' ON ' + condicion_join)
+        if t == len(terminos) - 1:
+            select += ' WHERE ' + ' AND '.join(filtros)
+        selects.append(select)
+    consultaSQL += ' ' + ' UNION '.join(selects) + ';'
+
+    return (consultaSQL, clave)
+
+
 # =============================================================================
 # FUNCIONES PARA LA EXPLORACIÓN DE DATOS EN TABLAS Y ANÁLISIS
 # =============================================================================
 
 # FUNCIONES DE METRICAS
 
+## ESTRUCTURA DEL PERFIL:
+# Un dataframe con una fila por métrica:
+#    tabla, columna (None para las métricas de toda la tabla), metrica, valor
+# Métricas de la tabla (en porcentaje sobre el total de tuplas):
+#    'tuplas_repetidas', 'tuplas_con_null_alguna', 'tuplas_con_null_todas'
+# Métricas por columna (en porcentaje):
+#    'valores_null', 'valores_indefinidos', 'tipo_mayoritario'
+# Las funciones de métricas de abajo, cuando se aplican a todas las columnas de
+# una tabla, leen su resultado del perfil en lugar de volver a recorrerla.
+def perfil(dict_df, lista_de_indefinidos=[]):
+    """
+    Calcula en una pasada por la tabla todas las métricas de calidad de los 
+    Goals 1 a 5 y las retorna en un dataframe (ver estructura arriba). Las 
+    métricas se guardan en el cache de la tabla, así que volver a pedirlas 
+    mientras dict_df['df'] no cambie no recorre la tabla.
+    
+    Argumentos:
+        dict_df = metadata correspondiente al dataframe.
+        lista_de_indefinidos = valores que se consideran indefinidos (no NULL).
+    """
+    filas = [(None, metrica, valor) for metrica, valor in metricasDeTabla(dict_df).items()]
+    metricas_columnas = metricasDeColumnas(dict_df, lista_de_indefinidos)
+    for col in dict_df['df'].columns:
+        filas += [(col, metrica, valor) for metrica, valor in metricas_columnas[col].items()]
+    res = pd.DataFrame(filas, columns=['columna', 'metrica', 'valor'])
+    res.insert(0, 'tabla', dict_df['name'])
+    return res
+
+
+# Métricas de toda la tabla (se calculan una vez por versión de la tabla)
+def metricasDeTabla(dict_df):
+    metricas = cacheDeTabla(dict_df, 'perfil')
+    if 'tabla' not in metricas:
+        df = dict_df['df']
+        tam = len(df)
+        nulos = df.isna().to_numpy()
+        metricas['tabla'] = {'tuplas_repetidas': 100 * (tam - cantidadDeTuplasUnicas(dict_df, [])) / tam,
+                             'tuplas_con_null_alguna': 100 * nulos.any(axis=1).sum() / tam,
+                             'tuplas_con_null_todas': 100 * nulos.all(axis=1).sum() / tam}
+    return metricas['tabla']
+
+
+# Métricas por columna, para las columnas dadas (por defecto, todas). Retorna
+# un diccionario columna -> {metrica: valor} con todas las calculadas hasta el 
+# momento para esa lista de indefinidos.
+def metricasDeColumnas(dict_df, lista_de_indefinidos=[], columnas=None):
+    df = dict_df['df']
+    metricas = cacheDeTabla(dict_df, 'perfil')
+    clave = ('columnas', tuple(lista_de_indefinidos))
+    if clave not in metricas:
+        metricas[clave] = dict()
+    if columnas is None:
+        columnas = df.columns
+    tam = len(df)
+    for col in columnas:
+        if col not in metricas[clave]:
+            nulos = df[col].isna().to_numpy()
+            indefinidos = df[col].isin(lista_de_indefinidos).to_numpy() & ~nulos
+            metricas[clave][col] = {'valores_null': 100 * nulos.sum() / tam,
+                                    'valores_indefinidos': 100 * indefinidos.sum() / tam,
+                                    'tipo_mayoritario': evaluacionDeTiposPorColumna(dict_df, col)[0]}
+    return metricas[clave]
+
+
+# Perfil de varias tablas en un único dataframe
+def perfilDeTablas(lista_tablas, lista_de_indefinidos=[]):
+    return pd.concat([perfil(tabla, lista_de_indefinidos) for tabla in lista_tablas], ignore_index=True)
+
+
+# Retorna el valor de una métrica del perfil de la tabla
+def valorDelPerfil(dict_df, metrica, columna=None, lista_de_indefinidos=[]):
+    if columna is None:
+        return metricasDeTabla(dict_df)[metrica]
+    return metricasDeColumnas(dict_df, lista_de_indefinidos, [columna])[columna][metrica]
+
+
+# Tablas sobre las que trabajan los procesos de calcularMetricasEnParalelo. Los
+# procesos se crean con fork, así que heredan las tablas sin copiarlas.
+TABLAS_EN_PARALELO = []
+
+# Tarea de un proceso: ('tabla', i) o ('columnas', i, columnas, lista_de_indefinidos)
+def tareaDeMetricas(tarea):
+    dict_df = TABLAS_EN_PARALELO[tarea[1]]
+    if tarea[0] == 'tabla':
+        return metricasDeTabla(dict_df)
+    metricas = metricasDeColumnas(dict_df, tarea[3], tarea[2])
+    tipos = cacheDeTabla(dict_df, 'tipos')
+    return ({col: metricas[col] for col in tarea[2]}, {col: tipos[col] for col in tarea[2] if col in tipos})
+
+
+def calcularMetricasEnParalelo(lista_tablas, lista_de_indefinidos=None, procesos=None, columnas_por_tarea=4):
+    """
+    Calcula las métricas del perfil de varias tablas en un pool de procesos y
+    las deja en el cache de cada tabla, de modo que las funciones de métricas
+    solo las lean. Cada tabla es una tarea (métricas de toda la tabla) y sus
+    columnas se reparten en tareas de a columnas_por_tarea. Los resultados se 
+    guardan en el orden de las tareas, así que no dependen de cuál termina 
+    primero. Si no se puede usar fork (ej. en Windows) o hay una sola tarea,
+    se calcula todo en este proceso.
+    
+    Argumentos:
+        lista_tablas = metadata de las tablas.
+        lista_de_indefinidos = valores que se consideran indefinidos. Si es
+            None, solo se calculan las métricas de toda la tabla.
+        procesos = cantidad máxima de procesos (por defecto, uno por núcleo).
+        columnas_por_tarea = cantidad de columnas que procesa cada tarea.
+    """
+    global TABLAS_EN_PARALELO
+    tareas = []
+    for i, dict_df in enumerate(lista_tablas):
+        if 'tabla' not in cacheDeTabla(dict_df, 'perfil'):
+            tareas.append(('tabla', i))
+        if lista_de_indefinidos is not None:
+            calculadas = cacheDeTabla(dict_df, 'perfil').get(('columnas', tuple(lista_de_indefinidos)), dict())
+            pendientes = [col for col in dict_df['df'].columns if col not in calculadas]
+            for j in range(0, len(pendientes), columnas_por_tarea):
+                tareas.append(('columnas', i, pendientes[j:j+columnas_por_tarea], list(lista_de_indefinidos)))
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    procesos = min(procesos, len(tareas))
+
+    TABLAS_EN_PARALELO = list(lista_tablas)
+    try:
+        if procesos > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            contexto = multiprocessing.get_context('fork')
+            with concurrent.futures.ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                resultados = list(pool.map(tareaDeMetricas, tareas))
+        else:
+            resultados = [tareaDeMetricas(tarea) for tarea in tareas]
+    finally:
+        TABLAS_EN_PARALELO = []
+
+    for tarea, resultado in zip(tareas, resultados):
+        dict_df = lista_tablas[tarea[1]]
+        if tarea[0] == 'tabla':
+            cacheDeTabla(dict_df, 'perfil')['tabla'] = resultado
+        else:
+            metricas, tipos = resultado
+            cache = cacheDeTabla(dict_df, 'perfil')
+            clave = ('columnas', tuple(tarea[3]))
+            if clave not in cache:
+                cache[clave] = dict()
+            cache[clave].update(metricas)
+            cacheDeTabla(dict_df, 'tipos').update(tipos)
+
+
 def porcentajeTuplasRepetidasSobrantes(dict_df, lista_de_columnas=[], verbose=True):
     if lista_de_columnas == []:
         lista_de_columnas = list(dict_df['df'].columns)
         cols_text = "en el "
     else:
         cols_text = "en las columnas " + str(lista_de_columnas) + " del "
-    # Aquí df.duplicated() da un filtro que pone False en las tuplas que no 
-    # están duplicadas. Con el parámetro keep='first', a la primera
-    # copia de las que sí están duplicadas también le pone False.
-    # El parámetro subset especifica sobre cuáles columnas se realiza el
-    # chequeo de duplicación. El filtro es aplicado sobre el dataframe
-    # original, devolviendo solo aquellas tuplas a las cuales el filtro
-    # les pone True, que son las copias sobrantes.
-    tuplas_sobrantes = selTuplasRepetidasSobrantes(dict_df, lista_de_columnas)
-    cant_tuplas_sobrantes = len(tuplas_sobrantes)
-    metrica = 100 * cant_tuplas_sobrantes / len(dict_df['df'])
+    # Las tuplas sobrantes son todas menos una por cada grupo de tuplas con los
+    # mismos valores en las columnas (ver gruposDeTabla).
+    if cols_text == "en el ":
+        metrica = valorDelPerfil(dict_df, 'tuplas_repetidas')
+    else:
+        cant_tuplas_sobrantes = len(dict_df['df']) - cantidadDeTuplasUnicas(dict_df, lista_de_columnas)
+        metrica = 100 * cant_tuplas_sobrantes / len(dict_df['df'])
     if verbose:
         print("Del total de tuplas existentes " + cols_text + "dataframe "+ dict_df['name'] + ", el " + str(round(metrica,2)) + " % son tuplas repetidas.")
     return metrica
@@ -205,19 +1333,9 @@ def porcentajeTuplasRepetidasSobrantes(dict_df, lista_de_columnas=[], verbose=Tr
 def porcentajeDeTuplasConValoresNullAny(dict_df, lista_de_columnas=[], verbose=True):
     df = dict_df['df']
     if len(lista_de_columnas) == 0:
-        lista_de_columnas = df.columns
-    consultaSQL = ""
-    col_SQL_spec = ""
-    for col in lista_de_columnas:
-        if consultaSQL == "":
-            consultaSQL +=  " " + col + " IS NULL"
-            col_SQL_spec += col
-        else:
-            consultaSQL += " OR " + col + " IS NULL"
-            col_SQL_spec += ", " + col
-    consultaSQL = "SELECT " + col_SQL_spec + " FROM df WHERE" + consultaSQL
-    consulta = sql^ consultaSQL
-    metrica =  100 * len(consulta)/len(df)
+        metrica = valorDelPerfil(dict_df, 'tuplas_con_null_alguna')
+    else:
+        metrica = 100 * df[list(lista_de_columnas)].isna().to_numpy().any(axis=1).sum()/len(df)
     if verbose:
         print("El porcentaje de valores nulos en alguna(s) de la(s) columna(s) del dataframe " + dict_df['name'] + " es " + str(round(metrica,2)) + " %.")
     return metrica
@@ -226,28 +1344,16 @@ def porcentajeDeTuplasConValoresNullAny(dict_df, lista_de_columnas=[], verbose=T
 def porcentajeDeTuplasConValoresNullAll(dict_df, lista_de_columnas=[], verbose=True):
     df = dict_df['df']
     if len(lista_de_columnas) == 0:
-        lista_de_columnas = df.columns
-    consultaSQL = ""
-    col_SQL_spec = ""
-    for col in lista_de_columnas:
-        if consultaSQL == "":
-            consultaSQL +=  " " + col + " IS NULL"
-            col_SQL_spec += col
-        else:
-            consultaSQL += " AND " + col + " IS NULL"
-            col_SQL_spec += ", " + col
-    consultaSQL = "SELECT " + col_SQL_spec + " FROM df WHERE" + consultaSQL
-    consulta = sql^ consultaSQL
-    metrica =  100 * len(consulta)/len(df)
+        metrica = valorDelPerfil(dict_df, 'tuplas_con_null_todas')
+    else:
+        metrica = 100 * df[list(lista_de_columnas)].isna().to_numpy().all(axis=1).sum()/len(df)
     if verbose:
         print("El porcentaje de valores nulos en todas la(s) columna(s) del dataframe " + dict_df['name'] + " es " + str(round(metrica,2)) + " %.")
     return metrica
 
 
 def porcentajeDeValoresIndefinidos(dict_df, col, lista_de_indefinidos, verbose=True):
-    df = dict_df['df']
-    seleccionados = df[col].dropna().isin(lista_de_indefinidos)
-    metrica = 100 * seleccionados.sum()/len(df)
+    metrica = valorDelPerfil(dict_df, 'valores_indefinidos', col, lista_de_indefinidos)
     if verbose:
         print("El porcentaje de valores indefinidos en la columna " + col + " de la tabla " + dict_df['name'] + " es " + str(round(metrica,2)) + " %.")
     return metrica
@@ -262,26 +1368,59 @@ def diferenciaDeCantidadesDeValoresUnicosUnsigned(dict_df, col1, col2, verbose=T
         print('Valor absoluto de la diferencia de cantidad de valores únicos de las columnas ' + col1 + ' y ' + col2 + ' del dataframe ' + dict_df['name'] + ': '+ str(res))
     return res
 
+# Retorna, para cada tipo de los valores no NULL de la serie (el tipo que se 
+# obtiene al iterarla), la cantidad de valores y la posición de su primera 
+# aparición. Solo las columnas de tipo object se recorren valor por valor: en
+# el resto el tipo sale de la metadata de la columna.
+def histogramaDeTipos(serie):
+    no_nulos = serie.notna().to_numpy()
+    if not no_nulos.any():
+        return dict()
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # un tipo por categoría; contamos por código
+        codigos = serie.cat.codes.to_numpy()
+        cantidades = np.bincount(codigos[no_nulos], minlength=len(serie.cat.categories))
+        presentes, primeras = np.unique(codigos, return_index=True)
+        primera_por_codigo = dict(zip(presentes, primeras))
+        histograma = dict()
+        for codigo, categoria in enumerate(serie.cat.categories.tolist()):
+            if cantidades[codigo] > 0:
+                cantidad, primera = histograma.get(type(categoria), (0, len(serie)))
+                histograma[type(categoria)] = (cantidad + cantidades[codigo], min(primera, primera_por_codigo[codigo]))
+        return histograma
+    if serie.dtype != object:
+        # columna homogénea: todos los valores tienen el tipo del primero
+        primera = int(np.argmax(no_nulos))
+        tipo = type(next(iter(serie.iloc[primera:primera+1])))
+        return {tipo: (int(no_nulos.sum()), primera)}
+    histograma = dict()
+    for posicion, valor in zip(np.flatnonzero(no_nulos), serie.to_numpy()[no_nulos]):
+        tipo = type(valor)
+        if tipo in histograma:
+            histograma[tipo][0] += 1
+        else:
+            histograma[tipo] = [1, posicion]
+    return {tipo: tuple(v) for tipo, v in histograma.items()}
+
 def evaluacionDeTiposPorColumna(dict_df, columna, verbose=True):
     df = dict_df['df']
-    d = dict()
     if type(df[columna]) is pd.core.series.Series or type(df[columna]) is pd.core.frame.DataFrame:
         tam = df[columna].size
     else:
         tam = len(df[columna])
     if tam > 0:
-        for val in df[columna]:
-            if not pd.isna(val):
-                if type(val) in d.keys():
-                    d[type(val)] += 1
-                else:
-                    d[type(val)] = 1
-
-        maximo_valor = max(d.values())
-        clave_maximo_valor = [clave for clave,
-                              valor in d.items() if valor == maximo_valor][0]
-        metrica = round(maximo_valor/tam*100, 2)
-        return (metrica, clave_maximo_valor)
+        tipos = cacheDeTabla(dict_df, 'tipos')
+        if columna not in tipos:
+            histograma = histogramaDeTipos(df[columna])
+            if len(histograma) == 0:
+                tipos[columna] = (0.0, np.nan)
+            else:
+                # ante empates vale el tipo que aparece primero
+                maximo_valor = int(max(cantidad for cantidad, primera in histograma.values()))
+                clave_maximo_valor = min([tipo for tipo in histograma if histograma[tipo][0] == maximo_valor],
+                                         key=lambda tipo: histograma[tipo][1])
+                tipos[columna] = (round(maximo_valor/tam*100, 2), clave_maximo_valor)
+        return tipos[columna]
     else:
         return (np.nan, np.nan)
 
@@ -312,6 +1451,7 @@ def evaluacionDeTipos(dict_df, lista_de_columnas=[], verbose=True):
 
 
 def consistencia(dicc_df1, dicc_df2, atributos_base=[], atributos_comp=[], caso=0, verbose=True):
+    from inline_sql import sql
 
     if len(atributos_base) == 2 and len(atributos_comp) == 2:
         if verbose:
@@ -343,13 +1483,53 @@ def consistencia(dicc_df1, dicc_df2, atributos_base=[], atributos_comp=[], caso=
         print('ERROR')
         return -1
 
+# Retorna la proyección de dicc_df['df'] sobre la lista de columnas, sin tuplas
+# repetidas. Si se pasa el diccionario proyecciones, la guarda allí para
+# reutilizarla cuando otra comparación pida la misma proyección.
+def proyeccionSinRepetidos(dicc_df, columnas, proyecciones=None):
+    clave = (dicc_df['name'], id(dicc_df['df']), tuple(columnas))
+    if proyecciones is not None and clave in proyecciones:
+        return proyecciones[clave]
+    proyeccion = dicc_df['df'][columnas].iloc[filasPrimerasDeGrupo(dicc_df, columnas)]
+    if proyecciones is not None:
+        proyecciones[clave] = proyeccion
+    return proyeccion
+
+# df1 y df2 tienen la columna de identificación en la primera posición y luego
+# las columnas análogas, en el mismo orden. Para cada tupla de df2 cuyo id 
+# aparece en df1 (si el id se repite en df1 vale su última tupla), cuenta por 
+# columna las diferencias: un valor NULL frente a uno no NULL, o dos valores
+# distintos.
+def contarInconsistencias(df1, df2):
+    long = df1.shape[1] - 1
+    df1 = df1[df1.iloc[:, 0].notna()]
+    df1 = df1.drop_duplicates(subset=df1.columns[0], keep='last')
+    # renombramos por posición porque ambas tablas pueden compartir nombres
+    df1 = df1.set_axis(['id'] + ['base_' + str(i) for i in range(long)], axis=1)
+    df2 = df2.set_axis(['id'] + ['comp_' + str(i) for i in range(long)], axis=1)
+    try:
+        cruce = df2.merge(df1, on='id', how='inner')
+    except ValueError:
+        # ids de tipos incompatibles para pandas (ej. texto y números): 
+        # comparamos los valores tal cual
+        cruce = df2.astype({'id': object}).merge(df1.astype({'id': object}), on='id', how='inner')
+    counter = [0]*long
+    for i in range(long):
+        nulos_base = cruce['base_' + str(i)].isna().to_numpy()
+        nulos_comp = cruce['comp_' + str(i)].isna().to_numpy()
+        ambos = ~nulos_base & ~nulos_comp
+        distintos = (cruce['base_' + str(i)].to_numpy(dtype=object)[ambos] !=
+                     cruce['comp_' + str(i)].to_numpy(dtype=object)[ambos])
+        counter[i] = int((nulos_base ^ nulos_comp).sum() + np.sum(distintos))
+    return counter
+
 ## ESTRUCUTURA:
 # dicc_columnas: 
 #    'col_id' = (columna_id_df1, columna_id_df2)
 #    'col_dep' = (lista_de_columnas_df1, lista_de_columnas_df2) 
 # los elementos de las listas de columnas están relacionados así:
 # para todo e : lista_de_columnasdf1, e' : lista_de_columnasdf2 --> e es columna análoga de e', donde la analogía está dada por la semántica de los dfs    
-def consistenciaExtendida(dicc_df1, dicc_df2, dicc_columnas, epsilon = 0.05, verbose=True):
+def consistenciaExtendida(dicc_df1, dicc_df2, dicc_columnas, epsilon = 0.05, verbose=True, proyecciones=None):
     # Comprobamos pertenencia de columnas a sus respectivos df
     if {dicc_columnas['col_id'][0]} | set(dicc_columnas['col_dep'][0]) <= set(dicc_df1['df'].columns) and {dicc_columnas['col_id'][1]} | set(dicc_columnas['col_dep'][1]) <= set(dicc_df2['df'].columns):
         
@@ -359,31 +1539,11 @@ def consistenciaExtendida(dicc_df1, dicc_df2, dicc_columnas, epsilon = 0.05, ver
         size_df2 = dicc_df2['df'][dicc_columnas['col_id'][1]].shape[0]
         
         if nulls_df1/size_df1 < epsilon and nulls_df2/size_df2 < epsilon:
-            # definimos variables
-            d_id = dict()
             long = len(dicc_columnas['col_dep'][0])
-            col_id = dicc_columnas['col_id'][0]
-            df = dicc_df1['df'][[col_id] +
-                                dicc_columnas['col_dep'][0]].drop_duplicates()
-
-            for index, row in df.iterrows():
-                if not pd.isna(row[col_id]):
-                    d_id[row[col_id]] = row[1:]
-
-            col_id = dicc_columnas['col_id'][1]
-            df = dicc_df2['df'][[col_id] +
-                                dicc_columnas['col_dep'][1]].drop_duplicates()
+            df1 = proyeccionSinRepetidos(dicc_df1, [dicc_columnas['col_id'][0]] + dicc_columnas['col_dep'][0], proyecciones)
+            df = proyeccionSinRepetidos(dicc_df2, [dicc_columnas['col_id'][1]] + dicc_columnas['col_dep'][1], proyecciones)
             # Usamos distancia discreta
-            counter = [0]*long
-            for index, row in df.iterrows():
-                k = row[col_id]
-                if k in d_id.keys():
-                    for i in range(long):
-                        if pd.isna(d_id[k][dicc_columnas['col_dep'][0][i]]) or pd.isna(row[dicc_columnas['col_dep'][1][i]]):
-                            if not(pd.isna(d_id[k][dicc_columnas['col_dep'][0][i]]) and pd.isna(row[dicc_columnas['col_dep'][1][i]])):
-                                counter[i] += 1
-                        elif d_id[k][dicc_columnas['col_dep'][0][i]] != row[dicc_columnas['col_dep'][1][i]]:
-                            counter[i] += 1
+            counter = contarInconsistencias(df1, df)
             if verbose:
                 print()
                 print('- Comparación entre ' + dicc_df1['name'] + ' y ' + dicc_df2['name'])
@@ -418,6 +1578,23 @@ def consistenciaExtendida(dicc_df1, dicc_df2, dicc_columnas, epsilon = 0.05, ver
         print('No coincide nombres de columnas de los df propietarios')
         return -1
 
+## ESTRUCTURA:
+# casos:
+#    'nombre_caso' = (dicc_df1, dicc_df2)
+# columnas_a_evaluar:
+#    'nombre_caso' = dicc_columnas (ver consistenciaExtendida)
+# Evalúa todos los casos en una sola llamada. Las proyecciones sin repetidos se
+# calculan una vez y se comparten entre los casos que las usan (por ejemplo, 
+# la misma proyección de una tabla como base en un caso y a comparar en otro).
+# Retorna un diccionario con el resultado de consistenciaExtendida por caso.
+def consistenciaExtendidaMultiple(casos, columnas_a_evaluar, epsilon = 0.05, verbose=True):
+    proyecciones = dict()
+    resultados = dict()
+    for caso, (dicc_df1, dicc_df2) in casos.items():
+        resultados[caso] = consistenciaExtendida(dicc_df1, dicc_df2, columnas_a_evaluar[caso], epsilon=epsilon,
+                                                 verbose=verbose, proyecciones=proyecciones)
+    return resultados
+
 ## ESTRUCTURA:
 # dicc_columnas: 
 #    lista_columnas_df1 : lista_columnas_df2
@@ -425,6 +1602,7 @@ def consistenciaExtendida(dicc_df1, dicc_df2, dicc_columnas, epsilon = 0.05, ver
 # los elementos de las listas de columnas están relacionados así:
 # para todo e : lista_de_columnasdf1, e' : lista_de_columnasdf2 --> e es columna análoga de e', donde la analogía está dada por la semántica de los dfs 
 def porcentajeDeValoresInexistentes(dict_df1,dict_df2, dict_columnas, lista_de_indefinidos=[], verbose=True):
+    from inline_sql import sql
     df1 = dict_df1['df']
     df2 = dict_df2['df']
     # generamos consulta
@@ -435,7 +1613,7 @@ def porcentajeDeValoresInexistentes(dict_df1,dict_df2, dict_columnas, lista_de_i
         elif isinstance(k, str):
             lista_columnas.append(k)  
     tipos_df1 = evaluacionDeTipos(dict_df1, lista_columnas, verbose=False)
-    consultaSQL = genConsultaExt(dict_columnas, tipos_df1, lista_de_indefinidos=lista_de_indefinidos)
+    consultaSQL = genConsultaSemiJoin(dict_columnas, tipos_df1, lista_de_indefinidos=lista_de_indefinidos)
     consulta = sql^consultaSQL[0]
     clave = consultaSQL[1]
     consultaSQL = genConsulta(lista_columnas)
@@ -445,32 +1623,129 @@ def porcentajeDeValoresInexistentes(dict_df1,dict_df2, dict_columnas, lista_de_i
         print("La(s) columna(s) {} de la tabla {} contiene {}% de valores que no están en la tabla {}".format(clave, dict_df1['name'],metrica,dict_df2['name']))
     return metrica 
 
+# Si maximo_valor == minimo_valor-1 (valor por defecto) no hay cota superior
 def porcentajeDeValoresFueraDeRango(dict_df, columna='', minimo_valor=0, maximo_valor=-1, verbose=True):
     if columna in dict_df['df'].keys():
-        serie = dict_df['df'][columna].dropna()
-        count = 0
-        for valor in serie:
-            if maximo_valor == minimo_valor-1:
-                if valor < minimo_valor:
-                    count += 1
-            else:
-                if valor < minimo_valor or valor > maximo_valor:
-                    count += 1
-        metrica = round(count/serie.size*100,2)
-        if verbose:
-            print("La columna {} de la tabla {} tiene {}% de valores fuera del rango esperado".format(columna,dict_df['name'],metrica))
-        return metrica       
+        if maximo_valor == minimo_valor-1:
+            maximo_valor = None
+        metricas, mascaras = mascarasFueraDeRango(dict_df, {columna: (minimo_valor, maximo_valor)}, verbose)
+        return metricas[columna]
         
     else:
         print("Nombre de columna no valida")
         return None
 
+## ESTRUCTURA:
+# rangos:
+#    'columna' = (minimo_valor, maximo_valor), ambos inclusive; None si no hay cota
+# Evalúa todas las columnas en una sola pasada sobre la tabla. Retorna dos 
+# diccionarios indexados por columna: el porcentaje de valores (no NULL) fuera
+# de rango, y la máscara de las filas con valores fuera de rango. Para una sola
+# columna, porcentajeDeValoresFueraDeRango retorna solo el porcentaje.
+def mascarasFueraDeRango(dict_df, rangos, verbose=True):
+    columnas = list(rangos.keys())
+    for col in columnas:
+        if col not in dict_df['df'].keys():
+            print("Nombre de columna no valida: " + col)
+            return None
+    minimos = np.array([-np.inf if rangos[col][0] is None else rangos[col][0] for col in columnas], dtype=float)
+    maximos = np.array([np.inf if rangos[col][1] is None else rangos[col][1] for col in columnas], dtype=float)
+    valores = dict_df['df'][columnas].to_numpy(dtype=float, na_value=np.nan)
+    # Las comparaciones con NaN dan False: los NULL no quedan fuera de rango
+    fuera = (valores < minimos) | (valores > maximos)
+    cantidad_no_nulos = (~np.isnan(valores)).sum(axis=0)
+    metricas = dict()
+    mascaras = dict()
+    for i, col in enumerate(columnas):
+        metricas[col] = round(fuera[:, i].sum()/cantidad_no_nulos[i]*100, 2)
+        mascaras[col] = pd.Series(fuera[:, i], index=dict_df['df'].index)
+        if verbose:
+            print("La columna {} de la tabla {} tiene {}% de valores fuera del rango esperado".format(col,dict_df['name'],metricas[col]))
+    return metricas, mascaras
+
+# Departamentos de deptos_loc (codigo_departamento_indec, 
+# nombre_departamento_indec) que tienen operadores: los que coinciden con el 
+# departamento de algún operador de locacion_establecimientos, o con el nombre 
+# de alguna localidad o municipio de localidades_municipios.
+# La consulta original hacía el producto cartesiano 
+# locacion_establecimientos x deptos_loc x localidades_municipios con la 
+# condición:
+#   LOWER(le.departamento) = LOWER(dl.departamento_nombre) OR
+#   LOWER(le.departamento) = LOWER(lm.nombre) OR
+#   LOWER(le.departamento) = LOWER(lm.municipio_nombre) AND
+#   UPPER(le.departamento) NOT IN ('INDEFINIDO', 'INDEFINIDA', 'NC', 'SIN DEFINIR') AND
+#   le.departamento IS NOT NULL
+# y demoraba unos 5 minutos. Resolvemos lo mismo con joins por igualdad sobre 
+# los nombres normalizados (en minúscula), que DuckDB resuelve con tablas de 
+# hash en tiempo lineal.
+# ATENCIÓN: la condición original tiene un error de precedencia que se mantiene
+# para no cambiar la respuesta a la pregunta (ii). Como AND tiene mayor 
+# precedencia que OR, los filtros de indefinidos solo se aplican a la 
+# comparación con municipio_nombre. Además, las dos últimas comparaciones no 
+# involucran a deptos_loc: si algún operador coincide con el nombre de una 
+# localidad o de un municipio, se retornan todas las tuplas de deptos_loc. 
+# Corregirlo (poner entre paréntesis las comparaciones y relacionar la 
+# localidad o el municipio con su departamento) cambia el resultado y queda 
+# como un cambio aparte; testing.py fija el comportamiento actual.
+def departamentosConOperadores(locacion_establecimientos, deptos_loc, localidades_municipios):
+    from inline_sql import sql
+    # Nombres normalizados de los departamentos de los operadores
+    consultaSQL = """
+                    SELECT DISTINCT LOWER(departamento) AS nombre_normalizado,
+                                    UPPER(departamento) NOT IN ('INDEFINIDO', 'INDEFINIDA', 'NC', 'SIN DEFINIR') AS definido
+                    FROM locacion_establecimientos
+                    WHERE departamento IS NOT NULL;
+                    """
+    nombres_operadores = sql ^ consultaSQL
+
+    # Índice de nombres normalizados de localidades y municipios
+    consultaSQL = """
+                    SELECT DISTINCT LOWER(nombre) AS nombre_normalizado, 'localidad' AS origen
+                    FROM localidades_municipios
+                    WHERE nombre IS NOT NULL
+                    UNION
+                    SELECT DISTINCT LOWER(municipio_nombre) AS nombre_normalizado, 'municipio' AS origen
+                    FROM localidades_municipios
+                    WHERE municipio_nombre IS NOT NULL;
+                    """
+    indice_localidades_municipios = sql ^ consultaSQL
+
+    # ¿Algún operador coincide con una localidad o con un municipio (en este caso
+    # descartando los departamentos indefinidos)?
+    consultaSQL = """
+                    SELECT COUNT(*) AS cantidad
+                    FROM nombres_operadores AS nop
+                    INNER JOIN indice_localidades_municipios AS ilm
+                    ON nop.nombre_normalizado = ilm.nombre_normalizado
+                    WHERE ilm.origen = 'localidad' OR nop.definido;
+                    """
+    hay_coincidencia_localidad_municipio = (sql ^ consultaSQL).iat[0, 0] > 0
+
+    if hay_coincidencia_localidad_municipio:
+        consultaSQL = """
+                    SELECT DISTINCT codigo_departamento_indec,
+                                    nombre_departamento_indec
+                    FROM deptos_loc;
+                    """
+    else:
+        consultaSQL = """
+                    SELECT DISTINCT dl.codigo_departamento_indec,
+                                    dl.nombre_departamento_indec
+                    FROM deptos_loc AS dl
+                    INNER JOIN nombres_operadores AS nop
+                    ON LOWER(dl.departamento_nombre) = nop.nombre_normalizado
+                    WHERE EXISTS (SELECT * FROM localidades_municipios);
+                    """
+    deptos_con_operadores = sql ^ consultaSQL
+    return deptos_con_operadores
+
 # =============================================================================
 # FUNCIONES PARA LA CORRECCIÓN DE DATOS EN TABLAS
 # =============================================================================
 
 # Función tipo void, modifica la referencia(?), no retorna copia
 def limpiezaTuplasRepetidas(dict_df, lista_de_columnas=[]):
+    from inline_sql import sql
     if lista_de_columnas == []:
         lista_de_columnas = []
 
@@ -509,49 +1784,36 @@ def correccionYValidacionTuplasRepetidas(lista_tablas):
             limpiezaTuplasRepetidas(tabla)
     print('Tablas sin tuplas repetidas')
 
+# Agrega a la tabla la columna id_<columnas> con un id por cada tupla de 
+# valores de lista_de_columnas:
+#   - tuplas sin NULL ni valores indefinidos: ids densos desde 0, repitiendo
+#     el id para tuplas iguales (en orden de primera aparición)
+#   - tuplas con NULL: un id distinto por fila desde 80000
+#   - tuplas con valores indefinidos: un id distinto por fila desde 90000
+#   - tuplas con NULL y valores indefinidos: ids desde 100000, repitiendo el id 
+#     para tuplas iguales
 def añadirIDs(dict_df, lista_de_columnas=[]):
     df = dict_df['df']
     if lista_de_columnas == []:
         lista_de_columnas = df.keys()
-    i,j,k,l = 0,0,0,0
-    dicc = {}
+    lista_de_columnas = list(lista_de_columnas)
     nombre_nueva_columna = 'id_' + '_'.join(lista_de_columnas)
-    for fila in range(0,len(df)): 
-        flagI, flagN = False,False
-        instancia = []
-        for index in range(0,len(lista_de_columnas)):          
-            if df.at[fila,lista_de_columnas[index]] is np.nan:
-                flagN = True
-                instancia.append('valorNULL')
-            else:
-                if df.at[fila,lista_de_columnas[index]] in {'SIN DEFINIR', 'INDEFINIDO', 'INDEFINIDA', 'NC'}:                    
-                    flagI = True
-                instancia.append(df.at[fila,lista_de_columnas[index]])
-        tupla_instancia = tuple(instancia)
-        if flagI and flagN:
-            if tupla_instancia in dicc.keys():
-                df.at[fila,nombre_nueva_columna] = dicc[tupla_instancia]
-            else:
-                df.at[fila,nombre_nueva_columna] = int(100000) + i
-                dicc[tupla_instancia] = int(100000) + i
-                i += 1
-            flagI,flagN = False,False
-        elif flagN:
-            df.at[fila,nombre_nueva_columna] = int(80000) + j
-            j += 1
-            flagN = False
-        elif flagI: 
-            df.at[fila,nombre_nueva_columna] = int(90000) + k
-            k += 1
-            flagI = False
-        else:
-            if tupla_instancia in dicc.keys():
-                df.at[fila,nombre_nueva_columna] = dicc[tupla_instancia]
-            else:
-                df.at[fila,nombre_nueva_columna] = l
-                dicc[tupla_instancia] = l
-                l += 1
-    dict_df['df'] = df
+    tuplas = df[lista_de_columnas].astype(object)
+    flagN = tuplas.isna().any(axis=1).to_numpy()
+    flagI = tuplas.isin({'SIN DEFINIR', 'INDEFINIDO', 'INDEFINIDA', 'NC'}).any(axis=1).to_numpy()
+
+    ids = np.empty(len(df), dtype=np.int64)
+    # tuplas iguales comparten id (NULL se agrupa como un valor más)
+    ambos = flagI & flagN
+    ids[ambos] = 100000 + tuplas[ambos].groupby(lista_de_columnas, sort=False, dropna=False).ngroup().to_numpy()
+    solo_nulos = flagN & ~flagI
+    ids[solo_nulos] = 80000 + np.arange(solo_nulos.sum())
+    solo_indefinidos = flagI & ~flagN
+    ids[solo_indefinidos] = 90000 + np.arange(solo_indefinidos.sum())
+    normales = ~(flagI | flagN)
+    ids[normales] = tuplas[normales].groupby(lista_de_columnas, sort=False).ngroup().to_numpy()
+
+    dict_df['df'] = df.assign(**{nombre_nueva_columna: ids})
     
 ## Estructura
 # tupla_columnas : (columna_ID, columna_string)
@@ -560,40 +1822,37 @@ def reasignarIDs(dict_df, tupla_columnas=(), lista_de_indefinidos=[]):
     # Nos aseguramos que los datos de entrada cumplan con el tipo de dato necesario para el funcionamoiento de la función.
     if isinstance(dict_df, dict) and isinstance(tupla_columnas, tuple) and len(tupla_columnas) == 2 and isinstance(lista_de_indefinidos,list):
         df = dict_df['df']
-        # Creamos diccionario de id existentes, usando el valor string como clave, y el valor numerico como valor 
-        d = dict()
-        set_ids_prohibidos = set()
-        set_valores_sin_clave = set()
-        for i in range(df.shape[0]):
-            tupla_valores = (df.at[i,tupla_columnas[0]],df.at[i,tupla_columnas[1]])
-            if tupla_valores[1] is np.nan or tupla_valores[1] in lista_de_indefinidos:
-                if isinstance(tupla_valores[0], int) or isinstance(tupla_valores[0], float):
-                    set_ids_prohibidos.add(tupla_valores[0])
-            elif isinstance(tupla_valores[1], str) :
-                if isinstance(tupla_valores[0], int) or isinstance(tupla_valores[0], float) and not pd.isna(tupla_valores[0]):
-                    d[tupla_valores[1]] = tupla_valores[0]
-                elif not tupla_valores[1] in d.keys() :
-                    set_valores_sin_clave.add(tupla_valores[1])
-        
-        maximo_valor = 0
-        if max(d.values()) > max(set_ids_prohibidos):
-            maximo_valor = max(d.values())
-        else:
-            maximo_valor = max(set_ids_prohibidos)            
+        ids = df[tupla_columnas[0]]
+        # Trabajamos sobre los valores distintos de la columna string: codigos
+        # indica, para cada fila, la posición de su valor en valores (-1 si es NULL)
+        codigos, valores = pd.factorize(df[tupla_columnas[1]])
+        es_indefinido = np.array([v in lista_de_indefinidos for v in valores], dtype=bool)
+        es_valido = np.array([isinstance(v, str) for v in valores], dtype=bool) & ~es_indefinido
+        con_valor = codigos >= 0
+        filas_validas = con_valor & es_valido[np.where(con_valor, codigos, 0)]
+        filas_indefinidas = ~con_valor | es_indefinido[np.where(con_valor, codigos, 0)]
+
+        # Diccionario de id existentes, usando el valor string como clave: si un
+        # valor aparece con varios ids, vale el último
+        filas_con_clave = filas_validas & ids.notna().to_numpy()
+        claves = pd.Series(ids.to_numpy()[filas_con_clave], index=codigos[filas_con_clave])
+        claves = claves[~claves.index.duplicated(keep='last')]
+        # Los ids de filas con valor NULL o indefinido no pueden reutilizarse
+        ids_prohibidos = ids[filas_indefinidas].dropna()
+
+        maximo_valor = np.concatenate([claves.to_numpy(dtype=float), ids_prohibidos.to_numpy(dtype=float)]).max()
         # Reasignamos ids
         maximo_valor += 10000 #10⁴
-        j = 0
-        for i in range(df.shape[0]):
-            tupla_valores = (df.at[i,tupla_columnas[0]],df.at[i,tupla_columnas[1]])
-            if not(tupla_valores[1] is np.nan or tupla_valores[1] in lista_de_indefinidos) and isinstance(tupla_valores[1], str):
-                if tupla_valores[1] in d.keys():
-                    df.at[i,tupla_columnas[0]] = d[tupla_valores[1]]
-                elif tupla_valores[1] in set_valores_sin_clave:
-                    d[tupla_valores[1]] = maximo_valor + j
-                    df.at[i,tupla_columnas[0]] = maximo_valor + j
-                    set_valores_sin_clave.remove(tupla_valores[1])
-                    j += 1
-        dict_df['df'] = df
+        # Los valores sin clave reciben ids nuevos en orden de primera aparición
+        sin_clave = pd.unique(codigos[filas_validas])
+        sin_clave = sin_clave[~np.isin(sin_clave, claves.index)]
+        nuevos_ids = np.full(len(valores), np.nan)
+        nuevos_ids[claves.index] = claves.to_numpy(dtype=float)
+        nuevos_ids[sin_clave] = maximo_valor + np.arange(len(sin_clave))
+
+        columna = ids.to_numpy(dtype=float, na_value=np.nan)
+        columna[filas_validas] = nuevos_ids[codigos[filas_validas]]
+        dict_df['df'] = df.assign(**{tupla_columnas[0]: pd.Series(columna, index=df.index).astype(ids.dtype)})
     else:
         print("Parametros de entrada incorrectos para el funcionamiento de la función.")
         return None
@@ -628,9 +1887,12 @@ def agregarColumnaMantieneCantidadDeTuplasUnicas(dict_df1, lcols, colname, debug
 
 
 def obtenerDFCandidata(dict_df, listacols):
+    # X -> A vale si particionar por X y por X∪{A} da el mismo error (ver abajo)
+    error = errorDeParticion(particionDespojada(dict_df, listacols), len(dict_df['df']))
     for i in list(dict_df['df'].columns):
         if i not in listacols:
-            if agregarColumnaMantieneCantidadDeTuplasUnicas(dict_df, listacols, i):
+            particion = particionDespojada(dict_df, list(listacols) + [i])
+            if errorDeParticion(particion, len(dict_df['df'])) == error:
                 print("Según los datos existentes en la tabla, la columna",
                       dict_df['name'] +"['" + str(i) + "']",
                       "depende funcionalmente de", dict_df['name'] + str(listacols) + "\n")
@@ -643,6 +1905,169 @@ def obtenerDFCandidata(dict_df, listacols):
 # obtenerDFCandidata(operadores, ['rubro'])
 
 
+## ESTRUCTURA: particion despojada (stripped partition)
+# Tupla (filas, clases, cant_clases). Agrupa las filas de la tabla según los 
+# valores de un conjunto de columnas (NULL cuenta como un valor más, como en 
+# drop_duplicates), pero solo guarda las filas de grupos con más de una fila:
+#   filas       = array con las posiciones de esas filas
+#   clases      = array con el número de grupo de cada una (0..cant_clases-1)
+#   cant_clases = cantidad de grupos con más de una fila
+# Las filas que quedan solas en su grupo no influyen en ninguna dependencia, 
+# así que no hace falta guardarlas.
+
+
+# Retorna la partición despojada de una sola columna
+def particionDeColumna(dict_df, columna):
+    codigos = gruposDeTabla(dict_df, [columna])[0]
+    return despojarParticion(np.arange(len(codigos)), codigos)
+
+
+# Dadas las filas y un código de grupo para cada una, descarta los grupos de 
+# una sola fila y renumera los restantes
+def despojarParticion(filas, codigos):
+    if len(codigos) == 0:
+        return (filas, codigos, 0)
+    unicos, inversa, cantidades = np.unique(codigos, return_inverse=True, return_counts=True)
+    quedan = cantidades[inversa] > 1
+    renumeracion = np.cumsum(cantidades > 1) - 1
+    return (filas[quedan], renumeracion[inversa[quedan]], int((cantidades > 1).sum()))
+
+
+# Producto de dos particiones despojadas: la partición por la unión de sus 
+# columnas. Una fila sola en alguna de las dos queda sola en el producto.
+def productoDeParticiones(particion1, particion2, cant_filas):
+    filas1, clases1, _ = particion1
+    filas2, clases2, cant2 = particion2
+    clase_en_2 = np.full(cant_filas, -1, dtype=np.int64)
+    clase_en_2[filas2] = clases2
+    clases_de_filas1 = clase_en_2[filas1]
+    en_ambas = clases_de_filas1 >= 0
+    codigos = clases1[en_ambas].astype(np.int64) * cant2 + clases_de_filas1[en_ambas]
+    return despojarParticion(filas1[en_ambas], codigos)
+
+
+# Retorna la partición despojada de la tabla por un conjunto de columnas. Las 
+# particiones se guardan en el cache de la tabla, y la de un conjunto nuevo se 
+# arma como producto de particiones ya calculadas.
+def particionDespojada(dict_df, columnas):
+    particiones = cacheDeTabla(dict_df, 'particiones_despojadas')
+    clave = tuple(sorted(set(columnas)))
+    if clave not in particiones:
+        if len(clave) == 0:
+            cant_filas = len(dict_df['df'])
+            filas = np.arange(cant_filas) if cant_filas > 1 else np.arange(0)
+            particiones[clave] = (filas, np.zeros(len(filas), dtype=np.int64), int(cant_filas > 1))
+        elif len(clave) == 1:
+            particiones[clave] = particionDeColumna(dict_df, clave[0])
+        else:
+            particiones[clave] = productoDeParticiones(particionDespojada(dict_df, clave[:-1]),
+                                                      particionDespojada(dict_df, clave[-1:]),
+                                                      len(dict_df['df']))
+    return particiones[clave]
+
+
+# e(X): proporción de filas que habría que borrar para que X sea clave
+def errorDeParticion(particion, cant_filas):
+    return (len(particion[0]) - particion[2]) / cant_filas if cant_filas > 0 else 0.0
+
+
+# Error g3 de la dependencia X -> A: proporción mínima de filas que habría que
+# borrar para que la dependencia valga. Recibe las particiones de X y de X∪{A}.
+def errorDeDependencia(particion_x, particion_xa, cant_filas):
+    filas_x, clases_x, cant_x = particion_x
+    filas_xa, clases_xa, cant_xa = particion_xa
+    if cant_filas == 0 or cant_x == 0:
+        return 0.0
+    # Tamaño del grupo de X∪{A} de cada fila (1 si quedó sola)
+    tam_grupo_xa = np.ones(cant_filas, dtype=np.int64)
+    tam_grupo_xa[filas_xa] = np.bincount(clases_xa, minlength=cant_xa)[clases_xa]
+    # Por cada grupo de X se conserva su subgrupo más grande de X∪{A}
+    mayor_subgrupo = np.zeros(cant_x, dtype=np.int64)
+    np.maximum.at(mayor_subgrupo, clases_x, tam_grupo_xa[filas_x])
+    return (len(filas_x) - mayor_subgrupo.sum()) / cant_filas
+
+
+def dependenciasFuncionales(dict_df, max_lhs=3, error_maximo=0.0, columnas=None, verbose=True):
+    """
+    Encuentra todas las dependencias funcionales minimales X -> A de la tabla, 
+    con el algoritmo TANE: recorre los conjuntos de columnas por niveles (de a 
+    una columna, de a dos, ...) usando particiones despojadas, y descarta los 
+    conjuntos que ya no pueden dar dependencias nuevas.
+    
+    Argumentos:
+        dict_df = metadata correspondiente al dataframe.
+        max_lhs = cantidad máxima de columnas del lado izquierdo (X).
+        error_maximo = proporción de filas que se permite violar la dependencia 
+            (error g3). Con 0 se buscan solo dependencias exactas.
+        columnas = columnas a considerar (por defecto, todas).
+        verbose = si es True, imprime las dependencias encontradas.
+    Retorna un dataframe con columnas 'determinante' (tupla de columnas), 
+    'dependiente' y 'error', en el orden en que fueron encontradas.
+    """
+    if columnas is None:
+        columnas = list(dict_df['df'].columns)
+    cant_filas = len(dict_df['df'])
+    todas = frozenset(columnas)
+    orden = {col: i for i, col in enumerate(columnas)}
+    ordenar = lambda conjunto: tuple(sorted(conjunto, key=orden.get))
+
+    def particion(conjunto):
+        return particionDespojada(dict_df, ordenar(conjunto))
+
+    res = []
+    # C+(X): columnas que todavía pueden ser lado derecho de una dependencia 
+    # minimal con lado izquierdo contenido en X
+    candidatos = {frozenset(): todas}
+    nivel = [frozenset([col]) for col in columnas]
+    tam = 1
+    while nivel and tam <= max_lhs + 1:
+        for x in nivel:
+            candidatos[x] = frozenset.intersection(*[candidatos.get(x - {a}, frozenset()) for a in x])
+        # Dependencias (X \ {A}) -> A
+        for x in nivel:
+            for a in ordenar(x & candidatos[x]):
+                lhs = x - {a}
+                error = errorDeDependencia(particion(lhs), particion(x), cant_filas)
+                if error <= error_maximo:
+                    res.append((ordenar(lhs), a, error))
+                    candidatos[x] = candidatos[x] - {a}
+                    if error == 0:
+                        candidatos[x] = candidatos[x] - (todas - x)
+        # Poda: sin candidatos no hay dependencias nuevas en los superconjuntos
+        nivel = [x for x in nivel if candidatos[x]]
+        # Siguiente nivel: uniones de conjuntos que comparten todo menos una 
+        # columna y cuyos subconjuntos están todos en el nivel actual
+        presentes = set(nivel)
+        ordenados = sorted(ordenar(x) for x in nivel)
+        siguiente = []
+        for i, x in enumerate(ordenados):
+            for y in ordenados[i+1:]:
+                if x[:-1] != y[:-1]:
+                    break
+                union = frozenset(x + y[-1:])
+                if all(union - {c} in presentes for c in union):
+                    siguiente.append(union)
+        nivel = siguiente
+        tam += 1
+
+    res = pd.DataFrame(res, columns=['determinante', 'dependiente', 'error'])
+    if verbose:
+        for det, dep, error in res.itertuples(index=False):
+            texto = "Según los datos existentes en la tabla, la columna " + dict_df['name'] + "['" + str(dep) + "']" + \
+                    " depende funcionalmente de " + dict_df['name'] + str(list(det))
+            if error > 0:
+                texto += " (error " + str(round(100 * error, 2)) + "%)"
+            print(texto)
+        print("----------------------")
+    return res
+
+
+# Ejemplo de uso:
+#
+# dependenciasFuncionales(operadores, max_lhs=2)
+# dependenciasFuncionales(operadores, max_lhs=2, error_maximo=0.01)
+
+
 
 # =============================================================================
 # FUNCIONES PARA LA VISUALIZACIÓN
@@ -660,5 +2085,162 @@ def cant_trozos_texto_separados_por_comas_e_yes(texto):
             res = res + 1 
     return res 
 
+# ' y ' o ' Y ': solo se consume la letra, así cuentan también las apariciones
+# que comparten un espacio (ej. 'a y y b')
+PATRON_Y = re.compile(r'(?<= )[yY](?= )')
+
+# Versión vectorizada de cant_trozos_texto_separados_por_comas_e_yes sobre una
+# serie de textos. Igual que la original, no cuenta comas en el primer ni en el
+# último caracter (una 'y' rodeada de espacios nunca está en los extremos).
+# Como los textos se repiten mucho, se cuenta una vez por texto distinto.
+# Los NULL no tienen cantidad: quedan como NA (factorize les da el código -1,
+# que indexado en 'cantidades' tomaría la del último texto).
+def cant_trozos_serie_separados_por_comas_e_yes(serie):
+    codigos, textos = pd.factorize(serie)
+    textos = pd.Series(textos, dtype=object)
+    cantidades = (1 + textos.str[1:-1].str.count(',') + textos.str.count(PATRON_Y)).to_numpy()
+    res = pd.Series(cantidades, dtype='Int64').reindex(codigos)
+    return pd.Series(res.array, index=serie.index, name=serie.name)
+
+
+## ESTRUCTURA: figura
+# Diccionario con lo necesario para dibujar una figura:
+#   'name'     = nombre de la figura (y de su archivo PNG)
+#   'graficar' = función que dibuja la figura a partir de su dataframe
+#   'df'       = dataframe ya calculado con los datos de la figura
+#   'args'     = (opcional) diccionario con otros argumentos de 'graficar'
+
+
+def grafico_operadores_por_provincia(df):
+    import matplotlib.pyplot as plt
+    # Ordenamos las provincias por cantidad de Operadores
+    indices_ordenados = np.argsort(df['cantidad_operadores'])
+    provincias_ordenadas = [df['provincia'][i] for i in indices_ordenados]
+    cant_operadores_ordenados = [df['cantidad_operadores'][i] for i in indices_ordenados]
+    plt.bar(provincias_ordenadas, cant_operadores_ordenados)
+    plt.xlabel('Provincia')
+    plt.ylabel('Cantidad de Operadores')
+    plt.title('Cantidad de Operadores por provincia')
+    plt.xticks(rotation='vertical')
+
+
+def grafico_productos_por_provincia(df):
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.boxplot(data=df, x='provincia', y='cant_de_prod')
+    plt.xlabel('Provincia')
+    plt.ylabel('Cantidad de productos por Operador')
+    plt.title('Cantidad de productos por operador, para cada provincia')
+    plt.xticks(rotation='vertical')
+
+
+def grafico_operadores_y_salario_por_provincia(df, clae2):
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.scatterplot(data=df, x='cantidad_establecimientos',
+                    y='salario_promedio_provincial', hue='provincia',
+                    palette='bright')
+    plt.xlabel('Cantidad de operadores')
+    plt.ylabel('Salario promedio provincial ($)')
+    plt.title('Relación entre cantidad de operadores y salario promedio, para cada provincia, para la actividad clae2 ' + str(clae2))
+    plt.legend(bbox_to_anchor=(1, 1), loc='upper left')
+
+
+def grafico_salarios_por_provincia(df):
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.violinplot(data=df, x='provincia', y='w_median')
+    plt.xlabel('Provincia')
+    plt.ylabel('Salario promedio ($)')
+    plt.title('Salario promedio para cada provincia en diciembre de 2022')
+    plt.xticks(rotation='vertical')
+
+
+def grafico_salario_vs_establecimientos(df, titulo_extra=''):
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.scatterplot(data=df, x='cant_establecimientos',
+                    y='prom_salario', hue='provincia',
+                    palette='bright')
+    plt.xlabel('Desarrollo act. orgánicos (cant. de operadores)')
+    plt.ylabel('Salario promedio por departamento ($)')
+    plt.title('Relación entre cantidad de operadores y salario promedio, para cada departamento del país.'+titulo_extra)
+    plt.legend(bbox_to_anchor=(1, 1), loc='upper left')
+
+
+# Hash de todo lo que determina la imagen de una figura: sus datos, sus 
+# argumentos y el código de la función que la dibuja
+def hash_de_figura(figura):
+    h = hashlib.sha256()
+    h.update(figura['name'].encode())
+    h.update(inspect.getsource(figura['graficar']).encode())
+    h.update(repr(sorted(figura.get('args', {}).items())).encode())
+    h.update(repr(list(figura['df'].columns)).encode())
+    h.update(hashDeTuplas(figura['df']).tobytes())
+    return h.hexdigest()
+
+
+# Dibuja una figura sin pantalla y la guarda en ruta. Se ejecuta en los 
+# procesos de graficar_figuras, que reciben solo la figura (con su dataframe).
+def renderizar_figura(figura, ruta):
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    figura['graficar'](figura['df'], **figura.get('args', {}))
+    plt.savefig(ruta, bbox_inches='tight')
+    plt.close('all')
+    return ruta
+
+
+def graficar_figuras(figuras, directorio=None, procesos=None, verbose=True):
+    """
+    Dibuja las figuras (ver estructura arriba). Si directorio es None, las 
+    muestra una por una en pantalla. Si no, las guarda como PNG en directorio,
+    repartiéndolas en un pool de procesos, y saltea las figuras cuyo hash 
+    (datos, argumentos y código) no cambió desde la corrida anterior. Retorna
+    los nombres de las figuras dibujadas.
+    
+    Argumentos:
+        figuras = lista de figuras.
+        directorio = directorio donde guardar los PNG (o None).
+        procesos = cantidad máxima de procesos (por defecto, uno por núcleo).
+    """
+    if directorio is None:
+        import matplotlib.pyplot as plt
+        for figura in figuras:
+            figura['graficar'](figura['df'], **figura.get('args', {}))
+            plt.show()
+            plt.close()
+        return [figura['name'] for figura in figuras]
+
+    os.makedirs(directorio, exist_ok=True)
+    ruta_indice = directorio + '/figuras.json'
+    indice = dict()
+    if os.path.exists(ruta_indice):
+        with open(ruta_indice) as f:
+            indice = json.load(f)
+    pendientes = []
+    for figura in figuras:
+        hash_figura = hash_de_figura(figura)
+        ruta = directorio + '/' + figura['name'] + '.png'
+        if indice.get(figura['name']) != hash_figura or not os.path.exists(ruta):
+            pendientes.append((figura, ruta, hash_figura))
+
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    procesos = min(procesos, len(pendientes))
+    if procesos > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            list(pool.map(renderizar_figura, [p[0] for p in pendientes], [p[1] for p in pendientes]))
+    else:
+        for figura, ruta, _ in pendientes:
+            renderizar_figura(figura, ruta)
 
-
+    for figura, _, hash_figura in pendientes:
+        indice[figura['name']] = hash_figura
+    with open(ruta_indice, 'w') as f:
+        json.dump(indice, f, indent=1, sort_keys=True)
+    if verbose:
+        print("Figuras: " + str(len(pendientes)) + " generadas y " + str(len(figuras) - len(pendientes)) + 
+              " sin cambios en " + directorio)
+    return [figura['name'] for figura, _, _ in pendientes]
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+  Archivo: generador.py
+  Proyecto para Laboratorio de datos, Facultad de Ciencias Exactas y Naturales, UBA
+  Integrantes del grupo: Ariel Dembling, Antony Suárez Caina, Camila Guibaudo
+  Fecha: 18/10/26
+  Descripción: generador de datos sintéticos con los mismos esquemas que las
+  seis fuentes del proyecto (padrón de operadores, salarios, localidades,
+  departamentos, clae y rubro_categoria_clae2), a una escala configurable. Sirve
+  para correr testing.py, desarrollo.py y los benchmarks sin las tablas
+  originales, y para medir cómo escalan con volúmenes mayores a los actuales.
+  Uso: python generador.py DIRECTORIO [--escala 10] [--semilla 0] [--meses 108]
+"""
+
+# =============================================================================
+# LIBRERÍAS
+# =============================================================================
+import pandas as pd
+import numpy as np
+import argparse
+import shutil
+import os
+
+directorio_limpias = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'TablasLimpias')
+
+
+# =============================================================================
+# PARÁMETROS
+# =============================================================================
+
+### Volúmenes de las fuentes a escala 1 (aproximadamente los de las fuentes
+### reales). Con escala e, cada volumen se multiplica por e; los diccionarios
+### de provincias, clae2 y rubros no dependen de la escala.
+VOLUMENES = {'deptos_por_provincia': 22,     # 521 departamentos en total (527 en la fuente)
+             'deptos_por_provincia_caba': 15,  # comunas
+             'localidades': 3527,
+             'municipios_por_depto': 3,
+             'operadores': 1396,
+             'claes_por_depto': 20}           # clae2 con salarios relevados en cada departamento
+
+### Proporciones de valores NULL, indefinidos y repetidos, y de coincidencias
+### entre fuentes. Las de w_median negativos y de cubrimiento de los
+### departamentos del padrón son las medidas en la exploración (ver GQM 7 y 8
+### en desarrollo.py); el resto, aproximaciones de lo observado en las fuentes.
+TASAS = {'operadores_repetidos': 0.02,              # tuplas repetidas sobrantes del padrón
+         'operadores_depto_en_deptos': 0.40,        # departamento = nombre de un departamento
+         'operadores_depto_en_localidades': 0.20,   # departamento = nombre de localidad o municipio
+         'operadores_depto_null': 0.03,
+         'operadores_depto_indefinido': 0.05,       # 'INDEFINIDO'
+         'operadores_localidad_indefinida': 0.04,   # 'INDEFINIDA'
+         'operadores_rubro_null': 0.01,
+         'operadores_rubro_sin_definir': 0.02,      # 'SIN DEFINIR'
+         'operadores_productos_null': 0.01,
+         'operadores_establecimiento_null': 0.02,
+         'operadores_establecimiento_nc': 0.08,     # 'NC'
+         'localidades_sin_municipio': 0.15,
+         'localidades_municipio_sin_id': 0.05,      # con municipio_nombre pero sin municipio_id
+         'localidades_depto_con_otro_nombre': 0.06, # departamentos cuyo nombre difiere del de deptos
+         'salarios_deptos_sin_datos': 0.03,
+         'salarios_w_median_negativo': 0.2242}      # se informan como -99
+
+# Crecimiento nominal de los salarios entre enero de 2014 y diciembre de 2022
+CRECIMIENTO_SALARIOS = 20
+
+SILABAS = ['ca', 'ma', 'ra', 'ta', 'lo', 'mi', 'san', 'to', 'ré', 'gua', 'ña', 'có', 'li', 'ne',
+           'pe', 'güi', 'tá', 'co', 'rí', 'ba', 'chi', 'la', 'mo', 'que', 'do', 'ya', 'ho', 'nú']
+PREFIJOS = ['', '', '', 'San ', 'Santa ', 'General ', 'Coronel ', 'Villa ', 'Presidente ', 'Capitán ']
+PRODUCTOS = ['MANZANA', 'PERA', 'VINO', 'MIEL', 'YERBA MATE', 'TE', 'LIMON', 'NUEZ', 'TRIGO', 'SOJA',
+             'MAIZ', 'GIRASOL', 'ARANDANO', 'OLIVA', 'HORTALIZAS', 'GANADO BOVINO', 'LANA', 'AJO',
+             'CIRUELA', 'DURAZNO', 'ACEITE DE OLIVA', 'JUGO CONCENTRADO DE MANZANA', 'AZUCAR DE CAÑA']
+CERTIFICADORAS = ['ORGANIZACION INTERNACIONAL AGROPECUARIA S.A.', 'ARGENCERT S.A.', 'FOOD SAFETY S.A.',
+                  'LETIS S.A.', 'ECOCERT ARGENTINA S.A.', 'KIWA BCS ÖKO-GARANTIE']
+# Secciones (letras) del clasificador de actividades y sus clae2
+LETRAS_CLAE = {'A': range(1, 4), 'B': range(5, 10), 'C': range(10, 34), 'D': range(35, 36),
+               'E': range(36, 40), 'F': range(41, 44), 'G': range(45, 48), 'H': range(49, 54),
+               'I': range(55, 57), 'J': range(58, 64), 'K': range(64, 67), 'L': range(68, 69),
+               'M': range(69, 76), 'N': range(77, 83), 'O': range(84, 85), 'P': range(85, 86),
+               'Q': range(86, 89), 'R': range(90, 94), 'S': range(94, 97), 'T': range(97, 99),
+               'U': range(99, 100)}
+
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+
+# Cada tabla usa su propio generador de números aleatorios, así que lo que se
+# genera para una no depende de las demás (ni, por ejemplo, de meses).
+def generadorAleatorio(semilla, *claves):
+    return np.random.default_rng([semilla, *claves])
+
+
+# Arreglo de n nombres inventados ("San Cotaré", "Guañalo", ...)
+def nombres(rng, n, con_prefijo=True):
+    silabas = rng.choice(SILABAS, size=(n, 4))
+    largos = rng.integers(2, 5, n)
+    prefijos = rng.choice(PREFIJOS, n) if con_prefijo else np.full(n, '')
+    return np.array([p + ''.join(s[:k]).capitalize() for p, s, k in zip(prefijos, silabas, largos)], dtype=object)
+
+
+# Hace únicos los nombres repetidos dentro de cada grupo agregándoles un número
+def nombresUnicos(nombres, grupos):
+    repeticion = pd.DataFrame({'nombre': nombres, 'grupo': grupos}).groupby(['grupo', 'nombre']).cumcount().to_numpy()
+    return np.where(repeticion == 0, nombres, nombres + ' ' + (repeticion + 1).astype(str))
+
+
+# Reemplaza por valor una proporción tasa de los elementos del arreglo
+def reemplazar(rng, arreglo, tasa, valor):
+    arreglo[rng.random(len(arreglo)) < tasa] = valor
+    return arreglo
+
+
+# =============================================================================
+# FUNCIONES DE GENERACIÓN
+# =============================================================================
+
+## ESTRUCTURA: fuentes
+# Diccionario con un dataframe por fuente, con las mismas columnas (y tipos)
+# que resultan de leer los CSV originales con pd.read_csv. Las claves son los
+# nombres de las tablas en desarrollo.py:
+#   'operadores', 'salarios', 'localidades', 'deptos', 'clae', 'rubro_categoria_clae2'
+
+
+def leerDiccionarios():
+    provincias = pd.read_csv(os.path.join(directorio_limpias, 'provincias_comparadas.csv'))
+    rcc = pd.read_csv(os.path.join(directorio_limpias, 'rubro_categoria_clae2.csv'))
+    return provincias, rcc
+
+
+# DEPTOS(codigo_departamento_indec, nombre_departamento_indec, id_provincia_indec, nombre_provincia_indec)
+def generarDeptos(semilla, escala, provincias):
+    rng = generadorAleatorio(semilla, 1)
+    cantidades = np.where(provincias['provincia_id'] == 2, VOLUMENES['deptos_por_provincia_caba'],
+                          VOLUMENES['deptos_por_provincia'])
+    cantidades = np.maximum(1, np.round(cantidades * escala).astype(int))
+    # Los códigos son id de provincia seguido del número de departamento (de 7
+    # en 7, como en los originales, mientras entren en 3 dígitos)
+    maximo = cantidades.max()
+    paso = 7 if 7 * maximo < 1000 else 1
+    multiplicador = 1000 if paso * maximo < 1000 else 10 ** len(str(maximo))
+    fila_provincia = np.repeat(np.arange(len(provincias)), cantidades)
+    numero = np.concatenate([np.arange(1, c + 1) for c in cantidades])
+    prov = provincias.iloc[fila_provincia].reset_index(drop=True)
+    deptos = pd.DataFrame({'codigo_departamento_indec': prov['provincia_id'].to_numpy() * multiplicador + paso * numero,
+                           'nombre_departamento_indec': nombresUnicos(nombres(rng, len(prov)), prov['provincia_id'].to_numpy()),
+                           'id_provincia_indec': prov['provincia_id'],
+                           'nombre_provincia_indec': prov['nombre_provincia_indec']})
+    return deptos
+
+
+# CLAE(clae2, clae2_desc, letra, letra_desc)
+def generarClae(rcc):
+    descripciones = dict(zip(rcc['clae2'], rcc['clae2_desc']))
+    filas = []
+    for letra, claes in LETRAS_CLAE.items():
+        for clae2 in claes:
+            filas.append((clae2, descripciones.get(clae2, 'Actividad ' + str(clae2)), letra,
+                          'Sección ' + letra))
+    return pd.DataFrame(filas, columns=['clae2', 'clae2_desc', 'letra', 'letra_desc'])
+
+
+# LOCALIDADES(categoria, centroide_lat, centroide_lon, departamento_id, departamento_nombre, fuente, funcion, id, municipio_id, municipio_nombre, nombre, provincia_id, provincia_nombre)
+def generarLocalidades(semilla, escala, provincias, deptos):
+    rng = generadorAleatorio(semilla, 2)
+    n = max(len(deptos), int(round(VOLUMENES['localidades'] * escala)))
+    # Todo departamento tiene al menos una localidad (su cabecera)
+    fila_depto = np.concatenate([np.arange(len(deptos)), rng.integers(0, len(deptos), n - len(deptos))])
+    fila_depto.sort()
+    depto = deptos.iloc[fila_depto].reset_index(drop=True)
+    # Algunos departamentos figuran con otro nombre que en deptos
+    otro_nombre = rng.random(len(deptos)) < TASAS['localidades_depto_con_otro_nombre']
+    nombres_depto = np.where(otro_nombre, 'Partido de ' + deptos['nombre_departamento_indec'],
+                             deptos['nombre_departamento_indec'])
+    # Cada localidad pertenece a uno de los municipios de su departamento
+    k = VOLUMENES['municipios_por_depto']
+    municipio = rng.integers(0, k, n)
+    nombres_municipio = nombres(rng, len(deptos) * k)
+    municipio_id = (depto['codigo_departamento_indec'].to_numpy() * 10 + municipio).astype(float)
+    municipio_nombre = nombres_municipio[fila_depto * k + municipio]
+    sin_municipio = rng.random(n) < TASAS['localidades_sin_municipio']
+    municipio_id[sin_municipio] = np.nan
+    municipio_nombre[sin_municipio] = np.nan
+    # y otras tienen el nombre del municipio pero no su id
+    municipio_id[~sin_municipio & (rng.random(n) < TASAS['localidades_municipio_sin_id'])] = np.nan
+    # La primera localidad de cada departamento es su cabecera
+    funcion = np.full(n, np.nan, dtype=object)
+    funcion[np.r_[True, fila_depto[1:] != fila_depto[:-1]]] = 'CABECERA_DEPARTAMENTO'
+    provincia_nombre = dict(zip(provincias['provincia_id'], provincias['provincia_nombre']))
+    return pd.DataFrame({'categoria': rng.choice(['Localidad simple', 'Componente de localidad compuesta', 'Entidad'],
+                                                 n, p=[0.7, 0.2, 0.1]),
+                         'centroide_lat': rng.uniform(-55, -21.8, n).round(6),
+                         'centroide_lon': rng.uniform(-73.5, -53.6, n).round(6),
+                         'departamento_id': depto['codigo_departamento_indec'],
+                         'departamento_nombre': nombres_depto[fila_depto],
+                         'fuente': rng.choice(['INDEC', 'BAHRA'], n, p=[0.8, 0.2]),
+                         'funcion': funcion,
+                         'id': depto['codigo_departamento_indec'].to_numpy().astype(np.int64) * 10000 + np.arange(n) % 10000,
+                         'municipio_id': municipio_id,
+                         'municipio_nombre': municipio_nombre,
+                         'nombre': nombres(rng, n),
+                         'provincia_id': depto['id_provincia_indec'],
+                         'provincia_nombre': depto['id_provincia_indec'].map(provincia_nombre)})
+
+
+# OPERADORES(pais_id, pais, provincia_id, provincia, departamento, localidad, rubro, productos, categoria_id, categoria_desc, Certificadora_id, certificadora_deno, razón social, establecimiento)
+def generarOperadores(semilla, escala, provincias, localidades, rcc):
+    rng = generadorAleatorio(semilla, 3)
+    n = int(round(VOLUMENES['operadores'] * escala))
+    # Cada operador está en alguna localidad; de ella salen su departamento y provincia
+    loc = localidades.iloc[rng.integers(0, len(localidades), n)].reset_index(drop=True)
+    provincia = dict(zip(provincias['provincia_id'], provincias['provincia']))
+
+    # El departamento se informa de distintas maneras: con el nombre del
+    # departamento, con el de la localidad o el municipio, con un nombre que no
+    # figura en las otras fuentes, como indefinido o NULL
+    u = rng.random(n)
+    cotas = np.cumsum([TASAS['operadores_depto_en_deptos'], TASAS['operadores_depto_en_localidades'],
+                       TASAS['operadores_depto_null'], TASAS['operadores_depto_indefinido']])
+    departamento = ('PARAJE ' + pd.Series(nombres(rng, n, con_prefijo=False)).str.upper()).to_numpy()
+    departamento = np.where(u < cotas[3], 'INDEFINIDO', departamento).astype(object)
+    departamento[u < cotas[2]] = np.nan
+    por_localidad = np.where(loc['municipio_nombre'].notna() & (rng.random(n) < 0.5), loc['municipio_nombre'], loc['nombre'])
+    departamento = np.where(u < cotas[1], pd.Series(por_localidad).str.upper(), departamento)
+    departamento = np.where(u < cotas[0], loc['departamento_nombre'].str.upper(), departamento)
+
+    localidad = reemplazar(rng, loc['nombre'].str.upper().to_numpy(), TASAS['operadores_localidad_indefinida'], 'INDEFINIDA')
+
+    # Los rubros son los de rubro_categoria_clae2, unos mucho más frecuentes que
+    # otros. El rubro NULL y 'SIN DEFINIR' (que también figuran allí, con su
+    # categoría) se asignan según sus tasas.
+    sin_definir = rcc['rubro'] == 'SIN DEFINIR'
+    pesos = (rng.pareto(1.5, len(rcc)) + 0.01) * (rcc['rubro'].notna() & ~sin_definir)
+    fila_rubro = rng.choice(len(rcc), n, p=pesos / pesos.sum())
+    u = rng.random(n)
+    fila_rubro[u < TASAS['operadores_rubro_sin_definir'] + TASAS['operadores_rubro_null']] = np.flatnonzero(sin_definir)[0]
+    fila_rubro[u < TASAS['operadores_rubro_null']] = np.flatnonzero(rcc['rubro'].isna())[0]
+    rubro = rcc.iloc[fila_rubro].reset_index(drop=True)
+
+    # Listas de productos separadas por comas y por " Y "
+    cantidades = rng.integers(1, 5, n)
+    elegidos = rng.choice(PRODUCTOS, size=(n, 4))
+    productos = np.array([', '.join(p[:k - 1]) + (' Y ' if k > 1 else '') + p[k - 1] for p, k in zip(elegidos, cantidades)],
+                         dtype=object)
+    productos = reemplazar(rng, productos, TASAS['operadores_productos_null'], np.nan)
+
+    certificadora = rng.integers(0, len(CERTIFICADORAS), n)
+    # Hay razones sociales con varios establecimientos
+    razon = pd.Series(nombres(rng, max(1, int(n * 0.75)), con_prefijo=False)).str.upper() + rng.choice([' S.A.', ' S.R.L.', ' S.A.S.', ''], max(1, int(n * 0.75)))
+    razon_social = razon.to_numpy()[rng.integers(0, len(razon), n)]
+    establecimiento = ('ESTABLECIMIENTO ' + pd.Series(nombres(rng, n, con_prefijo=False)).str.upper()).to_numpy()
+    u = rng.random(n)
+    establecimiento[u < TASAS['operadores_establecimiento_nc'] + TASAS['operadores_establecimiento_null']] = 'NC'
+    establecimiento[u < TASAS['operadores_establecimiento_null']] = np.nan
+
+    operadores = pd.DataFrame({'pais_id': 32, 'pais': 'ARGENTINA',
+                               'provincia_id': loc['provincia_id'], 'provincia': loc['provincia_id'].map(provincia),
+                               'departamento': departamento, 'localidad': localidad,
+                               'rubro': rubro['rubro'], 'productos': productos,
+                               'categoria_id': rubro['categoria_id'], 'categoria_desc': rubro['categoria_desc'],
+                               'Certificadora_id': certificadora + 1,
+                               'certificadora_deno': np.array(CERTIFICADORAS, dtype=object)[certificadora],
+                               'razón social': razon_social, 'establecimiento': establecimiento})
+    # Tuplas repetidas, en posiciones al azar
+    repetidas = rng.integers(0, n, int(round(n * TASAS['operadores_repetidos'])))
+    operadores = operadores.iloc[np.sort(np.concatenate([np.arange(n), repetidas]), kind='stable')]
+    return operadores.reset_index(drop=True)
+
+
+# Pares (departamento, clae2) con salarios relevados y su salario de base
+def paresDeSalarios(semilla, deptos, clae, rcc):
+    rng = generadorAleatorio(semilla, 4)
+    con_datos = deptos[rng.random(len(deptos)) >= TASAS['salarios_deptos_sin_datos']]
+    # Las clae2 de los operadores se relevan en todos los departamentos; el
+    # resto, al azar
+    fijas = np.isin(clae['clae2'], rcc['clae2'].unique())
+    proba = max(0, VOLUMENES['claes_por_depto'] - fijas.sum()) / max(1, (~fijas).sum())
+    relevadas = fijas | (rng.random((len(con_datos), len(clae))) < proba)
+    fila, columna = np.nonzero(relevadas)
+    return pd.DataFrame({'codigo_departamento_indec': con_datos['codigo_departamento_indec'].to_numpy()[fila],
+                         'id_provincia_indec': con_datos['id_provincia_indec'].to_numpy()[fila],
+                         'clae2': clae['clae2'].to_numpy()[columna],
+                         'base': rng.lognormal(np.log(9000), 0.5, len(fila))})
+
+
+# SALARIOS(fecha, codigo_departamento_indec, id_provincia_indec, clae2, w_median) de un mes
+def salariosDelMes(semilla, pares, mes):
+    rng = generadorAleatorio(semilla, 5, mes)
+    crecimiento = CRECIMIENTO_SALARIOS ** (mes / 107)
+    w_median = (pares['base'].to_numpy() * crecimiento * rng.lognormal(0, 0.05, len(pares))).round(2)
+    w_median = reemplazar(rng, w_median, TASAS['salarios_w_median_negativo'], -99)
+    fecha = (pd.Timestamp('2014-01-01') + pd.DateOffset(months=mes)).strftime('%Y-%m-%d')
+    return pd.DataFrame({'fecha': fecha, 'codigo_departamento_indec': pares['codigo_departamento_indec'],
+                         'id_provincia_indec': pares['id_provincia_indec'], 'clae2': pares['clae2'],
+                         'w_median': w_median})
+
+
+def escalaValida(escala):
+    if not 1 <= escala <= 1000:
+        print("ERROR: la escala debe estar entre 1 y 1000 (se pidió " + str(escala) + ").")
+        return False
+    return True
+
+
+def generarFuentes(escala=1, semilla=0, meses=108):
+    """
+    Genera las seis fuentes (ver estructura arriba) con la escala y la semilla
+    dadas. La misma semilla genera siempre las mismas tablas.
+
+    Argumentos:
+        escala = factor de volumen respecto de las fuentes reales (de 1 a 1000).
+        semilla = semilla de los generadores de números aleatorios.
+        meses = cantidad de meses de salarios, desde enero de 2014. Los
+            salarios crecen con la escala y con los meses; para escalas
+            grandes conviene guardarFuentes, que los genera de a un mes.
+    """
+    if not escalaValida(escala):
+        return None
+    provincias, rcc = leerDiccionarios()
+    deptos = generarDeptos(semilla, escala, provincias)
+    clae = generarClae(rcc)
+    localidades = generarLocalidades(semilla, escala, provincias, deptos)
+    operadores = generarOperadores(semilla, escala, provincias, localidades, rcc)
+    pares = paresDeSalarios(semilla, deptos, clae, rcc)
+    salarios = pd.concat([salariosDelMes(semilla, pares, mes) for mes in range(meses)], ignore_index=True)
+    return {'operadores': operadores, 'salarios': salarios, 'localidades': localidades,
+            'deptos': deptos, 'clae': clae, 'rubro_categoria_clae2': rcc}
+
+
+# =============================================================================
+# GUARDADO
+# =============================================================================
+
+# Archivo y encoding de cada fuente (los mismos que se leen en desarrollo.py)
+ARCHIVOS = {'operadores': ('padron-de-operadores-organicos-certificados.csv', 'windows-1252'),
+            'salarios': ('w_median_depto_priv_clae2.csv', 'utf-8'),
+            'localidades': ('localidades-censales.csv', 'utf-8'),
+            'deptos': ('diccionario_cod_depto.csv', 'utf-8'),
+            'clae': ('diccionario_clae2.csv', 'utf-8')}
+
+
+def guardarFuentes(directorio, escala=1, semilla=0, meses=108, verbose=True):
+    """
+    Genera las fuentes y las guarda como CSV con la misma estructura de
+    directorios que el proyecto: las originales en directorio/TablasOriginales
+    y rubro_categoria_clae2 (junto con provincias_comparadas) en
+    directorio/TablasLimpias. Así, desarrollo.py se puede ejecutar desde
+    directorio. Los salarios se generan y agregan al CSV de a un mes, ordenados
+    por fecha como en la fuente original.
+    Retorna la cantidad de filas de cada fuente.
+    """
+    if not escalaValida(escala):
+        return None
+    directorio_originales = os.path.join(directorio, 'TablasOriginales')
+    os.makedirs(directorio_originales, exist_ok=True)
+    os.makedirs(os.path.join(directorio, 'TablasLimpias'), exist_ok=True)
+    for archivo in ('provincias_comparadas.csv', 'rubro_categoria_clae2.csv'):
+        shutil.copyfile(os.path.join(directorio_limpias, archivo), os.path.join(directorio, 'TablasLimpias', archivo))
+
+    provincias, rcc = leerDiccionarios()
+    deptos = generarDeptos(semilla, escala, provincias)
+    clae = generarClae(rcc)
+    localidades = generarLocalidades(semilla, escala, provincias, deptos)
+    tablas = {'operadores': generarOperadores(semilla, escala, provincias, localidades, rcc),
+              'localidades': localidades, 'deptos': deptos, 'clae': clae}
+    filas = {'rubro_categoria_clae2': len(rcc)}
+    for nombre, df in tablas.items():
+        archivo, encoding = ARCHIVOS[nombre]
+        df.to_csv(os.path.join(directorio_originales, archivo), index=False, encoding=encoding)
+        filas[nombre] = len(df)
+
+    archivo, encoding = ARCHIVOS['salarios']
+    pares = paresDeSalarios(semilla, deptos, clae, rcc)
+    with open(os.path.join(directorio_originales, archivo), 'w', encoding=encoding, newline='') as f:
+        for mes in range(meses):
+            salariosDelMes(semilla, pares, mes).to_csv(f, index=False, header=(mes == 0))
+    filas['salarios'] = len(pares) * meses
+
+    if verbose:
+        print("Fuentes sintéticas (escala " + str(escala) + ", semilla " + str(semilla) + ") guardadas en " +
+              directorio + ": " + ', '.join(nombre + ' ' + str(cant) + ' filas' for nombre, cant in filas.items()))
+    return filas
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera fuentes sintéticas con los esquemas de las fuentes del proyecto.')
+    parser.add_argument('directorio', help='directorio donde se crean TablasOriginales y TablasLimpias')
+    parser.add_argument('--escala', type=float, default=1, help='factor de volumen, de 1 a 1000 (por defecto, 1)')
+    parser.add_argument('--semilla', type=int, default=0, help='semilla (por defecto, 0)')
+    parser.add_argument('--meses', type=int, default=108, help='meses de salarios desde enero de 2014 (por defecto, 108)')
+    args = parser.parse_args()
+    guardarFuentes(args.directorio, args.escala, args.semilla, args.meses)
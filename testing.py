@@ -18,6 +18,7 @@ import numpy as np
 from inline_sql import sql, sql_val
 import sys
 import os
+import tempfile
 
 # Establecer rootdir al directorio actual desde donde se ejecuta el script
 rootdir = os.getcwd()
@@ -63,6 +64,407 @@ def testear(test):
         return False
 
 
+####################################################
+### Test: carga de tablas con caché
+####################################################
+directorio_test = tempfile.mkdtemp()
+df_test = pd.DataFrame({'A': [1, 2, 3],
+                        'B': ['año', np.nan, 'z'],
+                        'C': [1.5, np.nan, 3.0]})
+df_test.to_csv(directorio_test + '/test.csv', index=False, encoding='windows-1252')
+dicc_test = {'name': 'test_cache', 'csv': directorio_test + '/test.csv', 'encoding': 'windows-1252'}
+
+# La primera carga lee el CSV y guarda la caché; la segunda lee la caché.
+# En ambos casos los valores faltantes de columnas de texto deben ser np.nan.
+for i in range(2):
+    test = {'name': 'test cargarTabla (carga ' + str(i+1) + ')',
+            'test_func': lambda d, directorio: fn.cargarTabla(d, directorio, verbose=False).fillna('NULL').values,
+            'test_cant_args': 2,
+            'test_arg1': dicc_test,
+            'test_arg2': directorio_test + '/cache',
+            'res_correcto': np.array([[1, 'año', 1.5], [2, 'NULL', 'NULL'], [3, 'z', 3.0]], dtype=object)
+            }
+    testear(test)
+
+    test = {'name': 'test cargarTabla NULLs (carga ' + str(i+1) + ')',
+            'test_func': lambda d, directorio: [v is np.nan for v in fn.cargarTabla(d, directorio, verbose=False)['B']],
+            'test_cant_args': 2,
+            'test_arg1': dicc_test,
+            'test_arg2': directorio_test + '/cache',
+            'res_correcto': [False, True, False]
+            }
+    testear(test)
+
+####################################################
+### Test: aplicar esquema
+####################################################
+df_test = pd.DataFrame({'A': [1, 2, np.nan],
+                        'B': ['x', 'x', np.nan],
+                        'C': [1.5, 2.5, 3.5],
+                        'D': ['u', 'v', 'w']})
+esquema_test = {'A': 'Int8', 'B': 'category', 'C': 'float32'}
+test = {'name': 'test aplicarEsquema',
+        'test_func': lambda df, esquema: [str(t) for t in fn.aplicarEsquema(df, esquema).dtypes],
+        'test_cant_args': 2,
+        'test_arg1': df_test,
+        'test_arg2': esquema_test,
+        'res_correcto': ['Int8', 'category', 'float32', 'object']
+        }
+testear(test)
+
+####################################################
+### Test: ingesta incremental de salarios
+####################################################
+directorio_test = tempfile.mkdtemp()
+df_test = pd.DataFrame({'fecha': ['2022-01-01', '2022-01-01', '2022-01-01', '2022-02-01'],
+                        'codigo_departamento_indec': [6007, 6014, 6007, 6007],
+                        'id_provincia_indec': [6, 6, 6, 6],
+                        'clae2': [1, 1, 1, 1],
+                        'w_median': [100.5, -99, 100.5, 120]})
+df_test.to_csv(directorio_test + '/salarios.csv', index=False)
+dicc_test = {'name': 'test_salarios', 'csv': directorio_test + '/salarios.csv', 'encoding': 'utf-8'}
+ruta_base_test = directorio_test + '/base.duckdb'
+
+# Primera ingesta: todo el CSV (sin la tupla repetida)
+test = {'name': 'test ingestarSalariosIncremental (primera ingesta)',
+        'test_func': fn.ingestarSalariosIncremental,
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': ruta_base_test,
+        'res_correcto': 3
+        }
+testear(test)
+
+# Se agrega un mes nuevo al final del CSV: solo se ingestan esas filas
+with open(dicc_test['csv'], 'a') as f:
+    f.write('2022-03-01,6007,6,1,130.0\n2022-03-01,6021,6,1,90.0\n')
+test['name'] = 'test ingestarSalariosIncremental (mes nuevo)'
+test['res_correcto'] = 2
+testear(test)
+
+# Sin cambios en el CSV no hay nada nuevo para ingestar
+test['name'] = 'test ingestarSalariosIncremental (sin cambios)'
+test['res_correcto'] = 0
+testear(test)
+
+test = {'name': 'test ingestarSalariosIncremental (depto_prov_sal_norm)',
+        'test_func': lambda ruta, relacion: sorted(fn.leerRelacion(ruta, relacion)['codigo_departamento_indec']),
+        'test_cant_args': 2,
+        'test_arg1': ruta_base_test,
+        'test_arg2': 'depto_prov_sal_norm',
+        'res_correcto': [6007, 6014, 6021]
+        }
+testear(test)
+
+# El cubo de salarios se actualiza con cada ingesta (sin el salario inválido)
+test = {'name': 'test consultarCubo',
+        'test_func': lambda ruta, niveles: fn.consultarCubo(fn.leerRelacion(ruta, 'salarios_cubo'), niveles)[['cantidad', 'promedio']].values,
+        'test_cant_args': 2,
+        'test_arg1': ruta_base_test,
+        'test_arg2': ['fecha'],
+        'res_correcto': [[1, 100.5], [1, 120], [2, 110]]
+        }
+testear(test)
+
+test = {'name': 'test consultarCubo (con filtro)',
+        'test_func': lambda ruta, filtros: fn.consultarCubo(fn.leerRelacion(ruta, 'salarios_cubo'), [], filtros)[['cantidad', 'promedio', 'desvio']].values.round(4),
+        'test_cant_args': 2,
+        'test_arg1': ruta_base_test,
+        'test_arg2': {'codigo_departamento_indec': 6007, 'mes': [2, 3]},
+        'res_correcto': [[2, 125, 7.0711]]
+        }
+testear(test)
+
+####################################################
+### Test: conteos de operadores
+####################################################
+rcc_test = pd.DataFrame({'id_rubro': [0, 1], 'clae2': [1, 10]})
+provincias_test = pd.DataFrame({'id_provincia_indec': [2, 6], 'nombre_provincia_indec': ['CABA', 'Buenos Aires']})
+datos_test = pd.DataFrame({'id_razon_social_establecimiento': [0, 1, 2], 'razon_social': ['A', 'B', 'C'],
+                           'establecimiento': ['a', 'b', np.nan], 'id_rubro': [0, 1, 1]})
+locacion_test = pd.DataFrame({'id_razon_social_establecimiento': [0, 1, 2], 'provincia_id': [2, 6, 6],
+                              'departamento': ['X', 'Y', 'Y']})
+fn.actualizarConteosDeOperadores(ruta_base_test, datos_test, locacion_test, rcc_test, provincias_test, verbose=False)
+
+# Nueva versión del padrón: el operador B pasa a CABA y se agrega el D (con 
+# otros ids); solo esos dos operadores ajustan los conteos
+datos_test = pd.DataFrame({'id_razon_social_establecimiento': [5, 6, 7, 8], 'razon_social': ['C', 'A', 'B', 'D'],
+                           'establecimiento': [np.nan, 'a', 'b', 'd'], 'id_rubro': [1, 0, 1, 0]})
+locacion_test = pd.DataFrame({'id_razon_social_establecimiento': [5, 6, 7, 8], 'provincia_id': [6, 2, 2, 6],
+                              'departamento': ['Y', 'X', 'Z', 'W']})
+test = {'name': 'test actualizarConteosDeOperadores',
+        'test_func': lambda datos, locacion: [valor for v in fn.actualizarConteosDeOperadores(
+                                                  ruta_base_test, datos, locacion, rcc_test, provincias_test, verbose=False).values()
+                                              for valor in v.values.ravel().tolist()],
+        'test_cant_args': 2,
+        'test_arg1': datos_test,
+        'test_arg2': locacion_test,
+        'res_correcto': ['Buenos Aires', 2, 'CABA', 2,
+                         1, 2, 1, 1, 6, 1, 10, 2, 1, 10, 6, 1,
+                         'W', 6, 1, 'X', 2, 1, 'Y', 6, 1, 'Z', 2, 1]
+        }
+testear(test)
+
+# Dos operadores distintos con la misma razón social y establecimiento 'NC' 
+# (añadirIDs les da ids distintas) cuentan como dos, como en la consulta 
+# original que contaba ids distintas por provincia. En la versión siguiente 
+# del padrón uno de ellos deja de estar.
+ruta_conteos_test = directorio_test + '/conteos_nc.duckdb'
+test = {'name': 'test actualizarConteosDeOperadores (mismo operador NC)',
+        'test_func': lambda datos, locacion: fn.actualizarConteosDeOperadores(
+                         ruta_conteos_test, datos, locacion, rcc_test, provincias_test, verbose=False
+                         )['cant_operadores_por_prov'].values.ravel().tolist(),
+        'test_cant_args': 2,
+        'test_arg1': pd.DataFrame({'id_razon_social_establecimiento': [90000, 90001, 3], 'razon_social': ['E', 'E', 'F'],
+                                   'establecimiento': ['NC', 'NC', 'f'], 'id_rubro': [0, 0, 1]}),
+        'test_arg2': pd.DataFrame({'id_razon_social_establecimiento': [90000, 90001, 3], 'provincia_id': [2, 2, 6],
+                                   'departamento': ['X', 'X', 'Y']}),
+        'res_correcto': ['Buenos Aires', 1, 'CABA', 2]
+        }
+testear(test)
+
+test['name'] = 'test actualizarConteosDeOperadores (mismo operador NC, actualización)'
+test['test_arg1'] = pd.DataFrame({'id_razon_social_establecimiento': [90000, 2], 'razon_social': ['E', 'F'],
+                                  'establecimiento': ['NC', 'f'], 'id_rubro': [0, 1]})
+test['test_arg2'] = pd.DataFrame({'id_razon_social_establecimiento': [90000, 2], 'provincia_id': [2, 6],
+                                  'departamento': ['X', 'Y']})
+test['res_correcto'] = ['Buenos Aires', 1, 'CABA', 1]
+testear(test)
+
+####################################################
+### Test: operadores y salario por provincia
+####################################################
+# La versión que resuelve todas las clae2 a la vez (a partir del cubo y de la
+# vista cant_op_clae_por_prov) coincide con las consultas que se hacían antes, 
+# una por clae2, sobre salarios_validos y el padrón
+directorio_test = tempfile.mkdtemp()
+ruta_base_prov_test = directorio_test + '/base.duckdb'
+pd.DataFrame({'fecha': ['2022-11-01'] + ['2022-12-01'] * 10,
+              'codigo_departamento_indec': [2007, 2007, 6007, 6014, 6014, 14007, 6007, 6014, 2007, 6007, 6007],
+              'id_provincia_indec': [2, 2, 6, 6, 6, 14, 6, 6, 2, 6, 6],
+              'clae2': [1, 1, 1, 1, 1, 1, 10, 10, 10, 3, 1],
+              'w_median': [999, 100, 200, 300, -99, 400, 50, 70, -99, 500, 250]}
+             ).to_csv(directorio_test + '/salarios.csv', index=False)
+fn.ingestarSalariosIncremental({'name': 'test_salarios', 'csv': directorio_test + '/salarios.csv', 'encoding': 'utf-8'},
+                               ruta_base_prov_test, verbose=False)
+rcc_test = pd.DataFrame({'id_rubro': [0, 1, 2], 'clae2': [1, 10, 1]})
+provincias_test = pd.DataFrame({'id_provincia_indec': [2, 6, 14], 'nombre_provincia_indec': ['CABA', 'Buenos Aires', 'Córdoba']})
+datos_test = pd.DataFrame({'id_razon_social_establecimiento': [0, 1, 2, 3, 4], 'razon_social': ['A', 'B', 'C', 'D', 'E'],
+                           'establecimiento': ['a', 'b', np.nan, 'd', 'e'], 'id_rubro': [0, 1, 1, 2, 0]})
+locacion_test = pd.DataFrame({'id_razon_social_establecimiento': [0, 1, 2, 3, 4], 'provincia_id': [2, 6, 2, 6, 6],
+                              'departamento': ['X', 'Y', 'X', 'Z', 'Y']})
+conteos_test = fn.actualizarConteosDeOperadores(ruta_base_prov_test, datos_test, locacion_test, rcc_test, provincias_test, verbose=False)
+
+def operadoresYSalarioPorClae(salarios_validos, depto_prov_sal_norm, provincias_indec, rcc,
+                              establecimientos_datos, locacion_establecimientos, clae_buscado):
+    consultaSQL = """
+                SELECT p.id_provincia_indec, p.nombre_provincia_indec, AVG(w_median) AS salario_promedio_provincial
+                FROM salarios_validos AS s, depto_prov_sal_norm AS d, provincias_indec AS p
+                WHERE fecha = '2022-12-01'
+                    AND s.clae2 = $clae_buscado
+                    AND s.codigo_departamento_indec = d.codigo_departamento_indec
+                    AND d.id_provincia_indec = p.id_provincia_indec
+                GROUP BY p.id_provincia_indec, p.nombre_provincia_indec
+                ORDER BY salario_promedio_provincial
+            """
+    prov_clae_w_median_avg = sql ^ consultaSQL
+    consultaSQL = """
+                    SELECT l.provincia_id, COUNT(l.id_razon_social_establecimiento) AS cantidad_establecimientos
+                    FROM rcc, establecimientos_datos AS e, locacion_establecimientos AS l
+                    WHERE e.id_razon_social_establecimiento = l.id_razon_social_establecimiento
+                        AND rcc.id_rubro = e.id_rubro
+                        AND rcc.clae2 = $clae_buscado
+                    GROUP BY l.provincia_id
+                """
+    cant_op_clae_por_prov = sql ^ consultaSQL
+    consultaSQL = """
+                SELECT DISTINCT p.nombre_provincia_indec AS provincia, c.cantidad_establecimientos, p.salario_promedio_provincial
+                FROM cant_op_clae_por_prov AS c, prov_clae_w_median_avg AS p
+                WHERE c.provincia_id = p.id_provincia_indec
+                """
+    return sql ^ consultaSQL
+
+# Tuplas (clae2, provincia, cantidad, salario) ordenadas y como texto
+def tuplasPorClae(df):
+    return sorted(str((int(t.clae2), t.provincia, int(t.cantidad_establecimientos), round(t.salario_promedio_provincial, 4)))
+                  for t in df.itertuples(index=False))
+
+salarios_test = fn.leerRelacion(ruta_base_prov_test, 'salarios_norm')
+por_clae = [operadoresYSalarioPorClae(salarios_test[salarios_test['w_median'] > 0], fn.leerRelacion(ruta_base_prov_test, 'depto_prov_sal_norm'),
+                                      provincias_test, rcc_test, datos_test, locacion_test, clae).assign(clae2=clae)
+            for clae in rcc_test['clae2'].drop_duplicates()]
+test = {'name': 'test operadoresYSalarioPorProvincia',
+        'test_func': lambda cubo, claes: tuplasPorClae(fn.operadoresYSalarioPorProvincia(
+                                             cubo, conteos_test['cant_op_clae_por_prov'], provincias_test, claes)),
+        'test_cant_args': 2,
+        'test_arg1': fn.leerRelacion(ruta_base_prov_test, 'salarios_cubo'),
+        'test_arg2': rcc_test['clae2'].drop_duplicates(),
+        'res_correcto': tuplasPorClae(pd.concat(por_clae))
+        }
+testear(test)
+
+####################################################
+### Test: salario promedio por provincia
+####################################################
+# A partir del cubo, cada departamento aporta sus salarios. La consulta original
+# (SELECT DISTINCT fecha, clae2, w_median, provincia) contaba una sola vez un 
+# mismo salario de dos departamentos de la provincia: en Buenos Aires, el 100 de
+# la clae2 1 en 6007 y en 6014. Sin empates (CABA) las dos coinciden.
+directorio_test = tempfile.mkdtemp()
+ruta_base_sal_test = directorio_test + '/base.duckdb'
+pd.DataFrame({'fecha': ['2021-12-01'] + ['2022-12-01'] * 7,
+              'codigo_departamento_indec': [6007, 6007, 6014, 6021, 6007, 6014, 2007, 2007],
+              'id_provincia_indec': [6, 6, 6, 6, 6, 6, 2, 2],
+              'clae2': [1, 1, 1, 1, 3, 3, 1, 3],
+              'w_median': [999, 100, 100, 400, 50, -99, 200, 100]}
+             ).to_csv(directorio_test + '/salarios.csv', index=False)
+fn.ingestarSalariosIncremental({'name': 'test_salarios', 'csv': directorio_test + '/salarios.csv', 'encoding': 'utf-8'},
+                               ruta_base_sal_test, verbose=False)
+provincias_sal_test = pd.DataFrame({'id_provincia_indec': [2, 6], 'nombre_provincia_indec': ['CABA', 'Buenos Aires']})
+depto_prov_sal_test = pd.DataFrame({'codigo_departamento_indec': [2007, 6007, 6014, 6021], 'id_provincia_indec': [2, 6, 6, 6]})
+
+def salarioPromedioPorProvinciaOriginal(salarios_validos, provincias_indec, depto_prov_indec):
+    consultaSQL = """ 
+                SELECT DISTINCT *
+                FROM salarios_validos 
+                WHERE fecha LIKE '2022-%';
+            """
+    salarios_2022 = sql ^ consultaSQL
+    consultaSQL = """ 
+                SELECT DISTINCT fecha, clae2, w_median, prov.nombre_provincia_indec
+                FROM salarios_2022 AS salarios, provincias_indec AS prov, depto_prov_indec AS dp
+                WHERE salarios.codigo_departamento_indec = dp.codigo_departamento_indec AND dp.id_provincia_indec = prov.id_provincia_indec;
+            """
+    salarios_2022_prov = sql ^ consultaSQL
+    consultaSQL = """ 
+                SELECT DISTINCT nombre_provincia_indec, clae2, AVG(w_median) AS salario_promedio_por_prov
+                FROM salarios_2022_prov
+                GROUP BY nombre_provincia_indec, clae2; 
+            """
+    salarios_prom_por_prov_y_clae2 = sql ^ consultaSQL
+    consultaSQL = """ 
+                SELECT DISTINCT nombre_provincia_indec, AVG(salario_promedio_por_prov) AS salario_promedio, STDDEV(salario_promedio_por_prov) AS desvio_estandar
+                FROM salarios_prom_por_prov_y_clae2
+                GROUP BY nombre_provincia_indec
+            """
+    return sql ^ consultaSQL
+
+# Provincia, promedio y desvío (redondeados) ordenados por provincia
+def promediosPorProvincia(df):
+    df = df.sort_values('nombre_provincia_indec')
+    return [[p, round(m, 2), round(d, 2)] for p, m, d in
+            zip(df['nombre_provincia_indec'], df['salario_promedio'], df['desvio_estandar'])]
+
+test = {'name': 'test salarioPromedioPorProvincia',
+        'test_func': lambda cubo, provincias: promediosPorProvincia(fn.salarioPromedioPorProvincia(cubo, provincias, 2022)),
+        'test_cant_args': 2,
+        'test_arg1': fn.leerRelacion(ruta_base_sal_test, 'salarios_cubo'),
+        'test_arg2': provincias_sal_test,
+        'res_correcto': [['Buenos Aires', 125.0, 106.07], ['CABA', 150.0, 70.71]]
+        }
+testear(test)
+
+salarios_sal_test = fn.leerRelacion(ruta_base_sal_test, 'salarios_norm')
+test = {'name': 'test salarioPromedioPorProvincia (consulta original)',
+        'test_func': lambda salarios, provincias, deptos: promediosPorProvincia(
+                         salarioPromedioPorProvinciaOriginal(salarios, provincias, deptos)),
+        'test_cant_args': 3,
+        'test_arg1': salarios_sal_test[salarios_sal_test['w_median'] > 0],
+        'test_arg2': provincias_sal_test,
+        'test_arg3': depto_prov_sal_test,
+        'res_correcto': [['Buenos Aires', 150.0, 141.42], ['CABA', 150.0, 70.71]]
+        }
+testear(test)
+
+####################################################
+### Test: departamentos con operadores
+####################################################
+# Fija el comportamiento de la consulta original (con su problema de 
+# precedencia, ver fn.departamentosConOperadores): si algún operador coincide 
+# con una localidad, o con un municipio sin ser indefinido, se retornan todos
+# los departamentos de deptos_loc.
+deptos_loc_test = pd.DataFrame({'codigo_departamento_indec': [10, 20, 30],
+                                'nombre_departamento_indec': ['Uno', 'Dos', 'Tres'],
+                                'departamento_nombre': ['Uno', 'Dos', 'Tres'],
+                                'id_provincia_indec': [1, 1, 2]})
+loc_mun_test = pd.DataFrame({'nombre': ['Villa A', 'Villa B'], 'municipio_nombre': ['Muni A', 'NC']})
+
+# La consulta original, sobre el producto cartesiano de las tres tablas
+def departamentosConOperadoresOriginal(locacion_establecimientos, deptos_loc, localidades_municipios):
+    consultaSQL = """
+                SELECT DISTINCT dl.codigo_departamento_indec,
+                                dl.nombre_departamento_indec
+                FROM locacion_establecimientos AS le,
+                    deptos_loc AS dl,
+                    localidades_municipios AS lm
+                WHERE LOWER(le.departamento) = LOWER(dl.departamento_nombre) OR
+                LOWER(le.departamento) = LOWER(lm.nombre) OR
+                LOWER(le.departamento) = LOWER(lm.municipio_nombre) AND
+                UPPER(le.departamento) NOT IN ('INDEFINIDO', 'INDEFINIDA', 'NC', 'SIN DEFINIR') AND
+                le.departamento IS NOT NULL;
+                """
+    return sql ^ consultaSQL
+
+casos_deptos = {
+    'solo departamentos': (['UNO', 'dos', None], loc_mun_test, [10, 20]),
+    'coincide con una localidad': (['uno', 'villa a'], loc_mun_test, [10, 20, 30]),
+    'coincide con un municipio': (['tres', 'muni a'], loc_mun_test, [10, 20, 30]),
+    'coincide con un municipio indefinido': (['TRES', 'nc'], loc_mun_test, [30]),
+    'sin localidades ni municipios': (['uno'], loc_mun_test.iloc[:0], [])
+}
+for caso, (departamentos, loc_mun, codigos) in casos_deptos.items():
+    locacion = pd.DataFrame({'departamento': pd.Series(departamentos, dtype=object)})
+    test = {'name': 'test departamentosConOperadores (' + caso + ')',
+            'test_func': lambda funcion, locacion, loc_mun: sorted(funcion(locacion, deptos_loc_test, loc_mun)['codigo_departamento_indec']),
+            'test_cant_args': 3,
+            'test_arg1': fn.departamentosConOperadores,
+            'test_arg2': locacion,
+            'test_arg3': loc_mun,
+            'res_correcto': codigos
+            }
+    testear(test)
+    test['name'] = 'test departamentosConOperadores (' + caso + ', consulta original)'
+    test['test_arg1'] = departamentosConOperadoresOriginal
+    testear(test)
+
+####################################################
+### Test: relaciones normalizadas persistidas
+####################################################
+relaciones_test = {'provincias': pd.DataFrame({'provincia_id': [2, 6], 'provincia': ['CABA', 'Buenos Aires']}),
+                   'municipios': pd.DataFrame({'municipio_id': [1.0, np.nan], 'municipio_nombre': ['a', np.nan]})}
+claves_test = {'provincias': ['provincia_id'], 'municipios': ['municipio_id']}
+fn.materializarRelaciones(ruta_base_test, relaciones_test, claves_test, 'clave1', verbose=False)
+
+test = {'name': 'test baseNormalizadaVigente',
+        'test_func': lambda ruta, claves: [fn.baseNormalizadaVigente(ruta, c) for c in claves],
+        'test_cant_args': 2,
+        'test_arg1': ruta_base_test,
+        'test_arg2': ['clave1', 'clave2'],
+        'res_correcto': [True, False]
+        }
+testear(test)
+
+# La clave cambia con las fuentes y con los textos del proceso (código y
+# parámetros), pero no con cómo se pasan las mismas fuentes
+test = {'name': 'test claveDeFuentes',
+        'test_func': lambda tablas, textos: [fn.claveDeFuentes(tablas, t) == fn.claveDeFuentes(tablas) for t in textos],
+        'test_cant_args': 2,
+        'test_arg1': [{'hash': 'a'}, {'hash': 'b'}],
+        'test_arg2': [[], ['def etapa(): pass'], ["['INDEFINIDO']"]],
+        'res_correcto': [True, False, False]
+        }
+testear(test)
+
+# municipios no cumple su clave primaria (tiene un NULL): igual se guarda
+test = {'name': 'test materializarRelaciones',
+        'test_func': lambda ruta, nombres: [len(df) for df in fn.leerRelaciones(ruta, nombres).values()],
+        'test_cant_args': 2,
+        'test_arg1': ruta_base_test,
+        'test_arg2': ['provincias', 'municipios'],
+        'res_correcto': [2, 2]
+        }
+testear(test)
+
 ##################################################
 ### Test: porcentaje de tuplas repetidas sobrantes
 ##################################################
@@ -274,6 +676,94 @@ test['res_correcto'] = 0
 testear(test)
 
 
+####################################################
+### Test: grupos de tuplas
+####################################################
+dicc_test = {'name': 'test grupos', 'df': pd.DataFrame({'A': [1, 1, 2, 1, np.nan, np.nan],
+                                                        'B': ['x', 'y', 'x', 'x', 'z', 'z']})}
+test = {'name': 'test selTuplasUnicas',
+        'test_func': lambda dicc, columnas: fn.selTuplasUnicas(dicc, columnas).index.tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': ['A', 'B'],
+        'res_correcto': [0, 1, 2, 4]
+        }
+testear(test)
+
+test = {'name': 'test selTuplasRepetidasSobrantes',
+        'test_func': lambda dicc, columnas: fn.selTuplasRepetidasSobrantes(dicc, columnas).index.tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': ['A'],
+        'res_correcto': [1, 3, 5]
+        }
+testear(test)
+
+# Al reemplazar dict_df['df'] los grupos guardados dejan de valer
+test = {'name': 'test cantidadDeTuplasUnicas (df reemplazado)',
+        'test_func': lambda dicc, columna: [fn.cantidadDeTuplasUnicas(dicc, columna),
+                                            dicc.update(df=dicc['df'].iloc[:3]),
+                                            fn.cantidadDeTuplasUnicas(dicc, columna)][::2],
+        'test_cant_args': 2,
+        'test_arg1': {'name': 'test grupos', 'df': dicc_test['df'].copy()},
+        'test_arg2': 'B',
+        'res_correcto': [3, 2]
+        }
+testear(test)
+
+####################################################
+### Test: perfil de calidad
+####################################################
+dicc_test = {'name': 'test perfil', 'df': pd.DataFrame({'A': [1, 1, np.nan, 4],
+                                                        'B': ['x', 'x', np.nan, 'NC']})}
+test = {'name': 'test perfil',
+        'test_func': lambda dicc, indefinidos: fn.perfil(dicc, indefinidos)['valor'].tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': ['NC'],
+        'res_correcto': [25, 25, 25, 25, 0, 75, 25, 25, 75]
+        }
+testear(test)
+
+# Las funciones de métricas leen del perfil
+test = {'name': 'test perfil (vistas)',
+        'test_func': lambda dicc, indefinidos: [fn.porcentajeTuplasRepetidasSobrantes(dicc, verbose=False),
+                                               fn.porcentajeDeTuplasConValoresNullAny(dicc, verbose=False),
+                                               fn.porcentajeDeTuplasConValoresNullAll(dicc, verbose=False),
+                                               fn.porcentajeDeValoresIndefinidos(dicc, 'B', indefinidos, verbose=False)],
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': ['NC'],
+        'res_correcto': [25, 25, 25, 25]
+        }
+testear(test)
+
+# Las métricas calculadas en paralelo quedan en el cache de cada tabla y 
+# coinciden con las del perfil. Se leen directamente del cache (perfil 
+# calcularía las que falten).
+def metricasEnCache(dict_df, lista_de_indefinidos):
+    cache = fn.cacheDeTabla(dict_df, 'perfil')
+    res = list(cache.get('tabla', dict()).values())
+    columnas = cache.get(('columnas', tuple(lista_de_indefinidos)), dict())
+    for col in dict_df['df'].columns:
+        res += list(columnas.get(col, dict()).values())
+    return res
+
+def metricasEnParalelo(lista_tablas, lista_de_indefinidos):
+    fn.calcularMetricasEnParalelo(lista_tablas, lista_de_indefinidos, procesos=2, columnas_por_tarea=1)
+    return [metricasEnCache(dict_df, lista_de_indefinidos) for dict_df in lista_tablas]
+
+test = {'name': 'test métricas en paralelo',
+        'test_func': metricasEnParalelo,
+        'test_cant_args': 2,
+        'test_arg1': [{'name': 'test paralelo', 'df': dicc_test['df'].copy()},
+                      {'name': 'otra', 'df': dicc_test['df'].iloc[:2].copy()}],
+        'test_arg2': ['NC'],
+        'res_correcto': [[25, 25, 25, 25, 0, 75, 25, 25, 75],
+                         [50, 0, 0, 0, 0, 100, 0, 0, 100]]
+        }
+testear(test)
+
 ####################################################
 ### Test: diferencia de tipos
 ####################################################
@@ -303,6 +793,20 @@ for k in resultado:
     test['res_correcto'] = resultado[k]
     testear(test)
 
+# Columnas categóricas: el tipo sale de las categorías
+dicc_test['df'] = df_test.astype({'C': 'category', 'E': 'category'})
+for k in ['C', 'E']:
+    test['test_arg2'] = k
+    test['res_correcto'] = resultado[k]
+    testear(test)
+
+# Al reemplazar el dataframe, los tipos guardados en cache se descartan
+dicc_test['df'] = pd.DataFrame({'A': ['1', '2', '4', 3, 5]})
+test['name'] = 'test evaluacionDeTiposPorColumna (df reemplazado)'
+test['test_arg2'] = 'A'
+test['res_correcto'] = (60, str)
+testear(test)
+
 ####################################################
 ### Test: diferencia de consistencia de valores
 ####################################################
@@ -394,6 +898,20 @@ test['res_correcto'] = resultados['caso 5']
 testear(test)
 
 
+# Todos los casos en una sola llamada
+casos = {'caso 1': (dicc_test1, dicc_test2), 'caso 2': (dicc_test1, dicc_test2),
+         'caso 3': (dicc_test1, dicc_test3), 'caso 4': (dicc_test1, dicc_test4),
+         'caso 5': (dicc_test3, dicc_test4)}
+test = {'name': 'test consistenciaExtendidaMultiple',
+        'test_func' : lambda casos, columnas: sum(fn.consistenciaExtendidaMultiple(casos, columnas, verbose=False).values(), []),
+        'test_cant_args' : 2,
+        'test_arg1' : casos,
+        'test_arg2' : columnas_a_evaluar,
+        'res_correcto' : [0, 0, 0, 0, 0, 0, 5, 4, 0, 1, 1]
+        }
+testear(test)
+
+
 ####################################################
 ### Test: diferencia de porcentaje de valores inexistentes
 ####################################################
@@ -474,6 +992,52 @@ test['test_arg3'] = columnas_a_evaluar['caso 3']
 test['res_correcto'] = resultados['caso 3']
 testear(test)
 
+# genConsultaSemiJoin devuelve las mismas tuplas que genConsultaExt (que resuelve
+# la condición sobre el producto df1 x df2). Las tuplas se comparan ordenadas y
+# como texto, para que los NULL sean iguales entre sí.
+def tuplasDeConsultas(dicc_df1, dicc_df2, dict_columnas, lista_de_indefinidos, generador):
+    df1 = dicc_df1['df']
+    df2 = dicc_df2['df']
+    columnas = []
+    for k in dict_columnas:
+        columnas += list(k) if isinstance(k, tuple) else [k]
+    tipos_df1 = fn.evaluacionDeTipos(dicc_df1, columnas, verbose=False)
+    consulta = sql ^ generador(dict_columnas, tipos_df1, lista_de_indefinidos=lista_de_indefinidos)[0]
+    return sorted(str(tupla) for tupla in consulta.itertuples(index=False))
+
+d = {
+    'A': [1, 2, np.nan, 4, 5, np.nan],
+    'B': ['x', np.nan, 'NC', 'Y', np.nan, 'z'],
+    'C': ['w', 'q', np.nan, 'INDEFINIDO', 'y', np.nan]
+    }
+dicc_test5 = {'name': 't5', 'df': pd.DataFrame(data=d)}
+d = {
+    'A': [1, np.nan, 3, 4, 9],
+    'B': ['X', 'y', 'NC', np.nan, 'q'],
+    'C': ['nc', 'Z', np.nan, 'w', 'x']
+    }
+dicc_test6 = {'name': 't6', 'df': pd.DataFrame(data=d)}
+
+casos_semijoin = {
+        'varias columnas (OR)': (dicc_test3, dicc_test4, {'B': ('B', 'C', 'D')}),
+        'clave compuesta': (dicc_test3, dicc_test4, columnas_a_evaluar['caso 1']),
+        'texto y número': (dicc_test1, dicc_test2, columnas_a_evaluar['caso 2']),
+        'un término': (dicc_test5, dicc_test6, {'B': ('B',)}),
+        'claves NULL': (dicc_test5, dicc_test6, {'A': ('A',), 'B': ('B', 'C')}),
+        'claves NULL (compuesta)': (dicc_test5, dicc_test6, {('B', 'C'): ('B', 'C')}),
+        'sin coincidencias': (dicc_test4, dicc_test3, columnas_a_evaluar['caso 3'])
+        }
+test = {'test_func': lambda caso, indefinidos: tuplasDeConsultas(*casos_semijoin[caso], indefinidos, fn.genConsultaSemiJoin),
+        'test_cant_args': 2
+        }
+for caso, (dicc_df1, dicc_df2, dict_columnas) in casos_semijoin.items():
+    for indefinidos in [[], valores_indefinidos]:
+        test['name'] = 'test genConsultaSemiJoin (' + caso + (', indefinidos)' if indefinidos else ')')
+        test['test_arg1'] = caso
+        test['test_arg2'] = indefinidos
+        test['res_correcto'] = tuplasDeConsultas(dicc_df1, dicc_df2, dict_columnas, indefinidos, fn.genConsultaExt)
+        testear(test)
+
 
 
 ####################################################
@@ -528,6 +1092,37 @@ for case, columns in columnas_a_evaluar.items():
         test_aprobado = False
         print(f"El test para {case} falló.")
 
+# Cada bloque de ids por separado. Las tuplas con NULL o con indefinidos (pero
+# no ambos) llevan una id por fila aunque sean iguales; las que tienen ambos, y
+# las que no tienen ninguno, comparten la id entre tuplas iguales.
+d = {
+    'A': ['NC', np.nan, 'NC', 'a', np.nan, 'NC', 'a', 'NC', 'b', np.nan, 'NC'],
+    'B': [np.nan, 'x', np.nan, 'x', 'x', 'y', 'x', np.nan, 'INDEFINIDO', 'INDEFINIDO', 'y']
+}
+df_test = pd.DataFrame(data=d)
+
+def idsDeFilas(dicc_df, lista_de_columnas, filas):
+    fn.añadirIDs(dicc_df, lista_de_columnas)
+    return dicc_df['df']['id_' + '_'.join(lista_de_columnas)].iloc[filas].tolist()
+
+casos_ids = {
+    'solo NULL': ([1, 4], [80000, 80001]),
+    'solo indefinidos': ([5, 8, 10], [90000, 90001, 90002]),
+    'NULL e indefinidos': ([0, 2, 7, 9], [100000, 100000, 100000, 100001]),
+    'sin NULL ni indefinidos': ([3, 6], [0, 0])
+}
+for caso, (filas, ids) in casos_ids.items():
+    test = {
+        'name': 'test añadirIDs (' + caso + ')',
+        'test_func': idsDeFilas,
+        'test_cant_args': 3,
+        'test_arg1': {'name': 'test añadir IDs', 'df': df_test.copy()},
+        'test_arg2': ['A', 'B'],
+        'test_arg3': filas,
+        'res_correcto': ids
+    }
+    testear(test)
+
 ####################################################
 ### Test: reasignar IDs
 ####################################################
@@ -542,8 +1137,56 @@ d = {
 df_test = pd.DataFrame(data=d)
 dicc_test = {'name': 'test añadir IDs', 'df' : df_test}
 fn.reasignarIDs(dicc_test,('A','D'),lista_de_indefinidos=["INDEFINIDO", "INDEFINIDA", "SIN DEFINIR", "NC"])
+test = {'name': 'test reasignarIDs',
+        'test_func': lambda dicc, col: dicc['df'][col].fillna(-1).tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': 'A',
+        'res_correcto': [1, 2, 3, 1, 4, 5, 6, 7, 8, 10008]   # 'alfa' toma su id; 'sigma' recibe uno nuevo
+        }
+testear(test)
+
+# Un valor NULL con id NULL no afecta la elección del bloque de ids nuevos
+dicc_test = {'name': 'test reasignar IDs', 'df': pd.DataFrame({'A': [np.nan, 3, np.nan, np.nan],
+                                                              'D': [np.nan, 'a', 'b', 'b']})}
+fn.reasignarIDs(dicc_test,('A','D'),lista_de_indefinidos=["NC"])
+test['test_arg1'] = dicc_test
+test['name'] = 'test reasignarIDs (NULL sin id)'
+test['res_correcto'] = [-1, 3, 10003, 10003]
+testear(test)
 
 
+####################################################
+### Test: cantidad de productos
+####################################################
+textos = pd.Series([',a,', 'a, b y c', 'a Y b,c', 'a y y b', ' y', ''])
+test = {'name': 'test cant_trozos_serie_separados_por_comas_e_yes',
+        'test_func': lambda serie: fn.cant_trozos_serie_separados_por_comas_e_yes(serie).tolist(),
+        'test_cant_args': 1,
+        'test_arg1': textos,
+        'res_correcto': [1, 3, 3, 3, 1, 1]
+        }
+testear(test)
+
+# Coincide con la versión que recorre el texto caracter por caracter
+test['name'] = 'test cant_trozos_texto_separados_por_comas_e_yes'
+test['test_func'] = lambda serie: serie.apply(fn.cant_trozos_texto_separados_por_comas_e_yes).tolist()
+testear(test)
+
+# Los NULL quedan sin cantidad (NA, que acá mostramos como -1), sin tomar la
+# del último texto distinto
+test['name'] = 'test cant_trozos_serie_separados_por_comas_e_yes (NULL)'
+test['test_func'] = lambda serie: fn.cant_trozos_serie_separados_por_comas_e_yes(serie).fillna(-1).tolist()
+test['test_arg1'] = pd.Series(['a, b y c', None, 'x', np.nan])
+test['res_correcto'] = [3, -1, 1, -1]
+testear(test)
+
+# Una serie toda NULL
+test['name'] = 'test cant_trozos_serie_separados_por_comas_e_yes (todo NULL)'
+test['test_arg1'] = pd.Series([None, None])
+test['res_correcto'] = [-1, -1]
+testear(test)
+
 ####################################################
 ### Test: valores fuera de rango
 ####################################################
@@ -582,12 +1225,313 @@ test = {
 
 testear(test)
 
+# Varias columnas en una sola llamada, con las máscaras de filas fuera de rango
+test = {
+        'name':'valores fuera de rango (varias columnas)',
+        'test_func': lambda dicc, rangos: [fn.mascarasFueraDeRango(dicc, rangos, verbose=False)[0][col] for col in rangos],
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': {'A': (0, 1000), 'B': (20, 90)},
+        'res_correcto': [12.5, 30]
+        }
+testear(test)
+
+test = {
+        'name':'máscara de valores fuera de rango',
+        'test_func': lambda dicc, rangos: fn.mascarasFueraDeRango(dicc, rangos, verbose=False)[1]['B'].tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': {'A': (0, None), 'B': (20, 90)},
+        'res_correcto': [True, False, False, True, False, False, False, False, False, True]
+        }
+testear(test)
+
+# Con la cota inferior en el menor valor positivo, la máscara deja afuera lo 
+# mismo que w_median > 0 (incluido el 0); los NULL no quedan fuera de rango
+test = {
+        'name':'máscara de valores fuera de rango (w_median > 0)',
+        'test_func': lambda dicc, rangos: fn.mascarasFueraDeRango(dicc, rangos, verbose=False)[1]['w_median'].tolist(),
+        'test_cant_args': 2,
+        'test_arg1': {'name': 'salarios', 'df': pd.DataFrame({'w_median': [-99, 0, 0.01, 5000, np.nan]})},
+        'test_arg2': {'w_median': (np.nextafter(0, 1), None)},
+        'res_correcto': [True, True, False, False, False]
+        }
+testear(test)
+
+
+
+
+
+
+
+
+
+
+
+####################################################
+### Test: dependencias funcionales
+####################################################
+dicc_test = {'name': 'test dependencias', 'df': pd.DataFrame({'A': [1, 2, 3, 4, 5],
+                                                               'B': ['x', 'x', 'y', 'y', 'y'],
+                                                               'C': [10, 10, 20, 20, 30]})}
+test = {'name': 'test dependencias funcionales',
+        'test_func': lambda dicc, max_lhs: [str(list(det)) + '->' + dep for det, dep in 
+                                            zip(*fn.dependenciasFuncionales(dicc, max_lhs, verbose=False)[['determinante', 'dependiente']].T.values)],
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': 2,
+        'res_correcto': ["['A']->B", "['A']->C", "['C']->B"]
+        }
+testear(test)
+
+# Con un error permitido del 20% también vale B -> C (basta borrar una fila)
+test = {'name': 'test dependencias funcionales aproximadas',
+        'test_func': lambda dicc, error: fn.dependenciasFuncionales(dicc, 1, error, verbose=False)['error'].tolist(),
+        'test_cant_args': 2,
+        'test_arg1': dicc_test,
+        'test_arg2': 0.2,
+        'res_correcto': [0, 0, 0, 0.2]
+        }
+testear(test)
+
+####################################################
+### Test: figuras
+####################################################
+directorio_test = tempfile.mkdtemp()
+figuras_test = [{'name': 'barras', 'graficar': fn.grafico_operadores_por_provincia,
+                 'df': pd.DataFrame({'provincia': ['A', 'B'], 'cantidad_operadores': [3, 1]})},
+                {'name': 'violin', 'graficar': fn.grafico_salarios_por_provincia,
+                 'df': pd.DataFrame({'provincia': ['A', 'A', 'B'], 'w_median': [1.0, 2.0, 3.0]})}]
+test = {'name': 'test graficar_figuras',
+        'test_func': lambda figuras, directorio: fn.graficar_figuras(figuras, directorio, procesos=2, verbose=False),
+        'test_cant_args': 2,
+        'test_arg1': figuras_test,
+        'test_arg2': directorio_test,
+        'res_correcto': ['barras', 'violin']
+        }
+testear(test)
+
+# Sin cambios en los datos no se vuelve a dibujar nada
+test['name'] = 'test graficar_figuras (sin cambios)'
+test['res_correcto'] = []
+testear(test)
+
+# Solo se vuelve a dibujar la figura cuyos datos cambiaron
+figuras_test[1]['df'] = pd.DataFrame({'provincia': ['A', 'A', 'B'], 'w_median': [1.0, 2.0, 4.0]})
+test['name'] = 'test graficar_figuras (datos nuevos)'
+test['res_correcto'] = ['violin']
+testear(test)
+
+####################################################
+### Test: ejecución por etapas
+####################################################
+directorio_etapas_test = tempfile.mkdtemp()
+ejecuciones_test = []
+
+def etapaDuplicarTest(tabla):
+    ejecuciones_test.append('duplicar')
+    return {'doble': tabla.assign(x=tabla['x'] * 2)}
+
+def etapaSumarTest(doble, factor):
+    ejecuciones_test.append('sumar')
+    return {'suma': pd.DataFrame({'total': [doble['x'].sum() * factor]})}
+
+# Retorna las etapas que se ejecutaron y el resultado final
+def correrEtapasTest(etapas, entorno, seleccionadas=None):
+    ejecuciones_test.clear()
+    entorno = fn.ejecutarEtapas(etapas, dict(entorno), directorio_etapas_test, seleccionadas, verbose=False)
+    return ejecuciones_test + [str(entorno['suma']['total'].iat[0]) if 'suma' in entorno else '-']
+
+# La huella de un dict_df no depende de la memoria informada por cargarTabla
+# (distinta si la tabla se leyó del CSV o de la copia en Arrow), pero sí del
+# resto de su metadata
+test = {'name': 'test huellaDeValor (metadata de carga)',
+        'test_func': lambda dicc, otros: [fn.huellaDeValor(dict(dicc, **o)) == fn.huellaDeValor(dicc) for o in otros],
+        'test_cant_args': 2,
+        'test_arg1': {'name': 't', 'df': pd.DataFrame({'x': [1, 2]}), 'memoria': {'con_esquema': 0.66}},
+        'test_arg2': [{'memoria': {'con_esquema': 0.61}}, {'name': 'u'}],
+        'res_correcto': [True, False]
+        }
+testear(test)
+
+etapas_test = [{'name': 'duplicar', 'funcion': etapaDuplicarTest, 'salidas': ['doble']},
+               {'name': 'sumar', 'funcion': etapaSumarTest, 'salidas': ['suma']}]
+test = {'name': 'test ejecutarEtapas',
+        'test_func': correrEtapasTest,
+        'test_cant_args': 2,
+        'test_arg1': etapas_test,
+        'test_arg2': {'tabla': pd.DataFrame({'x': [1, 2, 3]}), 'factor': 1},
+        'res_correcto': ['duplicar', 'sumar', '12']
+        }
+testear(test)
+
+# Sin cambios no se ejecuta ninguna etapa: las salidas se leen de la caché
+test['name'] = 'test ejecutarEtapas (sin cambios)'
+test['res_correcto'] = ['12']
+testear(test)
+
+# Si cambia una entrada de la segunda etapa, la primera se reutiliza
+test['name'] = 'test ejecutarEtapas (cambia un parámetro)'
+test['test_arg2'] = {'tabla': pd.DataFrame({'x': [1, 2, 3]}), 'factor': 2}
+test['res_correcto'] = ['sumar', '24']
+testear(test)
+
+# Si cambian los datos de entrada, se ejecutan todas
+test['name'] = 'test ejecutarEtapas (datos nuevos)'
+test['test_arg2'] = {'tabla': pd.DataFrame({'x': [1, 2, 4]}), 'factor': 2}
+test['res_correcto'] = ['duplicar', 'sumar', '28']
+testear(test)
+
+# Si solo se selecciona la primera etapa, la segunda no se ejecuta
+test['name'] = 'test ejecutarEtapas (selección de etapas)'
+test['test_cant_args'] = 3
+test['test_arg2'] = {'tabla': pd.DataFrame({'x': [1, 2, 5]}), 'factor': 2}
+test['test_arg3'] = ['duplicar']
+test['res_correcto'] = ['duplicar', '-']
+testear(test)
+
+# Seleccionando solo la segunda, la primera se obtiene de la caché
+test['name'] = 'test ejecutarEtapas (selección de etapas, entradas de la caché)'
+test['test_arg3'] = ['sumar']
+test['res_correcto'] = ['sumar', '32']
+testear(test)
+
+
+####################################################
+### Test: generador de fuentes sintéticas
+####################################################
+import generador
+
+# Retorna, para cada tabla generada, su cantidad de filas y un hash de su contenido
+def resumenDeFuentesTest(escala, semilla):
+    fuentes = generador.generarFuentes(escala, semilla, meses=2)
+    return [str((len(df), fn.hashDeTuplas(df).sum())) for nombre, df in sorted(fuentes.items())]
+
+test = {'name': 'test generarFuentes (misma semilla, mismas tablas)',
+        'test_func': resumenDeFuentesTest,
+        'test_cant_args': 2,
+        'test_arg1': 1,
+        'test_arg2': 7,
+        'res_correcto': resumenDeFuentesTest(1, 7)
+        }
+testear(test)
+
+# Retorna, para cada clave foránea de las fuentes, si todos sus valores
+# (no NULL) aparecen en la tabla referenciada
+def clavesDeFuentesTest(escala):
+    fuentes = generador.generarFuentes(escala, 0, meses=2)
+    referencias = [('salarios', 'codigo_departamento_indec', 'deptos', 'codigo_departamento_indec'),
+                   ('salarios', 'clae2', 'clae', 'clae2'),
+                   ('localidades', 'departamento_id', 'deptos', 'codigo_departamento_indec'),
+                   ('operadores', 'rubro', 'rubro_categoria_clae2', 'rubro')]
+    return [bool(fuentes[tabla][col].dropna().isin(fuentes[ref][col_ref]).all())
+            for tabla, col, ref, col_ref in referencias]
+
+test = {'name': 'test generarFuentes (claves foráneas)',
+        'test_func': clavesDeFuentesTest,
+        'test_cant_args': 1,
+        'test_arg1': 2,
+        'res_correcto': [True, True, True, True]
+        }
+testear(test)
+
+# La cantidad de filas crece con la escala
+def filasDeFuentesTest(escala):
+    fuentes = generador.generarFuentes(escala, 0, meses=1)
+    return [len(fuentes[nombre]) for nombre in ['operadores', 'localidades', 'deptos']]
+
+test = {'name': 'test generarFuentes (escala)',
+        'test_func': filasDeFuentesTest,
+        'test_cant_args': 1,
+        'test_arg1': 1,
+        'res_correcto': [1424, 3527, 521]
+        }
+testear(test)
+test['test_arg1'] = 3
+test['res_correcto'] = [4272, 10581, 1563]
+testear(test)
+
+
+####################################################
+### Test: benchmarks
+####################################################
+import benchmark
+
+test = {'name': 'test exponenteDeEscala (lineal)',
+        'test_func': lambda filas, tiempos: round(benchmark.exponenteDeEscala(filas, tiempos), 6),
+        'test_cant_args': 2,
+        'test_arg1': [1000, 2000, 4000, 8000],
+        'test_arg2': [0.01, 0.02, 0.04, 0.08],
+        'res_correcto': 1.0
+        }
+testear(test)
+
+test['name'] = 'test exponenteDeEscala (cuadrática)'
+test['test_arg2'] = [0.01, 0.04, 0.16, 0.64]
+test['res_correcto'] = 2.0
+testear(test)
 
+# Corrida con los segundos dados para una función 'f' a las escalas 1, 2 y 4
+def corridaTest(segundos):
+    filas = [100, 200, 400]
+    return {'fecha': '-', 'escalas': [1, 2, 4],
+            'resultados': {'f': {'filas': filas, 'segundos': segundos,
+                                 'exponente': benchmark.exponenteDeEscala(filas, segundos)}}}
 
+test = {'name': 'test regresiones (sin cambios)',
+        'test_func': lambda segundos, base: len(benchmark.regresiones(corridaTest(segundos), corridaTest(base))),
+        'test_cant_args': 2,
+        'test_arg1': [0.011, 0.02, 0.041],
+        'test_arg2': [0.01, 0.02, 0.04],
+        'res_correcto': 0
+        }
+testear(test)
 
+# Una función lineal que pasa a ser cuadrática: tarda más a escala 4 y cambia su exponente
+test['name'] = 'test regresiones (lineal a cuadrática)'
+test['test_arg1'] = [0.01, 0.04, 0.16]
+test['res_correcto'] = 3
+testear(test)
 
 
+####################################################
+### Test: benchmark de consultas
+####################################################
+import benchmark_consultas
 
+test = {'name': 'test idDeConsulta',
+        'test_func': lambda codigo: benchmark_consultas.idDeConsulta(codigo, 'etapaRespuestas', 893),
+        'test_cant_args': 1,
+        'test_arg1': '    deptos_con_operadores = sql ^ consultaSQL  # 494',
+        'res_correcto': 'deptos_con_operadores'
+        }
+testear(test)
 
+test['test_arg1'] = '    hay_coincidencia = (sql ^ consultaSQL).iat[0, 0] > 0'
+test['res_correcto'] = 'hay_coincidencia'
+testear(test)
 
+test['test_arg1'] = '    if len(sql ^ consultaSQL) == 0:'
+test['res_correcto'] = 'etapaRespuestas:893'
+testear(test)
 
+# Captura las consultas que se ejecutan desde este archivo y vuelve a
+# ejecutarlas con medirConsulta. Retorna, por consulta, su nombre, sus tablas
+# y las filas del resultado (capturado y medido).
+def consultasCapturadasTest(umbral):
+    tabla_test = pd.DataFrame({'a': [1, 2, 3, 3]})
+    otra_test = pd.DataFrame({'a': [3]})
+    with benchmark_consultas.capturarConsultas(os.path.abspath(__file__)) as consultas:
+        mayores = sql ^ ("SELECT DISTINCT a FROM tabla_test WHERE a > " + str(umbral))
+        mayores = sql ^ "SELECT t.a FROM tabla_test AS t INNER JOIN otra_test AS o ON t.a = o.a"
+    return [[c['name'], ', '.join(c['tablas']), str(c['filas_resultado']),
+             str(benchmark_consultas.medirConsulta(c, repeticiones=1)['filas_resultado'])] for c in consultas]
+
+test = {'name': 'test capturarConsultas',
+        'test_func': consultasCapturadasTest,
+        'test_cant_args': 1,
+        'test_arg1': 1,
+        'res_correcto': [['mayores', 'tabla_test', '2', '2'],
+                         ['mayores#2', 'otra_test, tabla_test', '2', '2']]
+        }
+testear(test)